@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any,Dict,List,Tuple
+import numpy as np
+from benchmarks.run import load_cases,percentile
+
+def corpus_texts(country:str,limit:int,data_dir:str="data")->List[str]:
+    from src.pipeline import encoder
+    folder=os.path.join(data_dir,country)
+    texts=[]
+    for doc in encoder.iter_chunks(folder,encoder.list_source_files(folder),workers=1):
+        texts.append(doc.page_content)
+        if len(texts)>=limit:
+            break
+    return texts
+
+def throughput(embedder:Any,texts:List[str],batch_size:int)->Tuple[Dict[str,float],np.ndarray]:
+    embedder.embed_documents(texts[:batch_size])
+    start=time.perf_counter()
+    vectors=[]
+    for i in range(0,len(texts),batch_size):
+        vectors.extend(embedder.embed_documents(texts[i:i+batch_size]))
+    elapsed=time.perf_counter()-start
+    return {"elapsed_s":round(elapsed,3),"sentences_per_s":round(len(texts)/elapsed,1) if elapsed else 0.0},np.asarray(vectors,dtype=np.float32)
+
+def query_latency(embedder:Any,queries:List[str],repeat:int)->Dict[str,float]:
+    durations=[]
+    for _ in range(repeat):
+        for query in queries:
+            start=time.perf_counter()
+            embedder.embed_query(query)
+            durations.append((time.perf_counter()-start)*1000)
+    return {"p50_ms":round(percentile(durations,50),3),"p95_ms":round(percentile(durations,95),3)}
+
+def main(argv=None)->int:
+    parser=argparse.ArgumentParser(description="Compare embedding backends on speed and cosine agreement.")
+    parser.add_argument("--backend",action="append",choices=("torch","onnx","onnx-int8"),help="backends to compare (default: all three); the first is the reference")
+    parser.add_argument("--country",help="embed chunks from data/<country> instead of the benchmark cases")
+    parser.add_argument("--sentences",type=int,default=512)
+    parser.add_argument("--batch-size",type=int,default=64)
+    parser.add_argument("--query-repeat",type=int,default=5)
+    parser.add_argument("--cases",default=os.path.join(os.path.dirname(__file__),"cases.jsonl"))
+    parser.add_argument("--out",help="write the JSON report here (default: stdout)")
+    args=parser.parse_args(argv)
+
+    from src.pipeline.embeddings import VALIDATION_SENTENCES,cosine_agreement,load_embedder,embedder_fingerprint
+    queries=[c["message"] for c in load_cases(args.cases)]
+    if args.country:
+        texts=corpus_texts(args.country,args.sentences)
+    else:
+        pool=queries+list(VALIDATION_SENTENCES)
+        texts=[pool[i%len(pool)] for i in range(args.sentences)]
+    report:Dict[str,Any]={"sentences":len(texts),"batch_size":args.batch_size,"backends":{}}
+    reference=None
+    reference_rate=0.0
+    for name in args.backend or ["torch","onnx","onnx-int8"]:
+        start=time.perf_counter()
+        embedder=load_embedder(name,quantized=name=="onnx-int8")
+        loaded=embedder_fingerprint(embedder)["backend"]
+        result:Dict[str,Any]={"loaded":loaded,"load_s":round(time.perf_counter()-start,3)}
+        if loaded!=name:
+            result["error"]=f"{name} unavailable, got {loaded}"
+            report["backends"][name]=result
+            continue
+        result["corpus"],vectors=throughput(embedder,texts,args.batch_size)
+        result["query"]=query_latency(embedder,queries,args.query_repeat)
+        if reference is None:
+            reference,reference_rate=vectors,result["corpus"]["sentences_per_s"]
+        else:
+            result["agreement"]=cosine_agreement(reference,vectors)
+            result["speedup"]=round(result["corpus"]["sentences_per_s"]/reference_rate,2) if reference_rate else 0.0
+        report["backends"][name]=result
+    text=json.dumps(report,indent=2)
+    if args.out:
+        with open(args.out,"w",encoding="utf-8") as f:
+            f.write(text+"\n")
+    else:
+        print(text)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import json
+import time
+import random
+import threading
+from types import SimpleNamespace
+from typing import Any,Dict,Iterator,List,Optional
+
+DEFAULT_LATENCY_MS={
+    "gpt-4":800.0,
+    "gpt-4o":600.0,
+    "gpt-4o-mini":250.0
+}
+DEFAULT_MS_PER_TOKEN=8.0
+
+CLASSIFIER_KEYWORDS={
+    "criminal_law":("stole","theft","police","assault","fraud","arrest"),
+    "employment_law":("salary","employer","fired","wage","overtime"),
+    "property_law":("landlord","deposit","tenant","land","flat"),
+    "consumer_law":("defective","refund","seller","product"),
+    "family_law":("divorce","custody","maintenance","marriage"),
+    "accident_law":("accident","injury","hit by","crash"),
+    "cyber_law":("hacked","online","phishing","account"),
+    "contract_law":("contract","agreement","breach"),
+    "public_services":("rti","pension","official","bribe")
+}
+
+REASONER_TEXT=(
+    "## Summary of the case\n"
+    "The client describes a dispute that raises questions under the applicable statutes. "
+    "## Relevant legal provisions\n"
+    "The retrieved provisions set out the rights and remedies available. "
+    "## Analysis\n"
+    "Applying the facts to the law, the client appears to have a reasonable claim. "
+    "## Documents to gather\n"
+    "Contracts, receipts, correspondence and any police or agency reports. "
+    "## Next steps\n"
+    "Send a formal notice, keep records and consult a licensed lawyer. "
+    "## Risks and limitation periods\n"
+    "Limitation periods apply and delay may bar the claim. "
+    "## Disclaimer\n"
+    "This is general information and not legal advice."
+)
+
+def approx_tokens(text:str)->int:
+    return max(1,len(text)//4)
+
+def _message_text(messages:List[Dict[str,Any]],role:str)->str:
+    return "\n".join(m.get("content","") for m in messages if m.get("role")==role)
+
+def followup_delta(payload:Dict[str,Any])->Dict[str,Any]:
+    # Shaped like prompt_temp/followup_update.txt asks: new facts plus, per domain, the first empty
+    # field filled from the reply.
+    reply=str(payload.get("reply",""))
+    facts=[s.strip() for s in reply.replace("\n"," ").split(".") if s.strip()]
+    delta:Dict[str,Any]={"facts":facts[:5]} if facts else {}
+    for domain,record in (payload.get("current") or {}).items():
+        empty=[k for k,v in (record or {}).items() if v in (None,"",[],{}) and k not in ("follow_up_questions","missing_info")]
+        if empty and facts:
+            delta[domain]={empty[0]:facts[0]}
+    return delta
+
+class _Completions:
+    def __init__(self,owner:"FakeOpenAI"):
+        self.owner=owner
+
+    def create(self,model:str,messages:List[Dict[str,Any]],stream:bool=False,**kwargs:Any)->Any:
+        return self.owner.complete(model,messages,stream,kwargs)
+
+class FakeOpenAI:
+    def __init__(self,latency_ms:Optional[Dict[str,float]]=None,ms_per_token:float=DEFAULT_MS_PER_TOKEN,jitter:float=0.1,scale:float=1.0,seed:int=0):
+        self.latency_ms=dict(DEFAULT_LATENCY_MS,**(latency_ms or {}))
+        self.ms_per_token=ms_per_token
+        self.jitter=jitter
+        self.scale=scale
+        self.calls=0
+        self._rng=random.Random(seed)
+        self._lock=threading.Lock()
+        self.chat=SimpleNamespace(completions=_Completions(self))
+
+    def _sleep(self,ms:float)->None:
+        with self._lock:
+            factor=1.0+self._rng.uniform(-self.jitter,self.jitter)
+        time.sleep(max(0.0,ms*factor*self.scale)/1000.0)
+
+    def respond(self,model:str,messages:List[Dict[str,Any]],params:Dict[str,Any])->str:
+        system=_message_text(messages,"system")
+        user=_message_text(messages,"user")
+        lowered=user.lower()
+        if "Available legal domains" in system:
+            domains=[d for d,words in CLASSIFIER_KEYWORDS.items() if any(w in lowered for w in words)]
+            return json.dumps(domains[:3] or ["civil_law"])
+        if "updating an existing case record" in system:
+            return json.dumps(followup_delta(json.loads(user)))
+        if "intake data formatter" in system or params.get("response_format"):
+            domains=[line[4:-4] for line in user.splitlines() if line.startswith("--- ") and line.endswith(" ---")]
+            facts=[s.strip() for s in user.replace("\n"," ").split(".") if 20<len(s.strip())<200][:5]
+            return json.dumps({
+                "country":"",
+                "domains":domains,
+                "facts":facts or ["The user described a legal problem."],
+                "timeline":[],
+                "entities":["user"],
+                "legal_questions":["What remedies are available to the user?"],
+                "missing_info":[]
+            })
+        if "follow-up questions" in system:
+            return json.dumps(["When did this happen?","Do you have any written records?"])
+        if "legal reasoning assistant" in system:
+            return REASONER_TEXT
+        return json.dumps({"facts":[user[:200]],"legal_questions":["What can the user do?"],"follow_up_questions":[]})
+
+    def complete(self,model:str,messages:List[Dict[str,Any]],stream:bool,params:Dict[str,Any])->Any:
+        with self._lock:
+            self.calls+=1
+        text=self.respond(model,messages,params)
+        prompt_tokens=sum(approx_tokens(m.get("content","")) for m in messages)
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens,completion_tokens=approx_tokens(text))
+        first_token_ms=self.latency_ms.get(model,DEFAULT_LATENCY_MS["gpt-4o"])
+        if stream:
+            return self._stream(text,first_token_ms,usage)
+        self._sleep(first_token_ms+self.ms_per_token*usage.completion_tokens)
+        message=SimpleNamespace(content=text,role="assistant")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message,index=0)],usage=usage,model=model)
+
+    def _stream(self,text:str,first_token_ms:float,usage:Any)->Iterator[Any]:
+        self._sleep(first_token_ms)
+        words=text.split(" ")
+        for i,word in enumerate(words):
+            piece=word if i==0 else " "+word
+            self._sleep(self.ms_per_token*approx_tokens(piece))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece),index=0,finish_reason=None)],usage=None)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None),index=0,finish_reason="stop")],usage=None)
+        yield SimpleNamespace(choices=[],usage=usage)
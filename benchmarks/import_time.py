@@ -0,0 +1,72 @@
+import sys
+import json
+import argparse
+import subprocess
+from typing import Any,Dict,List
+
+DEFAULT_TARGETS=("src.pipeline.orchestrator","src.api.server")
+HEAVY_MODULES=("langchain","langchain_community","faiss","torch","sentence_transformers","transformers","openai","tiktoken")
+
+PROBE="""
+import sys,json,time
+start=time.perf_counter()
+import {module}
+elapsed=time.perf_counter()-start
+print(json.dumps({{"ms":elapsed*1000,"modules":sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+def probe(module:str)->Dict[str,Any]:
+    # A fresh interpreter per run, so every measurement is a cold import.
+    out=subprocess.run([sys.executable,"-c",PROBE.format(module=module,heavy=HEAVY_MODULES)],capture_output=True,text=True)
+    if out.returncode!=0:
+        return {"ok":False,"error":out.stderr.strip().splitlines()[-1] if out.stderr.strip() else f"exit {out.returncode}"}
+    return dict(json.loads(out.stdout.strip().splitlines()[-1]),ok=True)
+
+def measure(module:str,runs:int)->Dict[str,Any]:
+    samples:List[float]=[]
+    loaded:List[str]=[]
+    for _ in range(runs):
+        result=probe(module)
+        if not result["ok"]:
+            return {"ok":False,"error":result["error"]}
+        samples.append(result["ms"])
+        loaded=result["modules"]
+    samples.sort()
+    return {
+        "ok":True,
+        "runs":runs,
+        "median_ms":round(samples[len(samples)//2],3),
+        "min_ms":round(samples[0],3),
+        "max_ms":round(samples[-1],3),
+        "heavy_modules":loaded
+    }
+
+def main(argv=None)->int:
+    parser=argparse.ArgumentParser(description="Measure cold import time of the app entry points.")
+    parser.add_argument("--module",action="append",help="module to import (repeatable, default: orchestrator and API server)")
+    parser.add_argument("--runs",type=int,default=5)
+    parser.add_argument("--max-ms",type=float,default=0.0,help="fail if any median import exceeds this")
+    parser.add_argument("--allow-heavy",action="store_true",help="do not fail when heavy modules are imported eagerly")
+    parser.add_argument("--out",help="write the JSON report here (default: stdout)")
+    args=parser.parse_args(argv)
+
+    report={module:measure(module,args.runs) for module in (args.module or DEFAULT_TARGETS)}
+    failures=[]
+    for module,result in report.items():
+        if not result["ok"]:
+            failures.append(f"{module}: {result['error']}")
+            continue
+        if args.max_ms and result["median_ms"]>args.max_ms:
+            failures.append(f"{module}: {result['median_ms']}ms > {args.max_ms}ms")
+        if result["heavy_modules"] and not args.allow_heavy:
+            failures.append(f"{module}: eagerly imports {', '.join(result['heavy_modules'])}")
+    text=json.dumps({"imports":report,"failures":failures},indent=2)
+    if args.out:
+        with open(args.out,"w",encoding="utf-8") as f:
+            f.write(text+"\n")
+    else:
+        print(text)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any,Dict,List,Optional
+from benchmarks.fake_openai import FakeOpenAI
+
+def load_cases(path:str)->List[Dict[str,Any]]:
+    with open(path,"r",encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values:List[float],q:float)->float:
+    if not values:
+        return 0.0
+    ordered=sorted(values)
+    index=min(len(ordered)-1,max(0,int(round(q/100.0*(len(ordered)-1)))))
+    return ordered[index]
+
+def summarize(durations:Dict[str,List[float]])->Dict[str,Dict[str,float]]:
+    return {
+        name:{
+            "count":len(values),
+            "p50_ms":round(percentile(values,50),3),
+            "p95_ms":round(percentile(values,95),3),
+            "p99_ms":round(percentile(values,99),3),
+            "mean_ms":round(sum(values)/len(values),3)
+        }
+        for name,values in sorted(durations.items()) if values
+    }
+
+def install_fake_client(fake:Any)->None:
+    from src.pipeline.clients import set_openai_client
+    set_openai_client(fake)
+
+def run_session(case:Dict[str,Any],stream:bool)->Dict[str,Any]:
+    from src.pipeline import orchestrator,tracing
+    session=orchestrator.ChatSession(country_code=case.get("country","india"))
+    result={"id":case.get("id"),"ok":True}
+    with tracing.span("session",case=case.get("id")) as current:
+        try:
+            orchestrator.handle_message(session,case["message"])
+            for reply in case.get("followups",[]):
+                if session.phase!="followups":
+                    break
+                orchestrator.handle_message(session,reply)
+            if session.phase=="followups":
+                session.phase="reason"
+            if session.phase=="reason":
+                if stream:
+                    first=None
+                    for _ in orchestrator.stream_reason(session):
+                        if first is None:
+                            first=current.duration
+                    result["first_token_ms"]=round(1000*(first or current.duration),3)
+                else:
+                    orchestrator.reason(session)
+        except Exception as e:
+            result["ok"]=False
+            result["error"]=f"{type(e).__name__}: {e}"
+    result["elapsed_ms"]=round(current.duration*1000,3)
+    return result
+
+def bench_pipeline(cases:List[Dict[str,Any]],sessions:int,repeat:int,stream:bool)->Dict[str,Any]:
+    from src.pipeline import tracing
+    durations:Dict[str,List[float]]={}
+    lock=threading.Lock()
+    def sink(record:Dict[str,Any])->None:
+        with lock:
+            durations.setdefault(record["name"],[]).append(record["duration_ms"])
+    tracing.add_sink(sink)
+    workload=[c for _ in range(repeat) for c in cases]
+    start=time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            results=list(pool.map(lambda c:run_session(c,stream),workload))
+    finally:
+        tracing.remove_sink(sink)
+    elapsed=time.perf_counter()-start
+    errors=[r for r in results if not r["ok"]]
+    report={
+        "sessions":len(results),
+        "concurrency":sessions,
+        "elapsed_s":round(elapsed,3),
+        "throughput_sessions_per_s":round(len(results)/elapsed,3) if elapsed else 0.0,
+        "errors":len(errors),
+        "error_samples":[r["error"] for r in errors[:5]],
+        "stages":summarize(durations)
+    }
+    ttft=[r["first_token_ms"] for r in results if "first_token_ms" in r]
+    if ttft:
+        report["first_token"]=summarize({"first_token":ttft})["first_token"]
+    return report
+
+def bench_retrieval(cases:List[Dict[str,Any]],seconds:float)->Dict[str,Any]:
+    from src.pipeline import retriever
+    from src.pipeline.query_cache import get_query_cache
+    from src.pipeline.store_registry import get_registry,index_dir
+    cache=get_query_cache()
+    was_enabled=cache.enabled
+    cache.enabled=False
+    report={}
+    try:
+        by_country:Dict[str,List[str]]={}
+        for case in cases:
+            by_country.setdefault(case.get("country","india"),[]).append(case["message"])
+        for country,queries in sorted(by_country.items()):
+            if not os.path.exists(os.path.join(index_dir(country),"index.faiss")):
+                report[country]={"skipped":"no index"}
+                continue
+            load_start=time.perf_counter()
+            get_registry().get(country)
+            load_ms=(time.perf_counter()-load_start)*1000
+            latencies=[]
+            deadline=time.perf_counter()+seconds
+            while time.perf_counter()<deadline:
+                for query in queries:
+                    t=time.perf_counter()
+                    retriever.search_queries(country,[query],5)
+                    latencies.append((time.perf_counter()-t)*1000)
+            total_s=sum(latencies)/1000.0
+            report[country]={
+                "load_ms":round(load_ms,3),
+                "queries":len(latencies),
+                "qps":round(len(latencies)/total_s,3) if total_s else 0.0,
+                **{k:v for k,v in summarize({"q":latencies})["q"].items() if k!="count"}
+            }
+    finally:
+        cache.enabled=was_enabled
+    return report
+
+def bench_ingestion(country:str,files:int,data_dir:str="data")->Dict[str,Any]:
+    from src.pipeline import encoder
+    source=os.path.join(data_dir,country)
+    picked=encoder.list_source_files(source)[:files]
+    tmp=tempfile.mkdtemp(prefix="legalchatbot-bench-")
+    try:
+        os.makedirs(os.path.join(tmp,"data",country))
+        size=0
+        for name in picked:
+            shutil.copy(os.path.join(source,name),os.path.join(tmp,"data",country,name))
+            size+=os.path.getsize(os.path.join(source,name))
+        start=time.perf_counter()
+        encoder.ingest_country_laws(country,os.path.join(tmp,"data"),os.path.join(tmp,"embeddings"),incremental=False)
+        elapsed=time.perf_counter()-start
+        manifest=encoder.load_manifest(os.path.join(tmp,"embeddings",country))
+        chunks=sum(len(v.get("ids",[])) for v in manifest["files"].values())
+        return {
+            "country":country,
+            "files":len(picked),
+            "mb":round(size/1e6,3),
+            "elapsed_s":round(elapsed,3),
+            "chunks":chunks,
+            "chunks_per_s":round(chunks/elapsed,3) if elapsed else 0.0,
+            "mb_per_s":round(size/1e6/elapsed,3) if elapsed else 0.0
+        }
+    finally:
+        shutil.rmtree(tmp,ignore_errors=True)
+
+def compare(report:Dict[str,Any],baseline:Dict[str,Any],tolerance:float)->List[str]:
+    regressions=[]
+    current=report.get("pipeline",{}).get("stages",{})
+    for name,stats in baseline.get("pipeline",{}).get("stages",{}).items():
+        now=current.get(name)
+        if now and stats.get("p95_ms") and now["p95_ms"]>stats["p95_ms"]*(1+tolerance):
+            regressions.append(f"{name}: p95 {now['p95_ms']}ms > baseline {stats['p95_ms']}ms")
+    for country,stats in baseline.get("retrieval",{}).items():
+        now=report.get("retrieval",{}).get(country,{})
+        if stats.get("qps") and now.get("qps") and now["qps"]<stats["qps"]*(1-tolerance):
+            regressions.append(f"retrieval[{country}]: {now['qps']} qps < baseline {stats['qps']} qps")
+    return regressions
+
+def main(argv:Optional[List[str]]=None)->int:
+    parser=argparse.ArgumentParser(description="Replay recorded cases through the pipeline against a local OpenAI stand-in.")
+    parser.add_argument("--cases",default=os.path.join(os.path.dirname(__file__),"cases.jsonl"))
+    parser.add_argument("--sessions",type=int,default=4,help="concurrent sessions")
+    parser.add_argument("--repeat",type=int,default=1,help="times to replay the case corpus")
+    parser.add_argument("--latency-scale",type=float,default=1.0,help="multiply the fake API latencies (0 = no delay)")
+    parser.add_argument("--stream",action="store_true",help="use the streaming reasoner and report time to first token")
+    parser.add_argument("--with-cache",action="store_true",help="keep the LLM and retrieval caches enabled")
+    parser.add_argument("--llm-classifier",action="store_true",help="force the GPT domain classifier instead of the local one")
+    parser.add_argument("--skip-pipeline",action="store_true")
+    parser.add_argument("--retrieval-seconds",type=float,default=0.0,help="measure retrieval QPS per country for this long")
+    parser.add_argument("--ingest",help="country to measure ingestion throughput on")
+    parser.add_argument("--ingest-files",type=int,default=2)
+    parser.add_argument("--out",help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline",help="previous JSON report to compare against")
+    parser.add_argument("--tolerance",type=float,default=0.2,help="allowed relative slowdown before flagging a regression")
+    args=parser.parse_args(argv)
+
+    from src.pipeline import domain_classifier
+    from src.pipeline.llm_cache import get_llm_cache
+    from src.pipeline.query_cache import get_query_cache
+    install_fake_client(FakeOpenAI(scale=args.latency_scale))
+    if not args.with_cache:
+        get_llm_cache().enabled=False
+        get_query_cache().enabled=False
+    if args.llm_classifier:
+        domain_classifier.LOCAL_CLASSIFIER_ENABLED=False
+
+    cases=load_cases(args.cases)
+    report:Dict[str,Any]={"created":time.time(),"cases":len(cases),"latency_scale":args.latency_scale}
+    if not args.skip_pipeline:
+        report["pipeline"]=bench_pipeline(cases,args.sessions,args.repeat,args.stream)
+    if args.retrieval_seconds>0:
+        report["retrieval"]=bench_retrieval(cases,args.retrieval_seconds)
+    if args.ingest:
+        report["ingestion"]=bench_ingestion(args.ingest,args.ingest_files)
+    status=0
+    if args.baseline:
+        with open(args.baseline,"r",encoding="utf-8") as f:
+            report["regressions"]=compare(report,json.load(f),args.tolerance)
+        status=1 if report["regressions"] else 0
+    text=json.dumps(report,indent=2)
+    if args.out:
+        with open(args.out,"w",encoding="utf-8") as f:
+            f.write(text+"\n")
+    else:
+        print(text)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
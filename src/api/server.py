@@ -0,0 +1,210 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any,AsyncIterator,Callable,Dict,List,Optional
+from fastapi import FastAPI,HTTPException
+from fastapi.responses import PlainTextResponse,StreamingResponse
+from pydantic import BaseModel
+from src.pipeline import orchestrator,tracing
+from src.pipeline.orchestrator import ChatSession
+from src.pipeline.store_registry import warm_up_from_env
+from src.api.session_store import SessionStore,store_from_env,session_to_dict
+
+logger=logging.getLogger(__name__)
+
+API_WORKER_THREADS=int(os.getenv("API_WORKER_THREADS","32"))
+API_MAX_INFLIGHT=int(os.getenv("API_MAX_INFLIGHT","64"))
+DEFAULT_COUNTRY=os.getenv("API_DEFAULT_COUNTRY","usa")
+API_SESSION_SWEEP_SECONDS=float(os.getenv("API_SESSION_SWEEP_SECONDS","300"))
+COUNTRIES=("usa","uk","canada","australia","india","eu")
+
+class CreateSession(BaseModel):
+    country:str=DEFAULT_COUNTRY
+    extra_countries:List[str]=[]
+
+class UserMessage(BaseModel):
+    text:str
+
+class CountryUpdate(BaseModel):
+    country:str
+    extra_countries:Optional[List[str]]=None
+
+class PipelineService:
+    def __init__(self,store:SessionStore,worker_threads:int=API_WORKER_THREADS,max_inflight:int=API_MAX_INFLIGHT):
+        self.store=store
+        self.executor=ThreadPoolExecutor(max_workers=worker_threads,thread_name_prefix="pipeline")
+        self.inflight=asyncio.Semaphore(max_inflight)
+        self._locks:Dict[str,asyncio.Lock]={}
+
+    def lock(self,session_id:str)->asyncio.Lock:
+        return self._locks.setdefault(session_id,asyncio.Lock())
+
+    async def run(self,fn:Callable,*args:Any)->Any:
+        # LLM and FAISS calls are blocking, so they run on the worker pool and never stall the event loop.
+        async with self.inflight:
+            return await asyncio.get_running_loop().run_in_executor(self.executor,fn,*args)
+
+    async def sweep(self)->int:
+        expired=set(await self.store.expire())
+        # Locks are created for any id a request names, so unknown ids are dropped along with expired ones.
+        for session_id in list(self._locks):
+            if session_id not in expired and await self.store.get(session_id) is not None:
+                continue
+            lock=self._locks.get(session_id)
+            if lock is not None and not lock.locked():
+                self._locks.pop(session_id,None)
+        return len(expired)
+
+    async def sweep_forever(self,interval:float=API_SESSION_SWEEP_SECONDS)->None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                expired=await self.sweep()
+                if expired:
+                    logger.info("Expired %d sessions",expired)
+            except Exception as e:
+                logger.warning("Session sweep failed: %s",e)
+
+    async def load(self,session_id:str)->ChatSession:
+        session=await self.store.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404,detail="Unknown or expired session")
+        return session
+
+    async def create(self,country:str,extra_countries:List[str])->Dict[str,Any]:
+        session_id=uuid.uuid4().hex
+        session=ChatSession(country_code=country,extra_countries=extra_countries)
+        await self.store.save(session_id,session)
+        return {"session_id":session_id,"phase":session.phase,"messages":[orchestrator.GREETING]}
+
+    async def message(self,session_id:str,text:str)->Dict[str,Any]:
+        async with self.lock(session_id):
+            session=await self.load(session_id)
+            if session.phase=="reason":
+                raise HTTPException(status_code=409,detail="Case is ready; request the answer instead")
+            replies=await self.run(orchestrator.handle_message,session,text)
+            await self.store.save(session_id,session)
+        return {"session_id":session_id,"phase":session.phase,"messages":replies}
+
+    async def answer(self,session_id:str)->Dict[str,Any]:
+        async with self.lock(session_id):
+            session=await self.load(session_id)
+            if session.phase!="reason":
+                raise HTTPException(status_code=409,detail=f"Session is in phase '{session.phase}', not 'reason'")
+            answers=await self.run(orchestrator.reason,session)
+            await self.store.save(session_id,session)
+        return {"session_id":session_id,"phase":session.phase,"answers":answers,"messages":[orchestrator.CLOSING]}
+
+    async def stream_answer(self,session_id:str)->AsyncIterator[bytes]:
+        # Checked up front so a bad request still gets a 404/409; the lock is only taken once the body
+        # is consumed, so a client that never reads the stream cannot leave the session locked.
+        checked=await self.load(session_id)
+        if checked.phase!="reason":
+            raise HTTPException(status_code=409,detail=f"Session is in phase '{checked.phase}', not 'reason'")
+        loop=asyncio.get_running_loop()
+        events:"asyncio.Queue[Optional[Dict[str,Any]]]"=asyncio.Queue()
+
+        def produce(session:ChatSession)->None:
+            try:
+                for domain,delta in orchestrator.stream_reason(session):
+                    loop.call_soon_threadsafe(events.put_nowait,{"domain":domain,"delta":delta})
+            except Exception as e:
+                loop.call_soon_threadsafe(events.put_nowait,{"error":f"{type(e).__name__}: {e}"})
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait,None)
+
+        async def body()->AsyncIterator[bytes]:
+            async with self.lock(session_id):
+                # Another request may have answered or removed the session while this one waited.
+                session=await self.store.get(session_id)
+                if session is None or session.phase!="reason":
+                    yield (json.dumps({"error":"Session is no longer waiting for an answer"})+"\n").encode("utf-8")
+                    return
+                async with self.inflight:
+                    task=loop.run_in_executor(self.executor,produce,session)
+                    while True:
+                        event=await events.get()
+                        if event is None:
+                            break
+                        yield (json.dumps(event,ensure_ascii=False)+"\n").encode("utf-8")
+                    await task
+                await self.store.save(session_id,session)
+                yield (json.dumps({"done":True,"phase":session.phase,"message":orchestrator.CLOSING},ensure_ascii=False)+"\n").encode("utf-8")
+        return body()
+
+def create_app(store:Optional[SessionStore]=None,warm_up:bool=True)->FastAPI:
+    service=PipelineService(store or store_from_env())
+
+    @asynccontextmanager
+    async def lifespan(app:FastAPI)->AsyncIterator[None]:
+        if warm_up:
+            await asyncio.get_running_loop().run_in_executor(service.executor,warm_up_from_env)
+        sweeper=asyncio.create_task(service.sweep_forever())
+        try:
+            yield
+        finally:
+            sweeper.cancel()
+            service.executor.shutdown(wait=False)
+
+    app=FastAPI(title="LegalChatbot API",lifespan=lifespan)
+    app.state.service=service
+
+    @app.get("/healthz")
+    async def healthz()->Dict[str,str]:
+        return {"status":"ok"}
+
+    @app.get("/metrics",response_class=PlainTextResponse)
+    async def metrics()->str:
+        return tracing.render_prometheus()
+
+    def check_countries(*countries:str)->None:
+        if any(c not in COUNTRIES for c in countries):
+            raise HTTPException(status_code=400,detail=f"country must be one of {', '.join(COUNTRIES)}")
+
+    @app.post("/sessions")
+    async def create_session(body:CreateSession)->Dict[str,Any]:
+        check_countries(body.country,*body.extra_countries)
+        return await service.create(body.country,body.extra_countries)
+
+    @app.get("/sessions/{session_id}")
+    async def get_session(session_id:str)->Dict[str,Any]:
+        return {"session_id":session_id,**session_to_dict(await service.load(session_id))}
+
+    @app.put("/sessions/{session_id}/country")
+    async def set_country(session_id:str,body:CountryUpdate)->Dict[str,Any]:
+        check_countries(body.country,*(body.extra_countries or []))
+        async with service.lock(session_id):
+            session=await service.load(session_id)
+            session.country_code=body.country
+            if body.extra_countries is not None:
+                session.extra_countries=body.extra_countries
+            if session.intake is not None:
+                session.intake["country"]=body.country
+            await service.store.save(session_id,session)
+        return {"session_id":session_id,"country":body.country,"extra_countries":session.extra_countries}
+
+    @app.delete("/sessions/{session_id}")
+    async def delete_session(session_id:str)->Dict[str,Any]:
+        await service.store.delete(session_id)
+        service._locks.pop(session_id,None)
+        return {"session_id":session_id,"deleted":True}
+
+    @app.post("/sessions/{session_id}/messages")
+    async def post_message(session_id:str,body:UserMessage)->Dict[str,Any]:
+        return await service.message(session_id,body.text)
+
+    @app.post("/sessions/{session_id}/answer")
+    async def post_answer(session_id:str)->Dict[str,Any]:
+        return await service.answer(session_id)
+
+    @app.get("/sessions/{session_id}/answer/stream")
+    async def stream_answer(session_id:str)->StreamingResponse:
+        return StreamingResponse(await service.stream_answer(session_id),media_type="application/x-ndjson")
+
+    return app
+
+app=create_app()
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from abc import ABC,abstractmethod
+from dataclasses import asdict
+from typing import Any,Dict,List,Optional
+from src.pipeline.orchestrator import ChatSession
+from src.pipeline.intake_state import IntakeState
+
+SESSION_TTL_SECONDS=float(os.getenv("API_SESSION_TTL_SECONDS",str(24*3600)))
+
+def session_to_dict(session:ChatSession)->Dict[str,Any]:
+    data=asdict(session)
+    data["answered_followups"]=sorted(session.answered_followups)
+    return data
+
+def session_from_dict(data:Dict[str,Any])->ChatSession:
+    data=dict(data)
+    data["answered_followups"]=set(data.get("answered_followups") or [])
+    if data.get("state"):
+        data["state"]=IntakeState(**data["state"])
+    return ChatSession(**data)
+
+class SessionStore(ABC):
+    @abstractmethod
+    async def get(self,session_id:str)->Optional[ChatSession]:
+        ...
+
+    @abstractmethod
+    async def save(self,session_id:str,session:ChatSession)->None:
+        ...
+
+    @abstractmethod
+    async def delete(self,session_id:str)->None:
+        ...
+
+    @abstractmethod
+    async def expire(self)->List[str]:
+        # Removes sessions past the TTL and returns their ids.
+        ...
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self,ttl_seconds:float=SESSION_TTL_SECONDS):
+        self.ttl_seconds=ttl_seconds
+        self._sessions:Dict[str,tuple]={}
+
+    async def get(self,session_id:str)->Optional[ChatSession]:
+        item=self._sessions.get(session_id)
+        if item is None:
+            return None
+        saved_at,data=item
+        if self.ttl_seconds>0 and time.time()-saved_at>self.ttl_seconds:
+            self._sessions.pop(session_id,None)
+            return None
+        return session_from_dict(data)
+
+    async def save(self,session_id:str,session:ChatSession)->None:
+        self._sessions[session_id]=(time.time(),session_to_dict(session))
+
+    async def delete(self,session_id:str)->None:
+        self._sessions.pop(session_id,None)
+
+    async def expire(self)->List[str]:
+        if self.ttl_seconds<=0:
+            return []
+        cutoff=time.time()-self.ttl_seconds
+        expired=[sid for sid,(saved_at,_) in self._sessions.items() if saved_at<cutoff]
+        for sid in expired:
+            self._sessions.pop(sid,None)
+        return expired
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self,path:str,ttl_seconds:float=SESSION_TTL_SECONDS):
+        self.path=path
+        self.ttl_seconds=ttl_seconds
+        self._lock=threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path),exist_ok=True)
+        self._conn=sqlite3.connect(path,check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT, saved_at REAL)")
+        self._conn.commit()
+
+    def _get(self,session_id:str)->Optional[ChatSession]:
+        with self._lock:
+            row=self._conn.execute("SELECT data, saved_at FROM sessions WHERE id=?",(session_id,)).fetchone()
+        if row is None or (self.ttl_seconds>0 and time.time()-row[1]>self.ttl_seconds):
+            return None
+        return session_from_dict(json.loads(row[0]))
+
+    def _save(self,session_id:str,session:ChatSession)->None:
+        data=json.dumps(session_to_dict(session),ensure_ascii=False)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sessions (id, data, saved_at) VALUES (?,?,?)",(session_id,data,time.time()))
+            self._conn.commit()
+
+    def _delete(self,session_id:str)->None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id=?",(session_id,))
+            self._conn.commit()
+
+    def _expire(self)->List[str]:
+        if self.ttl_seconds<=0:
+            return []
+        cutoff=time.time()-self.ttl_seconds
+        with self._lock:
+            expired=[row[0] for row in self._conn.execute("SELECT id FROM sessions WHERE saved_at<?",(cutoff,))]
+            self._conn.execute("DELETE FROM sessions WHERE saved_at<?",(cutoff,))
+            self._conn.commit()
+        return expired
+
+    async def get(self,session_id:str)->Optional[ChatSession]:
+        return await asyncio.to_thread(self._get,session_id)
+
+    async def save(self,session_id:str,session:ChatSession)->None:
+        await asyncio.to_thread(self._save,session_id,session)
+
+    async def delete(self,session_id:str)->None:
+        await asyncio.to_thread(self._delete,session_id)
+
+    async def expire(self)->List[str]:
+        return await asyncio.to_thread(self._expire)
+
+def store_from_env()->SessionStore:
+    kind=os.getenv("API_SESSION_STORE","memory").lower()
+    if kind=="sqlite":
+        return SQLiteSessionStore(os.getenv("API_SESSION_DB",os.path.join(".cache","sessions.sqlite3")))
+    return InMemorySessionStore()
@@ -0,0 +1,4 @@
+from dotenv import load_dotenv
+
+# Loaded once for the whole package so module-level settings see .env values.
+load_dotenv()
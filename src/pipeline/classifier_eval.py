@@ -0,0 +1,76 @@
+import sys
+import json
+import time
+import argparse
+from typing import Dict,List
+from src.pipeline.domain_classifier import LEGAL_DOMAINS,classify_domains_llm,get_local_classifier
+from src.pipeline.local_domain_classifier import DOMAIN_CONFIDENT_SIMILARITY
+
+def load_queries(path:str)->List[Dict]:
+    cases=[]
+    with open(path,"r",encoding="utf-8") as f:
+        for line in f:
+            line=line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                cases.append(json.loads(line))
+            else:
+                cases.append({"query":line})
+    return cases
+
+def evaluate(cases:List[Dict])->Dict:
+    classifier=get_local_classifier()
+    tp={d:0 for d in LEGAL_DOMAINS}
+    fp={d:0 for d in LEGAL_DOMAINS}
+    fn={d:0 for d in LEGAL_DOMAINS}
+    exact=0
+    confident=0
+    local_ms=[]
+    rows=[]
+    for case in cases:
+        query=case["query"]
+        reference=case.get("labels") or classify_domains_llm(query)
+        start=time.perf_counter()
+        predicted,confidence=classifier.classify(query)
+        local_ms.append((time.perf_counter()-start)*1000)
+        ref,pred=set(reference),set(predicted)
+        exact+=ref==pred
+        confident+=confidence>=DOMAIN_CONFIDENT_SIMILARITY
+        for d in LEGAL_DOMAINS:
+            tp[d]+=d in ref and d in pred
+            fp[d]+=d not in ref and d in pred
+            fn[d]+=d in ref and d not in pred
+        rows.append({"query":query,"reference":sorted(ref),"predicted":predicted,"confidence":round(confidence,4)})
+    n=len(cases) or 1
+    total_tp,total_fp,total_fn=sum(tp.values()),sum(fp.values()),sum(fn.values())
+    precision=total_tp/(total_tp+total_fp) if total_tp+total_fp else 0.0
+    recall=total_tp/(total_tp+total_fn) if total_tp+total_fn else 0.0
+    per_domain={}
+    for d in LEGAL_DOMAINS:
+        p=tp[d]/(tp[d]+fp[d]) if tp[d]+fp[d] else 0.0
+        r=tp[d]/(tp[d]+fn[d]) if tp[d]+fn[d] else 0.0
+        per_domain[d]={"precision":p,"recall":r,"support":tp[d]+fn[d]}
+    local_ms.sort()
+    return {
+        "cases":len(cases),
+        "micro_precision":precision,
+        "micro_recall":recall,
+        "micro_f1":(2*precision*recall/(precision+recall)) if precision+recall else 0.0,
+        "exact_match":exact/n,
+        "confident_rate":confident/n,
+        "local_p50_ms":local_ms[len(local_ms)//2] if local_ms else 0.0,
+        "per_domain":per_domain,
+        "rows":rows
+    }
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description="Compare the local domain classifier against the GPT classifier.")
+    parser.add_argument("queries",help="text file (one query per line) or JSONL with 'query' and optional gold 'labels'")
+    parser.add_argument("--rows",action="store_true",help="include per-query predictions in the output")
+    args=parser.parse_args()
+    report=evaluate(load_queries(args.queries))
+    if not args.rows:
+        report.pop("rows")
+    json.dump(report,sys.stdout,indent=2)
+    print()
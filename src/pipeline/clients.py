@@ -0,0 +1,39 @@
+import os
+import threading
+from typing import Any,Optional
+
+OPENAI_MAX_CONNECTIONS=int(os.getenv("OPENAI_MAX_CONNECTIONS","20"))
+OPENAI_KEEPALIVE_SECONDS=float(os.getenv("OPENAI_KEEPALIVE_SECONDS","30"))
+
+_lock=threading.Lock()
+_client:Optional[Any]=None
+
+def build_openai_client()->Any:
+    import httpx
+    from openai import OpenAI
+    from src.pipeline.llm_utils import LLM_TIMEOUT_SECONDS
+    # One keep-alive pool shared by every stage, so concurrent calls reuse warm TLS connections.
+    http_client=httpx.Client(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+            keepalive_expiry=OPENAI_KEEPALIVE_SECONDS
+        ),
+        timeout=LLM_TIMEOUT_SECONDS
+    )
+    # The SDK's own retries would multiply with call_with_retry's, so LLM_MAX_RETRIES is the only policy.
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"),http_client=http_client,max_retries=0)
+
+def get_openai_client()->Any:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client=build_openai_client()
+    return _client
+
+def set_openai_client(client:Optional[Any])->Optional[Any]:
+    global _client
+    with _lock:
+        previous,_client=_client,client
+    return previous
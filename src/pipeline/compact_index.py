@@ -0,0 +1,130 @@
+import os
+import json
+import math
+from typing import Any,Dict,Optional,Tuple
+import numpy as np
+import faiss
+from src.pipeline.store_registry import replace_file
+
+INDEX_TYPES=("flat","sq8","ivfpq","hnsw")
+COMPACT_INDEX_NAME="compact.faiss"
+COMPACT_META_NAME="compact.json"
+
+def read_index(path:str,mmap:bool=True)->Any:
+    if mmap:
+        flag_sets=[getattr(faiss,"IO_FLAG_MMAP_IFC",0),faiss.IO_FLAG_MMAP]
+        for flags in flag_sets:
+            if not flags:
+                continue
+            try:
+                return faiss.read_index(path,flags|faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                continue
+    return faiss.read_index(path)
+
+def _ivf_nlist(n:int)->int:
+    return max(1,min(int(4*math.sqrt(n)),n//39))
+
+def _pq_m(d:int)->int:
+    for m in (48,32,24,16,12,8,4,2,1):
+        if d%m==0 and d//m>=4:
+            return m
+    return 1
+
+def build_compact_index(vectors:np.ndarray,index_type:str)->Tuple[Any,Dict[str,Any]]:
+    n,d=vectors.shape
+    if index_type=="ivfpq" and n<256*39:
+        print(f"Only {n} vectors, too few to train IVF-PQ; falling back to sq8.")
+        index_type="sq8"
+    if index_type=="sq8":
+        index=faiss.IndexScalarQuantizer(d,faiss.ScalarQuantizer.QT_8bit,faiss.METRIC_L2)
+        index.train(vectors)
+        params={}
+    elif index_type=="ivfpq":
+        nlist=_ivf_nlist(n)
+        quantizer=faiss.IndexFlatL2(d)
+        index=faiss.IndexIVFPQ(quantizer,d,nlist,_pq_m(d),8)
+        index.train(vectors)
+        params={"nprobe":min(nlist,16)}
+    elif index_type=="hnsw":
+        index=faiss.IndexHNSWFlat(d,32)
+        index.hnsw.efConstruction=80
+        params={"efSearch":64}
+    else:
+        raise ValueError(f"Unsupported compact index type: {index_type}")
+    index.add(vectors)
+    apply_search_params(index,params)
+    return index,{"type":index_type,"params":params}
+
+def apply_search_params(index:Any,params:Dict[str,Any])->None:
+    if "nprobe" in params:
+        faiss.extract_index_ivf(index).nprobe=int(params["nprobe"])
+    if "efSearch" in params:
+        index.hnsw.efSearch=int(params["efSearch"])
+
+def exact_rerank(flat_index:Any,vectors:np.ndarray,positions:np.ndarray,k:int)->Tuple[np.ndarray,np.ndarray]:
+    out_d=np.full((len(vectors),k),np.inf,dtype="float32")
+    out_p=np.full((len(vectors),k),-1,dtype="int64")
+    for row,(query,cands) in enumerate(zip(vectors,positions)):
+        cands=cands[cands!=-1]
+        if len(cands)==0:
+            continue
+        stored=np.vstack([flat_index.reconstruct(int(p)) for p in cands])
+        dist=((stored-query)**2).sum(axis=1)
+        order=np.argsort(dist)[:k]
+        out_d[row,:len(order)]=dist[order]
+        out_p[row,:len(order)]=cands[order]
+    return out_d,out_p
+
+def recall_at_k(flat_index:Any,compact:Any,k:int=5,sample:int=200,rerank_factor:int=0,seed:int=0)->float:
+    n=flat_index.ntotal
+    if n==0:
+        return 1.0
+    rng=np.random.default_rng(seed)
+    picks=rng.choice(n,size=min(sample,n),replace=False)
+    queries=np.vstack([flat_index.reconstruct(int(p)) for p in picks]).astype("float32")
+    _,truth=flat_index.search(queries,k)
+    if rerank_factor>1:
+        _,cands=compact.search(queries,k*rerank_factor)
+        _,found=exact_rerank(flat_index,queries,cands,k)
+    else:
+        _,found=compact.search(queries,k)
+    hits=sum(len(set(t[t!=-1])&set(f[f!=-1])) for t,f in zip(truth,found))
+    return hits/float(len(queries)*k)
+
+def write_compact_index(save_path:str,flat_index:Any,index_type:str,k:int=5,rerank_factor:int=4)->Optional[Dict[str,Any]]:
+    remove_compact_index(save_path)
+    if index_type=="flat" or flat_index.ntotal==0:
+        return None
+    vectors=flat_index.reconstruct_n(0,flat_index.ntotal).astype("float32")
+    index,meta=build_compact_index(vectors,index_type)
+    meta["recall_at_k"]={"k":k,"raw":recall_at_k(flat_index,index,k),"reranked":recall_at_k(flat_index,index,k,rerank_factor=rerank_factor)}
+    replace_file(os.path.join(save_path,COMPACT_INDEX_NAME),lambda tmp:faiss.write_index(index,tmp))
+    replace_file(os.path.join(save_path,COMPACT_META_NAME),lambda tmp:_write_json(tmp,meta))
+    return meta
+
+def _write_json(path:str,data:Dict[str,Any])->None:
+    with open(path,"w",encoding="utf-8") as f:
+        json.dump(data,f,indent=2)
+
+def remove_compact_index(save_path:str)->None:
+    for name in (COMPACT_INDEX_NAME,COMPACT_META_NAME):
+        path=os.path.join(save_path,name)
+        if os.path.exists(path):
+            os.remove(path)
+
+def load_compact_meta(save_path:str)->Optional[Dict[str,Any]]:
+    path=os.path.join(save_path,COMPACT_META_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path,"r",encoding="utf-8") as f:
+        return json.load(f)
+
+def load_compact_index(save_path:str,mmap:bool=True)->Optional[Any]:
+    meta=load_compact_meta(save_path)
+    path=os.path.join(save_path,COMPACT_INDEX_NAME)
+    if meta is None or not os.path.exists(path):
+        return None
+    index=read_index(path,mmap)
+    apply_search_params(index,meta.get("params",{}))
+    return index
@@ -0,0 +1,118 @@
+import os
+import re
+import functools
+from typing import Any,Callable,Dict,List,Optional,Tuple
+
+REASONER_CONTEXT_TOKENS=int(os.getenv("REASONER_CONTEXT_TOKENS","3000"))
+MIN_PARTIAL_TOKENS=64
+MAX_OVERLAP_CHARS=300
+# statute_chunks prefixes every slice after the first with "Section 303 — Theft (continued)".
+CONTINUED_RE=re.compile(r"^[^\n]*\(continued\)\n")
+
+@functools.lru_cache(maxsize=1)
+def _encoding()->Any:
+    # Loaded on first use: the BPE tables are only needed once a prompt is packed.
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(text:str)->int:
+    if not text:
+        return 0
+    encoding=_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text,disallowed_special=()))
+    # Rough fallback for English legal text when tiktoken is not installed.
+    return (len(text)+3)//4
+
+def truncate_to_tokens(text:str,max_tokens:int)->str:
+    encoding=_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text,disallowed_special=())[:max_tokens])
+    return text[:max_tokens*4]
+
+def normalize_doc(doc:Any,rank:int)->Optional[Dict[str,Any]]:
+    if hasattr(doc,"page_content"):
+        meta=dict(getattr(doc,"metadata",{}) or {})
+        meta["content"]=(doc.page_content or "").strip()
+    elif isinstance(doc,dict):
+        meta=dict(doc.get("metadata") or doc)
+        meta["content"]=(doc.get("page_content") or doc.get("content") or doc.get("text") or "").strip()
+    else:
+        return None
+    if not meta["content"]:
+        return None
+    if meta.get("score") is None:
+        meta["score"]=-float(rank)
+    return meta
+
+def strip_overlap(left:str,right:str,max_chars:int=MAX_OVERLAP_CHARS)->str:
+    right=CONTINUED_RE.sub("",right,count=1)
+    limit=min(len(left),len(right),max_chars)
+    for size in range(limit,0,-1):
+        if left.endswith(right[:size]):
+            return right[size:]
+    return right
+
+def merge_adjacent(docs:List[Dict[str,Any]])->List[Dict[str,Any]]:
+    ordered=sorted(docs,key=lambda d:(str(d.get("source","")),d.get("chunk") if isinstance(d.get("chunk"),int) else -1))
+    merged:List[Dict[str,Any]]=[]
+    for doc in ordered:
+        prev=merged[-1] if merged else None
+        adjacent=(
+            prev is not None and doc.get("source") and prev.get("source")==doc.get("source")
+            and isinstance(doc.get("chunk"),int) and isinstance(prev.get("_last_chunk"),int)
+            and doc["chunk"]-prev["_last_chunk"]<=1
+            # Neighbouring chunks of a statute can belong to different sections; keep those apart for citation.
+            and prev.get("act")==doc.get("act") and prev.get("section")==doc.get("section")
+        )
+        if adjacent:
+            if doc["chunk"]!=prev["_last_chunk"]:
+                prev["content"]=prev["content"]+strip_overlap(prev["content"],doc["content"])
+            prev["_last_chunk"]=doc["chunk"]
+            prev["score"]=max(prev["score"],doc["score"])
+            continue
+        doc=dict(doc)
+        doc["_last_chunk"]=doc.get("chunk")
+        merged.append(doc)
+    for doc in merged:
+        doc.pop("_last_chunk",None)
+    return merged
+
+def pack_documents(docs:List[Any],token_budget:int,render:Optional[Callable[[Dict[str,Any]],str]]=None)->Tuple[List[Dict[str,Any]],Dict[str,Any]]:
+    # Budgets are charged for the block as it appears in the prompt, citation prefix included.
+    render=render or (lambda doc:doc["content"])
+    normalized=[d for d in (normalize_doc(doc,i) for i,doc in enumerate(docs)) if d]
+    merged=merge_adjacent(normalized)
+    merged.sort(key=lambda d:-d["score"])
+    packed=[]
+    used=0
+    dropped=0
+    seen=set()
+    for doc in merged:
+        if doc["content"] in seen:
+            dropped+=1
+            continue
+        seen.add(doc["content"])
+        tokens=count_tokens(render(doc))
+        remaining=token_budget-used
+        overhead=count_tokens(render(dict(doc,content="")))
+        if tokens<=remaining:
+            packed.append(doc)
+            used+=tokens
+        elif remaining-overhead>=MIN_PARTIAL_TOKENS:
+            doc=dict(doc,content=truncate_to_tokens(doc["content"],remaining-overhead))
+            packed.append(doc)
+            used+=count_tokens(render(doc))
+        else:
+            dropped+=1
+    return packed,{
+        "candidates":len(normalized),
+        "after_merge":len(merged),
+        "packed":len(packed),
+        "dropped":dropped,
+        "context_tokens":used,
+        "context_budget":token_budget
+    }
@@ -1,12 +1,14 @@
 import os
-import openai
-from typing import List
-from dotenv import load_dotenv
-from openai import OpenAI
+import json
+import logging
+import threading
+from typing import List,Optional
+from src.pipeline.clients import get_openai_client
+from src.pipeline.llm_cache import cached_chat_completion
+from src.pipeline.local_domain_classifier import LocalDomainClassifier,DOMAIN_CONFIDENT_SIMILARITY
+from src.pipeline.tracing import traced,record
 
-load_dotenv()
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger=logging.getLogger(__name__)
 
 LEGAL_DOMAINS = [
     "criminal_law",
@@ -23,7 +25,47 @@ LEGAL_DOMAINS = [
     "public_services"
 ]
 
+LOCAL_CLASSIFIER_ENABLED=os.getenv("LOCAL_DOMAIN_CLASSIFIER","1").lower() not in ("0","false","no")
+
+_local_classifier=None
+_local_failed=False
+_local_lock=threading.Lock()
+
+def get_local_classifier() -> Optional[LocalDomainClassifier]:
+    global _local_classifier
+    if _local_classifier is None and not _local_failed:
+        with _local_lock:
+            if _local_classifier is None and not _local_failed:
+                _local_classifier=LocalDomainClassifier(LEGAL_DOMAINS)
+    return None if _local_failed else _local_classifier
+
+def disable_local_classifier(error:Exception) -> None:
+    # The embedder failing to load will fail the same way on every message; remember it so later
+    # queries go straight to the GPT classifier without paying the load again.
+    global _local_failed
+    with _local_lock:
+        if _local_failed:
+            return
+        _local_failed=True
+    logger.warning("Local domain classifier unavailable, using the GPT classifier from now on: %s",error)
+
+@traced("classify_domains")
 def classify_domains(user_query: str) -> List[str]:
+    classifier=get_local_classifier() if LOCAL_CLASSIFIER_ENABLED else None
+    if classifier is not None:
+        try:
+            labels,confidence=classifier.classify(user_query)
+            record(local_confidence=round(confidence,4))
+            if labels and confidence>=DOMAIN_CONFIDENT_SIMILARITY:
+                record(method="local",domains=labels)
+                return labels
+        except Exception as e:
+            disable_local_classifier(e)
+    domains=classify_domains_llm(user_query)
+    record(method="llm",domains=domains)
+    return domains
+
+def classify_domains_llm(user_query: str) -> List[str]:
     system_prompt = f"""
 You are an expert legal assistant. Your job is to identify all relevant legal domains that apply to the user's legal situation.
 
@@ -40,19 +82,19 @@ Example:
 ["criminal_law", "sexual_offense"]
 """
     try:
-        response=client.chat.completions.create(
+        output=cached_chat_completion(
+            get_openai_client(),
             model="gpt-4",
             temperature=0.3,
             messages=[
                 {"role":"system", "content":system_prompt},
                 {"role":"user","content":user_query}
             ]
-        )
-        output = response.choices[0].message.content.strip()
-        domains=eval(output) if output.startswith("[") else ["general"]
-        return domains if isinstance(domains, list) else ["general"]
+        ).strip()
+        domains=json.loads(output) if output.startswith("[") else ["general"]
+        return domains if isinstance(domains, list) and domains else ["general"]
     except Exception as e:
-        print("Error in domain classification:", e)
+        logger.exception("Error in domain classification: %s",e)
         return ["general"]
 
  
\ No newline at end of file
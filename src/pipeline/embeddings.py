@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from typing import Any,Dict,List,Optional,Sequence
+import numpy as np
+from src.pipeline.store_registry import EMBED_MODEL_NAME
+
+logger=logging.getLogger(__name__)
+
+EMBED_HF_REPO=f"sentence-transformers/{EMBED_MODEL_NAME}"
+EMBED_BACKEND=os.getenv("EMBED_BACKEND","torch").lower()
+EMBED_ONNX_PATH=os.getenv("EMBED_ONNX_PATH",os.path.join("models",f"{EMBED_MODEL_NAME}-onnx"))
+EMBED_QUANTIZED=os.getenv("EMBED_QUANTIZED","1").lower() not in ("0","false","no")
+EMBED_THREADS=int(os.getenv("EMBED_THREADS","0"))
+EMBED_MAX_BATCH=int(os.getenv("EMBED_MAX_BATCH","64"))
+EMBED_MAX_BATCH_TOKENS=int(os.getenv("EMBED_MAX_BATCH_TOKENS","8192"))
+EMBED_MAX_LENGTH=256
+EMBED_MIN_AGREEMENT=float(os.getenv("EMBED_MIN_AGREEMENT","0.99"))
+VALIDATION_FILE="validation.json"
+ONNX_FILE="model.onnx"
+ONNX_INT8_FILE="model_int8.onnx"
+
+VALIDATION_SENTENCES=(
+    "My landlord refuses to return my security deposit after I moved out.",
+    "Someone stole my phone and I want to file a police complaint.",
+    "My employer has not paid my salary for three months.",
+    "Whoever, intending to take dishonestly any movable property out of the possession of any person without that person's consent, moves that property, is said to commit theft.",
+    "The seller delivered a defective washing machine and refuses a refund.",
+    "Whoever, having devised any scheme or artifice to defraud, transmits by means of wire, radio, or television communication any writings for the purpose of executing such scheme.",
+    "I was injured in a road accident caused by a drunk driver.",
+    "My social media account was hacked and used to send phishing messages.",
+    "A person commits an offence if he intentionally penetrates another person without consent.",
+    "Can my spouse take our child abroad without my permission during the divorce?",
+    "The contractor abandoned the renovation halfway and kept the advance payment.",
+    "The public information officer did not reply to my RTI application within thirty days."
+)
+
+# Same mean pooling and L2 normalisation as sentence-transformers, so vectors are
+# interchangeable with the torch backend up to quantisation error.
+class OnnxEmbeddings:
+    def __init__(self,model_dir:str=EMBED_ONNX_PATH,quantized:bool=EMBED_QUANTIZED,threads:int=EMBED_THREADS,max_batch:int=EMBED_MAX_BATCH,max_batch_tokens:int=EMBED_MAX_BATCH_TOKENS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        model_file=os.path.join(model_dir,ONNX_INT8_FILE if quantized else ONNX_FILE)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"{model_file} not found; run python -m src.pipeline.embeddings export --out {model_dir}")
+        options=ort.SessionOptions()
+        options.graph_optimization_level=ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode=ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads=1
+        if threads>0:
+            options.intra_op_num_threads=threads
+        self.session=ort.InferenceSession(model_file,options,providers=["CPUExecutionProvider"])
+        self.input_names={i.name for i in self.session.get_inputs()}
+        # One tokenizer per process; padding is applied per batch, not to a fixed length.
+        self.tokenizer=Tokenizer.from_file(os.path.join(model_dir,"tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=EMBED_MAX_LENGTH)
+        self.tokenizer.no_padding()
+        self._tokenizer_lock=threading.Lock()
+        self.max_batch=max_batch
+        self.max_batch_tokens=max_batch_tokens
+        self.model_dir=model_dir
+        self.backend="onnx-int8" if quantized else "onnx"
+
+    def _encode_batch(self,encodings:Sequence[Any])->np.ndarray:
+        width=max(len(e.ids) for e in encodings)
+        ids=np.zeros((len(encodings),width),dtype=np.int64)
+        mask=np.zeros((len(encodings),width),dtype=np.int64)
+        for row,e in enumerate(encodings):
+            ids[row,:len(e.ids)]=e.ids
+            mask[row,:len(e.ids)]=1
+        feeds={"input_ids":ids,"attention_mask":mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"]=np.zeros_like(ids)
+        hidden=self.session.run(None,feeds)[0]
+        weights=mask[:,:,None].astype(np.float32)
+        pooled=(hidden*weights).sum(axis=1)/np.clip(weights.sum(axis=1),1e-9,None)
+        return pooled/np.clip(np.linalg.norm(pooled,axis=1,keepdims=True),1e-12,None)
+
+    def encode(self,texts:Sequence[str])->np.ndarray:
+        if not texts:
+            return np.zeros((0,0),dtype=np.float32)
+        with self._tokenizer_lock:
+            encodings=self.tokenizer.encode_batch(list(texts))
+        # Length-sorted dynamic batches: similar lengths share a batch, so little compute goes to padding.
+        order=sorted(range(len(texts)),key=lambda i:len(encodings[i].ids))
+        out:Optional[np.ndarray]=None
+        start=0
+        while start<len(order):
+            end=start+1
+            while end<len(order) and end-start<self.max_batch and (end-start+1)*len(encodings[order[end]].ids)<=self.max_batch_tokens:
+                end+=1
+            batch=order[start:end]
+            vectors=self._encode_batch([encodings[i] for i in batch])
+            if out is None:
+                out=np.empty((len(texts),vectors.shape[1]),dtype=np.float32)
+            out[batch]=vectors
+            start=end
+        return out
+
+    def embed_documents(self,texts:List[str])->List[List[float]]:
+        return self.encode(texts).tolist()
+
+    def embed_query(self,text:str)->List[float]:
+        return self.encode([text])[0].tolist()
+
+def load_torch_embedder()->Any:
+    from langchain.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
+
+def load_embedder(backend:Optional[str]=None,quantized:Optional[bool]=None)->Any:
+    backend=(backend or EMBED_BACKEND).lower()
+    if backend in ("onnx","onnx-int8"):
+        try:
+            return OnnxEmbeddings(quantized=backend=="onnx-int8" or (EMBED_QUANTIZED if quantized is None else quantized))
+        except (ImportError,FileNotFoundError) as e:
+            logger.warning("ONNX embedding backend unavailable (%s); falling back to torch",e)
+    return load_torch_embedder()
+
+def embedder_fingerprint(embedder:Any)->Dict[str,str]:
+    return {"model":EMBED_MODEL_NAME,"backend":getattr(embedder,"backend","torch")}
+
+def load_validation(model_dir:str=EMBED_ONNX_PATH)->Dict[str,Any]:
+    path=os.path.join(model_dir,VALIDATION_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path,"r",encoding="utf-8") as f:
+        return json.load(f)
+
+def is_compatible(built_with:Optional[Dict[str,str]],embedder:Any)->bool:
+    # Indexes built before fingerprints were recorded used the torch backend.
+    built_with=built_with or {"model":EMBED_MODEL_NAME,"backend":"torch"}
+    current=embedder_fingerprint(embedder)
+    if built_with.get("model")!=current["model"]:
+        return False
+    if built_with.get("backend")==current["backend"]:
+        return True
+    # Mixing backends is allowed only once each ONNX variant involved has been checked against torch.
+    validation=load_validation(getattr(embedder,"model_dir",EMBED_ONNX_PATH))
+    backends={built_with.get("backend",""),current["backend"]}-{"torch"}
+    return all(validation.get(b,{}).get("min_cosine",0.0)>=EMBED_MIN_AGREEMENT for b in backends)
+
+def cosine_agreement(reference:np.ndarray,candidate:np.ndarray)->Dict[str,float]:
+    ref=reference/np.linalg.norm(reference,axis=1,keepdims=True)
+    cand=candidate/np.linalg.norm(candidate,axis=1,keepdims=True)
+    cosines=(ref*cand).sum(axis=1)
+    return {"mean_cosine":float(cosines.mean()),"min_cosine":float(cosines.min()),"sentences":int(len(cosines))}
+
+def validate(model_dir:str=EMBED_ONNX_PATH,sentences:Sequence[str]=VALIDATION_SENTENCES)->Dict[str,Any]:
+    reference=np.asarray(load_torch_embedder().embed_documents(list(sentences)),dtype=np.float32)
+    report={}
+    for quantized in (False,True):
+        candidate=OnnxEmbeddings(model_dir,quantized=quantized)
+        report[candidate.backend]=cosine_agreement(reference,candidate.encode(sentences))
+    report["threshold"]=EMBED_MIN_AGREEMENT
+    report["created"]=time.time()
+    with open(os.path.join(model_dir,VALIDATION_FILE),"w",encoding="utf-8") as f:
+        json.dump(report,f,indent=2)
+    return report
+
+def export_onnx(out_dir:str=EMBED_ONNX_PATH,opset:int=17)->str:
+    import torch
+    from transformers import AutoModel,AutoTokenizer
+    from onnxruntime.quantization import QuantType,quantize_dynamic
+    os.makedirs(out_dir,exist_ok=True)
+    tokenizer=AutoTokenizer.from_pretrained(EMBED_HF_REPO)
+    model=AutoModel.from_pretrained(EMBED_HF_REPO).eval()
+    tokenizer.save_pretrained(out_dir)
+    sample=tokenizer(["export sample"],return_tensors="pt")
+    names=["input_ids","attention_mask","token_type_ids"]
+    axes={n:{0:"batch",1:"sequence"} for n in names}
+    axes["last_hidden_state"]={0:"batch",1:"sequence"}
+    model_file=os.path.join(out_dir,ONNX_FILE)
+    with torch.no_grad():
+        torch.onnx.export(model,tuple(sample[n] for n in names),model_file,input_names=names,output_names=["last_hidden_state"],dynamic_axes=axes,opset_version=opset)
+    # Dynamic int8 quantisation of the MatMul weights; activations stay float.
+    quantize_dynamic(model_file,os.path.join(out_dir,ONNX_INT8_FILE),weight_type=QuantType.QInt8)
+    return out_dir
+
+if __name__ == "__main__":
+    parser=argparse.ArgumentParser(description="Export and validate the ONNX embedding backend.")
+    parser.add_argument("command",choices=("export","validate"))
+    parser.add_argument("--out",default=EMBED_ONNX_PATH,help="model directory")
+    args=parser.parse_args()
+    if args.command=="export":
+        export_onnx(args.out)
+    print(json.dumps(validate(args.out),indent=2))
@@ -1,51 +1,276 @@
 import os
-from langchain.embeddings import HuggingFaceEmbeddings
+import json
+import uuid
+import pickle
+import hashlib
+import argparse
+import itertools
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable,Dict,Iterable,Iterator,List,Optional,Tuple
 from langchain.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
+import faiss
 from PyPDF2 import PdfReader
+from src.pipeline.store_registry import BUILD_MARKER,replace_file
+from src.pipeline.embeddings import embedder_fingerprint,is_compatible,load_embedder
+from src.pipeline.compact_index import INDEX_TYPES,load_compact_meta,write_compact_index
+from src.pipeline.lexical_index import BM25Index,LEXICAL_DIR_NAME,load_lexical_index
+from src.pipeline.statutes import SECTIONS_FILE,STATUTE_CHUNK_SIZE,JURISDICTIONS,SectionIndex,act_title,statute_chunks
 
-def load_text_files_from_folder(folder_path):
-    documents = []
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
-        
-        # If it's a TXT file
-        if filename.lower().endswith(".txt"):
-            with open(file_path, "r", encoding="utf-8") as f:
-                text = f.read()
-        
-        # If it's a PDF file
-        elif filename.lower().endswith(".pdf"):
-            reader = PdfReader(file_path)
-            text = "\n".join(
-                page.extract_text() for page in reader.pages if page.extract_text()
-            )
-        
-        else:
-            continue 
-        
-        if text.strip():
-            documents.append(Document(page_content=text, metadata={"source": filename}))
-    
-    return documents
-
-def ingest_country_laws(country):    
-    folder_path=os.path.join("data", country)
-    save_path=os.path.join("embeddings",country)
-    documents=load_text_files_from_folder(folder_path)
-
-    splitter=RecursiveCharacterTextSplitter(chunk_size=1000,chunk_overlap=100)
-    chunks=splitter.split_documents(documents)
-
-    embedder=HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    vectorstore=FAISS.from_documents(chunks, embedder)
+COUNTRIES=["india","usa","uk","canada","australia","eu"]
+MANIFEST_NAME="manifest.json"
+SUPPORTED_EXTENSIONS=(".txt",".pdf")
+EMBED_BATCH_SIZE=int(os.getenv("EMBED_BATCH_SIZE","256"))
+FAISS_INDEX_TYPE=os.getenv("FAISS_INDEX_TYPE")
+CHUNKING_MODES=("statute","generic")
+CHUNKING_MODE=os.getenv("CHUNKING_MODE","statute")
 
+def file_sha256(file_path:str)->str:
+    digest=hashlib.sha256()
+    with open(file_path,"rb") as f:
+        for block in iter(lambda:f.read(1<<20),b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def extract_pages(file_path:str)->List[Tuple[int,str]]:
+    # If it's a TXT file
+    if file_path.lower().endswith(".txt"):
+        with open(file_path,"r",encoding="utf-8") as f:
+            return [(1,f.read())]
+    # If it's a PDF file
+    reader=PdfReader(file_path)
+    pages=[]
+    for number,page in enumerate(reader.pages,start=1):
+        text=page.extract_text()
+        if text and text.strip():
+            pages.append((number,text))
+    return pages
+
+def list_source_files(folder_path:str)->List[str]:
+    return sorted(f for f in os.listdir(folder_path) if f.lower().endswith(SUPPORTED_EXTENSIONS))
+
+def iter_extracted(paths:List[str],workers:Optional[int]=None)->Iterator[Tuple[str,List[Tuple[int,str]]]]:
+    if workers==1 or len(paths)<=1:
+        for path in paths:
+            yield path,extract_pages(path)
+        return
+    # Keep only a bounded window of files in flight so extracted text never piles up.
+    workers=workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window=workers*2
+        pending=deque()
+        remaining=iter(paths)
+        for path in itertools.islice(remaining,window):
+            pending.append((path,pool.submit(extract_pages,path)))
+        while pending:
+            path,future=pending.popleft()
+            pages=future.result()
+            nxt=next(remaining,None)
+            if nxt is not None:
+                pending.append((nxt,pool.submit(extract_pages,nxt)))
+            yield path,pages
+
+def generic_chunks(pages:List[Tuple[int,str]],filename:str,country:str,split:Callable[[str],List[str]])->Iterator[Tuple[str,Dict]]:
+    act=act_title(pages,filename)
+    base={"source":filename,"act":act,"jurisdiction":JURISDICTIONS.get(country,country.upper())}
+    for page_number,text in pages:
+        for piece in split(text):
+            yield piece,dict(base,page=page_number)
+
+def iter_chunks(folder_path:str,filenames:List[str],workers:Optional[int]=None,chunking:str=CHUNKING_MODE)->Iterator[Document]:
+    country=os.path.basename(os.path.normpath(folder_path))
+    if chunking=="statute":
+        # Sections are split only when longer than a chunk, so most chunks are one whole section.
+        split=RecursiveCharacterTextSplitter(chunk_size=STATUTE_CHUNK_SIZE,chunk_overlap=100).split_text
+        chunker=statute_chunks
+    else:
+        split=RecursiveCharacterTextSplitter(chunk_size=1000,chunk_overlap=100).split_text
+        chunker=generic_chunks
+    paths=[os.path.join(folder_path,f) for f in filenames]
+    for path,pages in iter_extracted(paths,workers):
+        filename=os.path.basename(path)
+        for chunk_index,(piece,meta) in enumerate(chunker(pages,filename,country,split)):
+            yield Document(page_content=piece,metadata=dict(meta,chunk=chunk_index))
+
+def iter_batches(items:Iterable[Document],batch_size:int)->Iterator[List[Document]]:
+    iterator=iter(items)
+    while True:
+        batch=list(itertools.islice(iterator,batch_size))
+        if not batch:
+            return
+        yield batch
+
+def load_manifest(save_path:str)->Dict:
+    path=os.path.join(save_path,MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"files":{}}
+    with open(path,"r",encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(save_path:str,manifest:Dict)->None:
+    tmp=os.path.join(save_path,MANIFEST_NAME+".tmp")
+    with open(tmp,"w",encoding="utf-8") as f:
+        json.dump(manifest,f,indent=2,sort_keys=True)
+    os.replace(tmp,os.path.join(save_path,MANIFEST_NAME))
+
+def diff_manifest(manifest:Dict,hashes:Dict[str,str])->Tuple[List[str],List[str]]:
+    known=manifest.get("files",{})
+    changed=[f for f,h in hashes.items() if known.get(f,{}).get("sha256")!=h]
+    removed=[f for f in known if f not in hashes or f in changed]
+    return changed,removed
+
+def resolve_index_type(save_path:str,index_type:Optional[str])->str:
+    if index_type:
+        return index_type
+    meta=load_compact_meta(save_path)
+    return meta["type"] if meta else "flat"
+
+def save_vectorstore(save_path:str,vectorstore:FAISS)->None:
+    # Same files as FAISS.save_local, but renamed into place so readers' mmaps of index.faiss stay valid.
     os.makedirs(save_path,exist_ok=True)
-    vectorstore.save_local(save_path)
-    print(f"[{country.upper()}] Saved FAISS index to: {save_path}")
+    replace_file(os.path.join(save_path,"index.faiss"),lambda tmp:faiss.write_index(vectorstore.index,tmp))
+    def write_pickle(tmp:str)->None:
+        with open(tmp,"wb") as f:
+            pickle.dump((vectorstore.docstore,vectorstore.index_to_docstore_id),f)
+    replace_file(os.path.join(save_path,"index.pkl"),write_pickle)
+
+def build_compact(country:str,save_path:str,vectorstore:FAISS,index_type:str)->None:
+    meta=write_compact_index(save_path,vectorstore.index,index_type)
+    if meta:
+        recall=meta["recall_at_k"]
+        print(f"[{country.upper()}] {meta['type']} index recall@{recall['k']} vs flat: {recall['raw']:.3f} (exact re-rank: {recall['reranked']:.3f})")
+
+def build_lexical(country:str,save_path:str,vectorstore:FAISS)->None:
+    # BM25 positions follow FAISS positions, so fused results resolve through index_to_docstore_id.
+    texts=(vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content for i in range(vectorstore.index.ntotal))
+    index=BM25Index.build(texts)
+    index.save(os.path.join(save_path,LEXICAL_DIR_NAME))
+    print(f"[{country.upper()}] Saved BM25 index ({len(index.vocab)} terms, {len(index.docs)} postings)")
+
+def build_sections(country:str,save_path:str,vectorstore:FAISS)->None:
+    items=((doc_id,vectorstore.docstore.search(doc_id).metadata) for doc_id in vectorstore.index_to_docstore_id.values())
+    index=SectionIndex.build(items)
+    index.save(os.path.join(save_path,SECTIONS_FILE))
+    print(f"[{country.upper()}] Saved section lookup ({len(index.entries)} sections)")
+
+@contextmanager
+def building_marker(save_path:str)->Iterator[None]:
+    os.makedirs(save_path,exist_ok=True)
+    marker=os.path.join(save_path,BUILD_MARKER)
+    with open(marker,"w",encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+    try:
+        yield
+    finally:
+        os.remove(marker)
+
+def ingest_country_laws(country:str,data_dir:str="data",out_dir:str="embeddings",incremental:bool=True,workers:Optional[int]=None,batch_size:int=EMBED_BATCH_SIZE,index_type:Optional[str]=FAISS_INDEX_TYPE,chunking:str=CHUNKING_MODE)->None:
+    folder_path=os.path.join(data_dir,country)
+    save_path=os.path.join(out_dir,country)
+    index_type=resolve_index_type(save_path,index_type)
+    hashes={f:file_sha256(os.path.join(folder_path,f)) for f in list_source_files(folder_path)}
+    has_index=os.path.exists(os.path.join(save_path,"index.faiss"))
+    manifest=load_manifest(save_path) if incremental and has_index else {"files":{}}
+    if manifest.get("chunking","generic")!=chunking:
+        # Chunks from the other mode cannot be mixed into the same index.
+        manifest={"files":{}}
+    embedder=load_embedder()
+    if manifest["files"] and not is_compatible(manifest.get("embedder"),embedder):
+        built_with=(manifest.get("embedder") or {}).get("backend","torch")
+        print(f"[{country.upper()}] Index was embedded with {built_with}, which does not match {embedder_fingerprint(embedder)['backend']}; rebuilding.")
+        manifest={"files":{}}
+    changed,removed=diff_manifest(manifest,hashes)
+    if has_index and incremental and not changed and not removed:
+        meta=load_compact_meta(save_path)
+        stale_compact=(meta["type"] if meta else "flat")!=index_type
+        missing_lexical=load_lexical_index(save_path,mmap=False) is None
+        missing_sections=not os.path.exists(os.path.join(save_path,SECTIONS_FILE))
+        if stale_compact or missing_lexical or missing_sections:
+            # Same marker as a full build, so readers skip the shard while side indexes are rewritten.
+            with building_marker(save_path):
+                vectorstore=FAISS.load_local(save_path,embedder,allow_dangerous_deserialization=True)
+                if stale_compact:
+                    build_compact(country,save_path,vectorstore,index_type)
+                if missing_lexical:
+                    build_lexical(country,save_path,vectorstore)
+                if missing_sections:
+                    build_sections(country,save_path,vectorstore)
+        print(f"[{country.upper()}] Up to date ({len(hashes)} files), nothing to embed.")
+        return
+
+    # Sharded search skips this country while the marker exists, so readers never see a half-written index.
+    with building_marker(save_path):
+        vectorstore=None
+        if manifest["files"]:
+            vectorstore=FAISS.load_local(save_path,embedder,allow_dangerous_deserialization=True)
+            stale=[i for f in removed for i in manifest["files"][f].get("ids",[])]
+            if stale:
+                vectorstore.delete(stale)
+
+        # page -> chunk -> embedding batch -> index.add, so only one batch is held at a time
+        ids_by_file={}
+        embedded=0
+        for batch in iter_batches(iter_chunks(folder_path,changed,workers,chunking),batch_size):
+            texts=[d.page_content for d in batch]
+            metadatas=[d.metadata for d in batch]
+            ids=[str(uuid.uuid4()) for _ in batch]
+            pairs=list(zip(texts,embedder.embed_documents(texts)))
+            if vectorstore is None:
+                vectorstore=FAISS.from_embeddings(pairs,embedder,metadatas=metadatas,ids=ids)
+            else:
+                vectorstore.add_embeddings(pairs,metadatas=metadatas,ids=ids)
+            for meta,chunk_id in zip(metadatas,ids):
+                ids_by_file.setdefault(meta["source"],[]).append(chunk_id)
+            embedded+=len(batch)
+
+        if vectorstore is None:
+            print(f"[{country.upper()}] No documents found in {folder_path}")
+            return
+
+        files={f:v for f,v in manifest["files"].items() if f not in removed}
+        for f in changed:
+            files[f]={"sha256":hashes[f],"ids":ids_by_file.get(f,[])}
+        save_vectorstore(save_path,vectorstore)
+        save_manifest(save_path,{"files":files,"chunking":chunking,"embedder":embedder_fingerprint(embedder)})
+        # Positions shift on every add/delete, so the compact index is always rebuilt from the flat one.
+        build_compact(country,save_path,vectorstore,index_type)
+        build_lexical(country,save_path,vectorstore)
+        build_sections(country,save_path,vectorstore)
+        print(f"[{country.upper()}] Saved FAISS index to: {save_path} (+{len(changed)} changed, -{len(set(removed)-set(changed))} removed, {embedded} chunks embedded)")
+
+def _ingest_one(args:Tuple[str,str,str,bool,Optional[int],int,Optional[str],str])->str:
+    country,data_dir,out_dir,incremental,workers,batch_size,index_type,chunking=args
+    ingest_country_laws(country,data_dir,out_dir,incremental,workers,batch_size,index_type,chunking)
+    return country
+
+def ingest_all(data_dir:str="data",out_dir:str="embeddings",incremental:bool=True,jobs:int=1,countries:Optional[List[str]]=None,batch_size:int=EMBED_BATCH_SIZE,index_type:Optional[str]=FAISS_INDEX_TYPE,chunking:str=CHUNKING_MODE)->None:
+    countries=countries or [c for c in COUNTRIES if os.path.isdir(os.path.join(data_dir,c))]
+    if jobs<=1:
+        for country in countries:
+            ingest_country_laws(country,data_dir,out_dir,incremental,batch_size=batch_size,index_type=index_type,chunking=chunking)
+        return
+    # Countries already run in parallel, so each one extracts its PDFs serially.
+    tasks=[(c,data_dir,out_dir,incremental,1,batch_size,index_type,chunking) for c in countries]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for country in pool.map(_ingest_one,tasks):
+            print(f"[{country.upper()}] Done.")
 
 if __name__ == "__main__":
-    countries = ["india","usa","uk","canada","australia","eu"]
-    for country in countries:
-        ingest_country_laws(country)
+    parser=argparse.ArgumentParser(description="Build FAISS indexes from data/<country>/ documents.")
+    parser.add_argument("--country",action="append",help="country to ingest (repeatable); defaults to all found under --data-dir")
+    parser.add_argument("--data-dir",default="data")
+    parser.add_argument("--out-dir",default="embeddings")
+    parser.add_argument("--full",action="store_true",help="re-embed everything instead of only new or changed files")
+    parser.add_argument("--jobs",type=int,default=1,help="countries to build in parallel")
+    parser.add_argument("--workers",type=int,default=None,help="processes for PDF text extraction (single-country runs)")
+    parser.add_argument("--batch-size",type=int,default=EMBED_BATCH_SIZE,help="chunks embedded and added to the index per batch")
+    parser.add_argument("--index-type",choices=INDEX_TYPES,default=FAISS_INDEX_TYPE,help="also build a compact search index next to the flat one (default: keep the existing type)")
+    parser.add_argument("--chunking",choices=CHUNKING_MODES,default=CHUNKING_MODE,help="split along statute sections or into fixed-size chunks (switching rebuilds the index)")
+    args=parser.parse_args()
+    if args.country and len(args.country)==1:
+        ingest_country_laws(args.country[0],args.data_dir,args.out_dir,not args.full,args.workers,args.batch_size,args.index_type,args.chunking)
+    else:
+        ingest_all(args.data_dir,args.out_dir,not args.full,args.jobs,args.country,args.batch_size,args.index_type,args.chunking)
@@ -1,19 +1,20 @@
-import os
 import json
+import logging
 from typing import Dict
-from openai import OpenAI
-from dotenv import load_dotenv
 from pathlib import Path
+from src.pipeline.llm_cache import cached_chat_completion
+from src.pipeline.clients import get_openai_client
+from src.pipeline.tracing import traced,record
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger=logging.getLogger(__name__)
     
 def call_llm_to_format_json(prompt:str,domain_outputs:Dict[str,str])->str:
     combined_input=""
     for domain, output in domain_outputs.items():
         combined_input+=f"\n\n--- {domain} ---\n{output.strip()}"
 
-    response = client.chat.completions.create(
+    return cached_chat_completion(
+        get_openai_client(),
         model="gpt-4o",
         response_format={"type": "json_object"},
         messages=[
@@ -21,17 +22,19 @@ def call_llm_to_format_json(prompt:str,domain_outputs:Dict[str,str])->str:
             {"role":"user","content":combined_input}
         ],
         temperature=0.2
-    )
-    return response.choices[0].message.content.strip()
+    ).strip()
 
+@traced("format_and_merge_intake")
 def format_and_merge_intake(domain_outputs:Dict[str,str])->Dict:
     prompt_path=Path("prompt_temp")/"formatter.txt"
     with open(prompt_path,"r",encoding="utf-8") as f:
         prompt=f.read()
     formatted_str=call_llm_to_format_json(prompt,domain_outputs)
     try:
-        return json.loads(formatted_str)
+        intake=json.loads(formatted_str)
     except json.JSONDecodeError:
-        print("ERROR! LLM returned invalid JSON.")
-        print(formatted_str)
+        logger.error("LLM returned invalid JSON: %s",formatted_str)
+        record(invalid_json=True)
         return {}
+    record(domains=len(domain_outputs),facts=len(intake.get("facts") or []))
+    return intake
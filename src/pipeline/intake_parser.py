@@ -1,12 +1,13 @@
-import os
 import json
+import logging
 from typing import List, Dict, Any
-from dotenv import load_dotenv
-from openai import OpenAI
 from pathlib import Path
+from src.pipeline.llm_utils import map_concurrently,LLM_MAX_CONCURRENCY
+from src.pipeline.llm_cache import cached_chat_completion
+from src.pipeline.clients import get_openai_client
+from src.pipeline.tracing import traced,record
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger=logging.getLogger(__name__)
 
 def load_prompt(domain:str)->str:
     prompt_path=Path("prompt_temp")/f"{domain}.txt"
@@ -14,23 +15,27 @@ def load_prompt(domain:str)->str:
         return f.read()
 
 def call_llm_with_prompt(prompt:str, user_input:str) -> str:
-    response = client.chat.completions.create(
+    return cached_chat_completion(
+        get_openai_client(),
         model="gpt-4o",
         messages=[
             {"role":"system", "content":prompt},
             {"role":"user", "content":user_input}
         ],
         temperature=0.2
-    )
-    return response.choices[0].message.content.strip()
+    ).strip()
+
+@traced("run_domain_intake")
+def run_domain_intake(user_input:str, domains:List[str], max_workers:int=LLM_MAX_CONCURRENCY)->Dict[str,str]:
+    def run_one(domain:str)->str:
+        prompt=load_prompt(domain)
+        return call_llm_with_prompt(prompt,user_input)
 
-def run_domain_intake(user_input:str, domains:List[str])->Dict[str,str]:
     outputs={}
-    for domain in domains:
-        try:
-            prompt=load_prompt(domain)
-            raw_output=call_llm_with_prompt(prompt,user_input)
-            outputs[domain]=raw_output
-        except Exception as e:
-            print(f"ERROR! Failed for {domain}: {e}")
+    for domain,(ok,result) in map_concurrently(run_one,domains,max_workers).items():
+        if ok:
+            outputs[domain]=result
+        else:
+            logger.error("Failed for %s: %s",domain,result)
+    record(domains=len(domains),failed=len(domains)-len(outputs))
     return outputs
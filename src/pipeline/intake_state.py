@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import logging
+from pathlib import Path
+from dataclasses import dataclass,field
+from typing import Any,Dict,List,Optional,Set,Tuple
+from src.pipeline.clients import get_openai_client
+from src.pipeline.llm_cache import cached_chat_completion
+from src.pipeline.lexical_index import tokenize
+from src.pipeline.merge_intake_updates import LIST_KEYS,merge_user_responses
+from src.pipeline.tracing import traced,record
+
+logger=logging.getLogger(__name__)
+
+FOLLOWUP_MODEL=os.getenv("FOLLOWUP_MODEL","gpt-4o-mini")
+CRITICAL_KEYS=("country","facts","legal_questions","domains")
+OPTIONAL_KEYS=("entities","timeline","location","injuries","damages")
+QUESTION_KEYS=("follow_up_questions","followup_questions","missing_info","questions")
+# Words shared by most domain names say nothing about which domain a reply is about.
+GENERIC_DOMAIN_WORDS=frozenset(("law",))
+PLACEHOLDERS=frozenset(("unknown","not mentioned","not specified","not provided","n/a","na","none","null","tbd","?"))
+# "may" counts only next to a day or year; on its own it is almost always the verb.
+DATE_RE=re.compile(r"\b(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|(?:19|20)\d{2}|jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|\d{1,2}(?:st|nd|rd|th)?(?: of)? may|may,? (?:\d{1,2}(?:st|nd|rd|th)?|(?:19|20)\d{2})|june?|july?|aug(?:ust)?|sep(?:tember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?|yesterday|today|last (?:week|month|year)|\d+ (?:days?|weeks?|months?|years?) ago)\b",re.IGNORECASE)
+
+# Field keys are "facts" for the general intake and "criminal_law.fir_filed" for a domain's own fields.
+@dataclass
+class IntakeState:
+    domains:List[str]=field(default_factory=list)
+    filled:Dict[str,bool]=field(default_factory=dict)
+    questions:Dict[str,Dict[str,Any]]=field(default_factory=dict)
+    asked:List[str]=field(default_factory=list)
+    turns:int=0
+    llm_calls:int=0
+
+def normalize_question(q:str)->str:
+    return re.sub(r'[^\w\s]','',q.strip().lower())
+
+def is_filled(value:Any)->bool:
+    if value is None or value is False:
+        return False
+    if isinstance(value,str):
+        return value.strip().lower() not in PLACEHOLDERS and bool(value.strip())
+    if isinstance(value,(list,tuple)):
+        return any(is_filled(v) for v in value)
+    if isinstance(value,dict):
+        return any(is_filled(v) for v in value.values())
+    return True
+
+def domain_section(intake:Dict[str,Any],domain:str)->Dict[str,Any]:
+    section=intake.get(domain)
+    if isinstance(section,dict):
+        return section
+    return (intake.get("domain_specific") or {}).get(domain) or {}
+
+def field_label(key:str)->str:
+    return key.rsplit(".",1)[-1].replace("_"," ")
+
+def scan_general(intake:Dict[str,Any])->Dict[str,bool]:
+    return {key:is_filled(intake.get(key)) for key in CRITICAL_KEYS+OPTIONAL_KEYS}
+
+def scan_domain(intake:Dict[str,Any],domain:str)->Dict[str,bool]:
+    return {f"{domain}.{key}":is_filled(value) for key,value in domain_section(intake,domain).items() if key not in QUESTION_KEYS}
+
+def scan_questions(intake:Dict[str,Any],domains:List[str])->Dict[str,Dict[str,Any]]:
+    found:List[Tuple[str,Optional[str]]]=[(q,None) for q in intake.get("missing_info") or [] if isinstance(q,str)]
+    for domain in domains:
+        section=domain_section(intake,domain)
+        for key in QUESTION_KEYS:
+            if isinstance(section.get(key),list):
+                found.extend((q,domain) for q in section[key] if isinstance(q,str))
+    questions={}
+    for text,domain in found:
+        nq=normalize_question(text)
+        if nq and nq not in questions:
+            questions[nq]={"text":text.strip(),"domain":domain}
+    return questions
+
+def build_state(intake:Dict[str,Any],domains:List[str])->IntakeState:
+    filled=scan_general(intake)
+    for domain in domains:
+        filled.update(scan_domain(intake,domain))
+    return IntakeState(domains=list(domains),filled=filled,questions=scan_questions(intake,domains))
+
+def summarize(state:IntakeState)->Dict[str,Any]:
+    # Same shape as missing_info_handler.summarize_missing_info, read from the per-field state.
+    missing_critical=[k for k in CRITICAL_KEYS if not state.filled.get(k)]
+    missing_optional=[k for k in OPTIONAL_KEYS if not state.filled.get(k)]
+    return {
+        "is_complete":not missing_critical,
+        "missing_keys":missing_critical+missing_optional,
+        "missing_critical":missing_critical,
+        "missing_optional":missing_optional,
+        "missing_domain_fields":[k for k,v in state.filled.items() if "." in k and not v],
+        "follow_up_questions":[q["text"] for q in state.questions.values()]
+    }
+
+def route_reply(state:IntakeState,reply:str)->List[str]:
+    # A domain is touched when the reply shares words with its name, its field names or a question it asked.
+    words=set(tokenize(reply))
+    terms:Dict[str,Set[str]]={d:set(tokenize(d.replace("_"," ")))-GENERIC_DOMAIN_WORDS for d in state.domains}
+    for key in state.filled:
+        domain=key.split(".",1)[0]
+        if domain in terms:
+            terms[domain].update(tokenize(field_label(key)))
+    for nq in state.asked:
+        question=state.questions.get(nq)
+        if question and question["domain"] in terms:
+            terms[question["domain"]].update(tokenize(question["text"]))
+    return [d for d in state.domains if words&terms[d]]
+
+def split_reply(reply:str)->List[str]:
+    return [p.strip() for p in re.split(r"(?<=\?)\s+|[;\n.]+",reply) if p.strip()]
+
+def local_updates(reply:str)->Dict[str,Any]:
+    parts=split_reply(reply)
+    return {
+        "facts":[p for p in parts if not p.endswith("?")],
+        "legal_questions":[p for p in parts if p.endswith("?")],
+        "timeline":[p for p in parts if DATE_RE.search(p) and not p.endswith("?")]
+    }
+
+def load_update_prompt()->str:
+    with open(Path("prompt_temp")/"followup_update.txt","r",encoding="utf-8") as f:
+        return f.read()
+
+def parse_updates(txt:str,domains:List[str])->Dict[str,Any]:
+    try:
+        data=json.loads(txt)
+    except json.JSONDecodeError:
+        logger.error("Follow-up update returned invalid JSON: %s",txt)
+        return {}
+    if not isinstance(data,dict):
+        return {}
+    # Only the routed domains may change; anything else in the reply is ignored.
+    out={k:data[k] for k in LIST_KEYS if isinstance(data.get(k),list)}
+    out.update({d:data[d] for d in domains if isinstance(data.get(d),dict)})
+    return out
+
+@traced("update_intake")
+def llm_updates(intake:Dict[str,Any],reply:str,domains:List[str],questions:List[str])->Dict[str,Any]:
+    payload={
+        "questions_asked":questions,
+        "current":{d:domain_section(intake,d) for d in domains},
+        "reply":reply
+    }
+    txt=cached_chat_completion(
+        get_openai_client(),
+        model=FOLLOWUP_MODEL,
+        response_format={"type":"json_object"},
+        messages=[
+            {"role":"system","content":load_update_prompt()},
+            {"role":"user","content":json.dumps(payload,ensure_ascii=False)}
+        ],
+        temperature=0.0
+    ).strip()
+    updates=parse_updates(txt,domains)
+    record(domains=len(domains),updated=len([d for d in domains if d in updates]))
+    return updates
+
+@traced("apply_reply")
+def apply_reply(intake:Dict[str,Any],state:IntakeState,reply:str)->Dict[str,Any]:
+    # One follow-up turn: cheap local extraction always, plus at most one LLM call scoped to the
+    # domains the reply touches. Only those domains and the general fields are re-scanned.
+    intake=merge_user_responses(intake,local_updates(reply))
+    domains=route_reply(state,reply)
+    if domains:
+        asked=[state.questions[nq]["text"] for nq in state.asked if nq in state.questions]
+        try:
+            intake=merge_user_responses(intake,llm_updates(intake,reply,domains,asked))
+            state.llm_calls+=1
+        except Exception as e:
+            logger.error("Follow-up update failed for %s: %s",", ".join(domains),e)
+    state.filled.update(scan_general(intake))
+    for domain in domains:
+        state.filled.update(scan_domain(intake,domain))
+    for nq,question in scan_questions(intake,domains).items():
+        state.questions.setdefault(nq,question)
+    state.turns+=1
+    record(routed=len(domains),llm_calls=1 if domains else 0,missing=len([k for k,v in state.filled.items() if not v]))
+    return intake
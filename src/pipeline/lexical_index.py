@@ -0,0 +1,119 @@
+import os
+import re
+import json
+from collections import Counter
+from typing import Dict,Iterable,List,Optional,Tuple
+import numpy as np
+from src.pipeline.store_registry import replace_file
+
+LEXICAL_DIR_NAME="bm25"
+TOKEN_RE=re.compile(r"[a-z0-9]+")
+STOPWORDS=frozenset("""
+a an and are as at be been but by for from had has have he her his i if in into is it its me my of on or our she
+so that the their them then there these they this to was we were what when where which who will with you your
+""".split())
+
+def tokenize(text:str)->List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+class BM25Index:
+    def __init__(self,vocab:Dict[str,int],offsets:np.ndarray,docs:np.ndarray,tfs:np.ndarray,doc_len:np.ndarray,k1:float=1.2,b:float=0.75):
+        self.vocab=vocab
+        self.offsets=offsets
+        self.docs=docs
+        self.tfs=tfs
+        self.doc_len=doc_len
+        self.k1=k1
+        self.b=b
+        self.n_docs=len(doc_len)
+        self.avg_len=float(doc_len.mean()) if self.n_docs else 0.0
+
+    @classmethod
+    def build(cls,texts:Iterable[str],k1:float=1.2,b:float=0.75)->"BM25Index":
+        postings:Dict[str,List[Tuple[int,int]]]={}
+        lengths=[]
+        for position,text in enumerate(texts):
+            tokens=tokenize(text)
+            lengths.append(len(tokens))
+            for term,tf in Counter(tokens).items():
+                postings.setdefault(term,[]).append((position,tf))
+        terms=sorted(postings)
+        vocab={t:i for i,t in enumerate(terms)}
+        offsets=np.zeros(len(terms)+1,dtype="int64")
+        for i,t in enumerate(terms):
+            offsets[i+1]=offsets[i]+len(postings[t])
+        docs=np.empty(int(offsets[-1]),dtype="int32")
+        tfs=np.empty(int(offsets[-1]),dtype="uint16")
+        for i,t in enumerate(terms):
+            start,end=offsets[i],offsets[i+1]
+            block=postings.pop(t)
+            docs[start:end]=[p for p,_ in block]
+            tfs[start:end]=[min(tf,65535) for _,tf in block]
+        return cls(vocab,offsets,docs,tfs,np.asarray(lengths,dtype="uint32"),k1,b)
+
+    def search(self,query:str,k:int=5)->List[Tuple[int,float]]:
+        if self.n_docs==0:
+            return []
+        scores=np.zeros(self.n_docs,dtype="float32")
+        matched=False
+        for term in set(tokenize(query)):
+            idx=self.vocab.get(term)
+            if idx is None:
+                continue
+            start,end=int(self.offsets[idx]),int(self.offsets[idx+1])
+            docs=self.docs[start:end]
+            tf=self.tfs[start:end].astype("float32")
+            df=end-start
+            idf=np.log(1.0+(self.n_docs-df+0.5)/(df+0.5))
+            norm=self.k1*(1.0-self.b+self.b*self.doc_len[docs]/self.avg_len)
+            scores[docs]+=idf*tf*(self.k1+1.0)/(tf+norm)
+            matched=True
+        if not matched:
+            return []
+        k=min(k,self.n_docs)
+        top=np.argpartition(-scores,k-1)[:k]
+        top=top[np.argsort(-scores[top])]
+        return [(int(p),float(scores[p])) for p in top if scores[p]>0]
+
+    def save(self,path:str)->None:
+        os.makedirs(path,exist_ok=True)
+        for name,array in (("offsets",self.offsets),("docs",self.docs),("tfs",self.tfs),("doc_len",self.doc_len)):
+            replace_file(os.path.join(path,f"{name}.npy"),lambda tmp,array=array:_save_array(tmp,array))
+        meta={"k1":self.k1,"b":self.b,"terms":sorted(self.vocab,key=self.vocab.get)}
+        replace_file(os.path.join(path,"vocab.json"),lambda tmp:_save_json(tmp,meta))
+
+    @classmethod
+    def load(cls,path:str,mmap:bool=True)->"BM25Index":
+        mode="r" if mmap else None
+        with open(os.path.join(path,"vocab.json"),"r",encoding="utf-8") as f:
+            meta=json.load(f)
+        return cls(
+            {t:i for i,t in enumerate(meta["terms"])},
+            np.load(os.path.join(path,"offsets.npy"),mmap_mode=mode),
+            np.load(os.path.join(path,"docs.npy"),mmap_mode=mode),
+            np.load(os.path.join(path,"tfs.npy"),mmap_mode=mode),
+            np.load(os.path.join(path,"doc_len.npy"),mmap_mode=mode),
+            meta["k1"],meta["b"]
+        )
+
+def _save_array(path:str,array:np.ndarray)->None:
+    # A file object, because np.save would append ".npy" to the temp name.
+    with open(path,"wb") as f:
+        np.save(f,array)
+
+def _save_json(path:str,data:Dict)->None:
+    with open(path,"w",encoding="utf-8") as f:
+        json.dump(data,f)
+
+def load_lexical_index(save_path:str,mmap:bool=True)->Optional[BM25Index]:
+    path=os.path.join(save_path,LEXICAL_DIR_NAME)
+    if not os.path.exists(os.path.join(path,"vocab.json")):
+        return None
+    return BM25Index.load(path,mmap)
+
+def reciprocal_rank_fusion(rankings:List[List[int]],k:int=60)->List[Tuple[int,float]]:
+    fused:Dict[int,float]={}
+    for ranking in rankings:
+        for rank,position in enumerate(ranking):
+            fused[position]=fused.get(position,0.0)+1.0/(k+rank+1)
+    return sorted(fused.items(),key=lambda t:-t[1])
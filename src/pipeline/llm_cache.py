@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any,Dict,List,Optional
+from src.pipeline.llm_utils import call_with_retry,LLM_TIMEOUT_SECONDS
+from src.pipeline.tracing import span
+
+LLM_CACHE_PATH=os.getenv("LLM_CACHE_PATH",os.path.join(".cache","llm_cache.sqlite3"))
+LLM_CACHE_TTL_SECONDS=float(os.getenv("LLM_CACHE_TTL_SECONDS",str(7*24*3600)))
+LLM_CACHE_MAX_ENTRIES=int(os.getenv("LLM_CACHE_MAX_ENTRIES","10000"))
+LLM_CACHE_DISABLED=os.getenv("LLM_CACHE_DISABLED","").lower() in ("1","true","yes")
+
+def cache_key(model:str,messages:List[Dict[str,Any]],temperature:Optional[float]=None,response_format:Optional[Dict[str,Any]]=None)->str:
+    payload=json.dumps({
+        "model":model,
+        "temperature":temperature,
+        "messages":messages,
+        "response_format":response_format
+    },sort_keys=True,ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    def __init__(self,path:str=LLM_CACHE_PATH,ttl_seconds:float=LLM_CACHE_TTL_SECONDS,max_entries:int=LLM_CACHE_MAX_ENTRIES,enabled:bool=not LLM_CACHE_DISABLED):
+        self.path=path
+        self.ttl_seconds=ttl_seconds
+        self.max_entries=max_entries
+        self.enabled=enabled
+        self.hits=0
+        self.misses=0
+        self._lock=threading.Lock()
+        self._conn=None
+
+    def _connection(self)->sqlite3.Connection:
+        if self._conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path),exist_ok=True)
+            conn=sqlite3.connect(self.path,check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, value TEXT, created REAL, accessed REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+            conn.commit()
+            self._conn=conn
+        return self._conn
+
+    def get(self,key:str)->Optional[str]:
+        if not self.enabled:
+            return None
+        now=time.time()
+        with self._lock:
+            conn=self._connection()
+            row=conn.execute("SELECT value, created FROM responses WHERE key=?",(key,)).fetchone()
+            if row is None or (self.ttl_seconds>0 and now-row[1]>self.ttl_seconds):
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key=?",(key,))
+                    conn.commit()
+                self.misses+=1
+                return None
+            conn.execute("UPDATE responses SET accessed=? WHERE key=?",(now,key))
+            conn.commit()
+            self.hits+=1
+            return row[0]
+
+    def set(self,key:str,value:str,model:str="")->None:
+        if not self.enabled:
+            return
+        now=time.time()
+        with self._lock:
+            conn=self._connection()
+            conn.execute("INSERT OR REPLACE INTO responses (key, model, value, created, accessed) VALUES (?,?,?,?,?)",(key,model,value,now,now))
+            self._evict(conn,now)
+            conn.commit()
+
+    def _evict(self,conn:sqlite3.Connection,now:float)->None:
+        if self.ttl_seconds>0:
+            conn.execute("DELETE FROM responses WHERE created<?",(now-self.ttl_seconds,))
+        if self.max_entries>0:
+            (count,)=conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+            if count>self.max_entries:
+                conn.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",(count-self.max_entries,))
+
+    def clear(self)->None:
+        with self._lock:
+            conn=self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self.hits=0
+            self.misses=0
+
+    def stats(self)->Dict[str,Any]:
+        total=self.hits+self.misses
+        return {
+            "enabled":self.enabled,
+            "hits":self.hits,
+            "misses":self.misses,
+            "hit_rate":(self.hits/total) if total else 0.0
+        }
+
+_cache:Optional[LLMCache]=None
+_cache_lock=threading.Lock()
+
+def get_llm_cache()->LLMCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache=LLMCache()
+    return _cache
+
+def record_usage(current:Any,response:Any)->None:
+    usage=getattr(response,"usage",None)
+    if usage is not None:
+        current.attrs["tokens_in"]=getattr(usage,"prompt_tokens",0) or 0
+        current.attrs["tokens_out"]=getattr(usage,"completion_tokens",0) or 0
+
+def cached_chat_completion(client:Any,model:str,messages:List[Dict[str,Any]],temperature:Optional[float]=None,response_format:Optional[Dict[str,Any]]=None,bypass:bool=False)->str:
+    with span("llm.chat",model=model) as current:
+        cache=get_llm_cache()
+        key=cache_key(model,messages,temperature,response_format)
+        if not bypass:
+            cached=cache.get(key)
+            if cached is not None:
+                current.attrs["cache_hit"]=True
+                return cached
+        current.attrs["cache_hit"]=False
+        params={"model":model,"messages":messages,"timeout":LLM_TIMEOUT_SECONDS}
+        if temperature is not None:
+            params["temperature"]=temperature
+        if response_format is not None:
+            params["response_format"]=response_format
+        response=call_with_retry(client.chat.completions.create,**params)
+        record_usage(current,response)
+        choice=response.choices[0]
+        content=choice.message.content or ""
+        # An empty or cut-off answer would otherwise be replayed for the whole TTL.
+        if content.strip() and getattr(choice,"finish_reason",None) not in ("length","content_filter"):
+            cache.set(key,content,model)
+        return content
@@ -0,0 +1,60 @@
+import os
+import random
+import time
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any,Callable,Dict,Iterable,Optional,Tuple
+
+logger=logging.getLogger(__name__)
+
+LLM_MAX_CONCURRENCY=int(os.getenv("LLM_MAX_CONCURRENCY","4"))
+LLM_TIMEOUT_SECONDS=float(os.getenv("LLM_TIMEOUT_SECONDS","60"))
+LLM_MAX_RETRIES=int(os.getenv("LLM_MAX_RETRIES","3"))
+LLM_BACKOFF_SECONDS=float(os.getenv("LLM_BACKOFF_SECONDS","1.0"))
+
+def _retry_after(error:Exception)->Optional[float]:
+    response=getattr(error,"response",None)
+    headers=getattr(response,"headers",None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError,ValueError):
+        return None
+
+def call_with_retry(fn:Callable[...,Any],*args,max_retries:int=LLM_MAX_RETRIES,backoff:float=LLM_BACKOFF_SECONDS,**kwargs)->Any:
+    from openai import RateLimitError
+    attempt=0
+    while True:
+        try:
+            return fn(*args,**kwargs)
+        except RateLimitError as e:
+            if attempt>=max_retries:
+                raise
+            delay=_retry_after(e)
+            if delay is None:
+                delay=backoff*(2**attempt)*(1+random.random()*0.25)
+            logger.warning("Rate limited, retrying in %.1fs (attempt %d/%d)",delay,attempt+1,max_retries)
+            time.sleep(delay)
+            attempt+=1
+
+def map_concurrently(fn:Callable[[Any],Any],items:Iterable[Any],max_workers:int=LLM_MAX_CONCURRENCY)->Dict[Any,Tuple[bool,Any]]:
+    items=list(items)
+    if not items:
+        return {}
+    outcomes={}
+    if max_workers<=1 or len(items)==1:
+        for item in items:
+            try:
+                outcomes[item]=(True,fn(item))
+            except Exception as e:
+                outcomes[item]=(False,e)
+        return outcomes
+    with ThreadPoolExecutor(max_workers=min(max_workers,len(items))) as pool:
+        # Each task runs in a copy of the caller's context so trace spans nest under the caller.
+        futures={item:pool.submit(contextvars.copy_context().run,fn,item) for item in items}
+        for item,future in futures.items():
+            try:
+                outcomes[item]=(True,future.result())
+            except Exception as e:
+                outcomes[item]=(False,e)
+    return outcomes
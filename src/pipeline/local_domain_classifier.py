@@ -0,0 +1,124 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict,List,Optional,Tuple
+import numpy as np
+from src.pipeline.store_registry import get_registry
+
+DOMAIN_MIN_SIMILARITY=float(os.getenv("DOMAIN_MIN_SIMILARITY","0.30"))
+DOMAIN_MARGIN=float(os.getenv("DOMAIN_MARGIN","0.06"))
+DOMAIN_CONFIDENT_SIMILARITY=float(os.getenv("DOMAIN_CONFIDENT_SIMILARITY","0.45"))
+DOMAIN_MAX_LABELS=int(os.getenv("DOMAIN_MAX_LABELS","4"))
+
+DOMAIN_EXAMPLES:Dict[str,List[str]]={
+    "criminal_law":[
+        "Someone stole my phone and I want to file a police complaint",
+        "I was arrested and charged with assault after a fight",
+        "My business partner cheated me out of money with forged documents"
+    ],
+    "civil_law":[
+        "My neighbour keeps defaming me and I want to sue for damages",
+        "I lent money to a friend who refuses to pay it back",
+        "I want an injunction to stop someone blocking my access road"
+    ],
+    "family_law":[
+        "I want a divorce and custody of my children",
+        "My husband refuses to pay maintenance after we separated",
+        "How do I register an inter-faith marriage"
+    ],
+    "employment_law":[
+        "My employer has not paid my salary for three months",
+        "I was fired without notice after complaining about overtime",
+        "My boss refuses to pay compensation for an injury at work"
+    ],
+    "accident_law":[
+        "I was hit by a car while crossing the road and broke my leg",
+        "A bus crashed into my scooter and the insurer won't pay",
+        "Who pays for my medical bills after a road accident"
+    ],
+    "sexual_offense":[
+        "My colleague sexually harassed me at the office",
+        "A relative sexually abused my child",
+        "Someone is stalking me and sending obscene messages"
+    ],
+    "juvenile_law":[
+        "My 16 year old son was caught by police for theft",
+        "A minor was employed as a domestic worker in our building",
+        "How does juvenile court handle a teenager accused of a crime"
+    ],
+    "property_law":[
+        "My landlord won't return my security deposit",
+        "A relative is illegally occupying my inherited land",
+        "The builder has not handed over my flat after years"
+    ],
+    "consumer_law":[
+        "The store refuses to replace a defective washing machine",
+        "An online seller took my money and never delivered the product",
+        "My bank charged hidden fees on my account"
+    ],
+    "contract_law":[
+        "The other party breached our supply agreement",
+        "A contractor took the advance and abandoned the renovation",
+        "Can I cancel a contract I signed under pressure"
+    ],
+    "cyber_law":[
+        "My social media account was hacked and used for fraud",
+        "Someone leaked my private photos online",
+        "I lost money to a phishing link sent by SMS"
+    ],
+    "public_services":[
+        "The government office ignored my RTI application",
+        "An official demanded a bribe to issue my certificate",
+        "My pension has been stuck with the department for a year"
+    ]
+}
+
+class LocalDomainClassifier:
+    def __init__(self,domains:List[str],prompt_dir:str="prompt_temp",examples:Optional[Dict[str,List[str]]]=None):
+        self.domains=list(domains)
+        self.prompt_dir=Path(prompt_dir)
+        self.examples=DOMAIN_EXAMPLES if examples is None else examples
+        self._prototypes:Optional[np.ndarray]=None
+        self._owners:Optional[np.ndarray]=None
+        self._lock=threading.Lock()
+
+    def _prototype_texts(self)->Tuple[List[str],List[int]]:
+        texts=[]
+        owners=[]
+        for i,domain in enumerate(self.domains):
+            path=self.prompt_dir/f"{domain}.txt"
+            if path.exists():
+                texts.append(path.read_text(encoding="utf-8"))
+                owners.append(i)
+            for example in self.examples.get(domain,[]):
+                texts.append(example)
+                owners.append(i)
+        return texts,owners
+
+    def _ensure_prototypes(self)->None:
+        if self._prototypes is not None:
+            return
+        with self._lock:
+            if self._prototypes is not None:
+                return
+            texts,owners=self._prototype_texts()
+            vectors=np.asarray(get_registry().get_embedder().embed_documents(texts),dtype="float32")
+            vectors/=np.linalg.norm(vectors,axis=1,keepdims=True)+1e-12
+            self._owners=np.asarray(owners,dtype="int64")
+            self._prototypes=vectors
+
+    def scores(self,query:str)->Dict[str,float]:
+        self._ensure_prototypes()
+        vector=np.asarray(get_registry().get_embedder().embed_query(query),dtype="float32")
+        vector/=np.linalg.norm(vector)+1e-12
+        sims=self._prototypes@vector
+        best=np.full(len(self.domains),-1.0,dtype="float32")
+        np.maximum.at(best,self._owners,sims)
+        return {d:float(s) for d,s in zip(self.domains,best)}
+
+    def classify(self,query:str,min_similarity:float=DOMAIN_MIN_SIMILARITY,margin:float=DOMAIN_MARGIN,max_labels:int=DOMAIN_MAX_LABELS)->Tuple[List[str],float]:
+        ranked=sorted(self.scores(query).items(),key=lambda t:-t[1])
+        top=ranked[0][1] if ranked else 0.0
+        cutoff=max(min_similarity,top-margin)
+        labels=[d for d,s in ranked if s>=cutoff][:max_labels]
+        return labels,top
@@ -1,26 +1,56 @@
-from typing import Dict,Any
+import re
+from typing import Dict,Any,List
+
+LIST_KEYS=("facts","timeline","entities","legal_questions")
+
+def _key(item:Any)->Any:
+    return re.sub(r"\s+"," ",item.strip().lower()) if isinstance(item,str) else repr(item)
+
+def as_list(value:Any)->List[Any]:
+    # The formatter and the update call sometimes return one string where a list is expected.
+    if value in (None,"",[],{}):
+        return []
+    return list(value) if isinstance(value,(list,tuple)) else [value]
+
+def ordered_unique(*lists:Any)->List[Any]:
+    # First occurrence wins, so facts keep the order the user told them in.
+    seen=set();out=[]
+    for items in lists:
+        for item in as_list(items):
+            key=_key(item)
+            if key and key not in seen and item not in (None,"",[],{}):
+                seen.add(key);out.append(item)
+    return out
+
+def _merge_section(section:Dict[str,Any],updates:Dict[str,Any])->Dict[str,Any]:
+    for key,value in updates.items():
+        if value in (None,"",[],{}):
+            continue
+        if isinstance(value,list) or isinstance(section.get(key),list):
+            section[key]=ordered_unique(section[key],value)
+        else:
+            section[key]=value
+    return section
 
 def merge_user_responses(intake:Dict[str,Any],answers:Dict[str,Any])->Dict[str,Any]:
     if "country" in answers and answers["country"]:
         intake["country"]=answers["country"]
 
-    if "facts" in answers and answers["facts"]:
-        existing_facts=intake.get("facts",[])
-        intake["facts"]=list(set(existing_facts+answers["facts"]))
-
-    if "legal_questions" in answers and answers["legal_questions"]:
-        existing_qs=intake.get("legal_questions",[])
-        intake["legal_questions"]=list(set(existing_qs+answers["legal_questions"]))
+    for key in LIST_KEYS:
+        if key in answers and answers[key]:
+            intake[key]=ordered_unique(intake.get(key,[]),answers[key])
 
     domain_specific=intake.get("domain_specific",{})
     for domain,data in domain_specific.items():
         if domain in answers and isinstance(answers[domain],dict):
             if "facts" in answers[domain] and answers[domain]["facts"]:
-                domain_facts=data.get("facts",[])
-                data["facts"]=list(set(domain_facts+answers[domain]["facts"]))
+                data["facts"]=ordered_unique(data.get("facts",[]),answers[domain]["facts"])
             if "legal_questions" in answers[domain] and answers[domain]["legal_questions"]:
-                domain_qs=data.get("legal_questions",[])
-                data["legal_questions"]=list(set(domain_qs+answers[domain]["legal_questions"]))
+                data["legal_questions"]=ordered_unique(data.get("legal_questions",[]),answers[domain]["legal_questions"])
             domain_specific[domain]=data
     intake["domain_specific"]=domain_specific
+    # The formatter keeps each domain's own fields under a top-level key named after it.
+    for domain,updates in answers.items():
+        if isinstance(updates,dict) and isinstance(intake.get(domain),dict):
+            _merge_section(intake[domain],updates)
     return intake
@@ -1,24 +1,20 @@
-import os
 import json
 from typing import Dict, List, Tuple, Any
-from dotenv import load_dotenv
-from openai import OpenAI
-
-load_dotenv()
-_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from src.pipeline.llm_cache import cached_chat_completion
+from src.pipeline.clients import get_openai_client
 
 def _llm_followups(intake:Dict[str,Any])->List[str]:
     try:
         prompt="You are a lawyer conducting an intake. Given the JSON below, return ONLY a JSON array of concise follow-up questions that would help you give initial legal guidance. Do not include explanations."
-        r=_client.chat.completions.create(
+        txt=cached_chat_completion(
+            get_openai_client(),
             model="gpt-4o-mini",
             temperature=0.2,
             messages=[
                 {"role":"system","content":prompt},
                 {"role":"user","content":json.dumps(intake,ensure_ascii=False)}
             ]
-        )
-        txt=r.choices[0].message.content.strip()
+        ).strip()
         if txt.startswith("```"):
             if txt.lower().startswith("```json"):
                 txt=txt[7:].lstrip()
@@ -0,0 +1,118 @@
+from dataclasses import dataclass,field
+from typing import Any,Dict,Iterator,List,Optional,Set,Tuple
+from src.pipeline import domain_classifier,intake_parser,intake_formatter,intake_state,reasoner
+from src.pipeline.missing_info_handler import summarize_missing_info
+from src.pipeline.intake_state import IntakeState,normalize_question
+from src.pipeline.tracing import span
+
+GREETING="Hi! Describe your legal situation."
+CLOSING="If you’d like, share more details or ask follow-up questions."
+FINAL_QUESTION="I have most of the important details. Anything else you'd like to add before I advise?"
+FALLBACK_QUESTION="Please add any missing facts, dates, parties, and what outcome you want."
+MAX_FOLLOWUP_INPUT_CHARS=1500
+
+@dataclass
+class ChatSession:
+    country_code:str
+    phase:str="greeting"
+    intake:Optional[Dict[str,Any]]=None
+    predicted_domains:List[str]=field(default_factory=list)
+    answered_followups:Set[str]=field(default_factory=set)
+    extra_countries:List[str]=field(default_factory=list)
+    state:Optional[IntakeState]=None
+
+def pending_followups(session:ChatSession)->List[Tuple[str,str]]:
+    check=intake_state.summarize(session.state) if session.state else summarize_missing_info(session.intake or {})
+    fq_all=check.get("follow_up_questions") or []
+    unique_norm=[]
+    for q in fq_all:
+        nq=normalize_question(q)
+        if nq and nq not in session.answered_followups:
+            unique_norm.append((nq,q))
+    if check.get("is_complete"): return []
+    if (not check.get("missing_keys",[])) or (not check.get("missing_critical",[])):
+        if not unique_norm:
+            nq=normalize_question(FINAL_QUESTION)
+            if nq not in session.answered_followups:
+                unique_norm=[(nq,FINAL_QUESTION)]
+    if not unique_norm and not check.get("is_complete"):
+        nq=normalize_question(FALLBACK_QUESTION)
+        if nq not in session.answered_followups:
+            unique_norm=[(nq,FALLBACK_QUESTION)]
+    return unique_norm
+
+def followup_message(questions:List[Tuple[str,str]])->str:
+    bullets="\n".join([f"- {orig}" for _,orig in questions])
+    return f"To advise properly, I need a few details:\n{bullets}\n\nReply in one message. You can answer in short phrases."
+
+def ensure_domain_specific(intake:Dict[str,Any])->Dict[str,Any]:
+    if not intake.get("domain_specific") and intake.get("domains"):
+        gf=intake.get("facts",[]) or []
+        gq=intake.get("legal_questions",[]) or []
+        intake["domain_specific"]={d:{"facts":list(gf),"legal_questions":list(gq)} for d in intake["domains"]}
+    return intake
+
+def build_intake(user_msg:str,domains:List[str],country_code:str)->Dict[str,Any]:
+    raw_outputs=intake_parser.run_domain_intake(user_msg,domains)
+    intake=intake_formatter.format_and_merge_intake(raw_outputs)
+    intake["country"]=country_code
+    return ensure_domain_specific(intake)
+
+def start_case(session:ChatSession,user_msg:str)->List[str]:
+    session.predicted_domains=domain_classifier.classify_domains(user_msg)
+    session.intake=build_intake(user_msg,session.predicted_domains,session.country_code)
+    session.state=intake_state.build_state(session.intake,session.predicted_domains)
+    session.phase="followups"
+    needed=pending_followups(session)
+    if not needed:
+        session.phase="reason"
+        return []
+    session.state.asked=[nq for nq,_ in needed]
+    return [followup_message(needed)]
+
+def answer_followups(session:ChatSession,user_msg:str)->List[str]:
+    # Follow-ups update the intake in place instead of re-running the per-domain intake chain.
+    if session.state is None:
+        session.state=intake_state.build_state(session.intake or {},session.predicted_domains)
+    session.intake=intake_state.apply_reply(session.intake or {},session.state,user_msg[:MAX_FOLLOWUP_INPUT_CHARS])
+    asked_now=pending_followups(session)
+    for nq,_ in asked_now: session.answered_followups.add(nq)
+    session.state.asked=[nq for nq,_ in asked_now]
+    if not asked_now:
+        session.phase="reason"
+        return []
+    return [followup_message(asked_now)]
+
+def handle_message(session:ChatSession,user_msg:str)->List[str]:
+    with span("chat_turn",phase=session.phase):
+        if session.phase in ("greeting","intake") and session.intake is None:
+            return start_case(session,user_msg)
+        if session.phase=="followups":
+            return answer_followups(session,user_msg)
+        return []
+
+def retrieve(session:ChatSession)->Dict[str,List[Dict[str,Any]]]:
+    # Imported here so intake turns never pay for the retrieval stack.
+    from src.pipeline import retriever
+    intake=session.intake
+    if session.extra_countries:
+        # Cross-border cases also search the other selected jurisdictions.
+        intake=dict(intake,countries=[session.country_code]+[c for c in session.extra_countries if c!=session.country_code])
+    return retriever.retrieve_relevant_laws(intake)
+
+def reason(session:ChatSession,retrieved_laws:Optional[Dict[str,List[Any]]]=None)->Dict[str,str]:
+    with span("chat_reason"):
+        if retrieved_laws is None:
+            retrieved_laws=retrieve(session)
+        answer=reasoner.reason_on_case(session.intake,retrieved_laws)
+        session.phase="done"
+        return answer
+
+def stream_reason(session:ChatSession,retrieved_laws:Optional[Dict[str,List[Any]]]=None)->Iterator[Tuple[str,str]]:
+    if retrieved_laws is None:
+        retrieved_laws=retrieve(session)
+    yield from reasoner.stream_reason_on_case(session.intake,retrieved_laws)
+    session.phase="done"
+
+def domain_heading(domain:str)->str:
+    return f"### {domain.replace('_',' ').title()}\n\n"
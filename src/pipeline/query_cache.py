@@ -0,0 +1,113 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any,Dict,Optional,Tuple
+import numpy as np
+
+QUERY_CACHE_MAX_ENTRIES=int(os.getenv("QUERY_CACHE_MAX_ENTRIES","512"))
+QUERY_CACHE_SIMILARITY=float(os.getenv("QUERY_CACHE_SIMILARITY","0.95"))
+QUERY_CACHE_DISABLED=os.getenv("QUERY_CACHE_DISABLED","").lower() in ("1","true","yes")
+
+def normalize_query(text:str)->str:
+    return re.sub(r"\s+"," ",re.sub(r"[^\w\s]"," ",text.lower())).strip()
+
+class _CountryCache:
+    def __init__(self,version:Any):
+        self.version=version
+        self.entries:"OrderedDict[str,Tuple[Optional[np.ndarray],int,Any]]"=OrderedDict()
+
+class SemanticQueryCache:
+    def __init__(self,max_entries:int=QUERY_CACHE_MAX_ENTRIES,similarity:float=QUERY_CACHE_SIMILARITY,enabled:bool=not QUERY_CACHE_DISABLED):
+        self.max_entries=max_entries
+        self.similarity=similarity
+        self.enabled=enabled
+        self.exact_hits=0
+        self.semantic_hits=0
+        self.misses=0
+        self.invalidations=0
+        self._countries:Dict[str,_CountryCache]={}
+        self._lock=threading.Lock()
+
+    def _country(self,country:str,version:Any)->_CountryCache:
+        cache=self._countries.get(country)
+        if cache is None or cache.version!=version:
+            if cache is not None:
+                self.invalidations+=1
+            cache=_CountryCache(version)
+            self._countries[country]=cache
+        return cache
+
+    def get_exact(self,country:str,version:Any,query:str,k:int)->Optional[Any]:
+        if not self.enabled:
+            return None
+        key=normalize_query(query)
+        with self._lock:
+            cache=self._country(country,version)
+            entry=cache.entries.get(key)
+            if entry is None or entry[1]<k:
+                return None
+            cache.entries.move_to_end(key)
+            self.exact_hits+=1
+            return entry[2]
+
+    def get_semantic(self,country:str,version:Any,vector:np.ndarray,k:int)->Optional[Any]:
+        if not self.enabled:
+            self.misses+=1
+            return None
+        with self._lock:
+            cache=self._country(country,version)
+            keys=[key for key,(v,cached_k,_) in cache.entries.items() if v is not None and cached_k>=k]
+            if keys:
+                matrix=np.vstack([cache.entries[key][0] for key in keys])
+                sims=matrix@vector
+                best=int(np.argmax(sims))
+                if sims[best]>=self.similarity:
+                    cache.entries.move_to_end(keys[best])
+                    self.semantic_hits+=1
+                    return cache.entries[keys[best]][2]
+            self.misses+=1
+            return None
+
+    def put(self,country:str,version:Any,query:str,vector:Optional[np.ndarray],k:int,value:Any)->None:
+        if not self.enabled:
+            return
+        key=normalize_query(query)
+        with self._lock:
+            cache=self._country(country,version)
+            cache.entries[key]=(vector,k,value)
+            cache.entries.move_to_end(key)
+            while len(cache.entries)>self.max_entries:
+                cache.entries.popitem(last=False)
+
+    def invalidate(self,country:Optional[str]=None)->None:
+        with self._lock:
+            if country is None:
+                self._countries.clear()
+            else:
+                self._countries.pop(country,None)
+
+    def stats(self)->Dict[str,Any]:
+        with self._lock:
+            hits=self.exact_hits+self.semantic_hits
+            total=hits+self.misses
+            return {
+                "enabled":self.enabled,
+                "exact_hits":self.exact_hits,
+                "semantic_hits":self.semantic_hits,
+                "misses":self.misses,
+                "hit_rate":(hits/total) if total else 0.0,
+                "invalidations":self.invalidations,
+                "entries":{c:len(cache.entries) for c,cache in self._countries.items()}
+            }
+
+_cache:Optional[SemanticQueryCache]=None
+_cache_lock=threading.Lock()
+
+def get_query_cache()->SemanticQueryCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache=SemanticQueryCache()
+    return _cache
@@ -1,41 +1,42 @@
-import os
-from typing import Dict,Any,List
-from openai import OpenAI
-from dotenv import load_dotenv
-load_dotenv()
-client=OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import queue
+import threading
+import contextvars
+from typing import Dict,Any,List,Iterator,Optional,Tuple
+from src.pipeline.llm_utils import call_with_retry,map_concurrently,LLM_MAX_CONCURRENCY,LLM_TIMEOUT_SECONDS
+from src.pipeline.llm_cache import cached_chat_completion,cache_key,get_llm_cache,record_usage
+from src.pipeline.clients import get_openai_client
+from src.pipeline.tracing import span,traced,record
+from src.pipeline.context_packer import count_tokens,pack_documents,REASONER_CONTEXT_TOKENS,MIN_PARTIAL_TOKENS
+from src.pipeline.statutes import section_name
 
-def format_reasoner_prompt(domain:str,domain_data:Dict[str,Any],retrieved_docs:List[Any],country:str)->str:
-    facts="\n".join(domain_data.get("facts",[]))
-    legal_questions="\n".join(domain_data.get("legal_questions",[]))
+def _unique(items:List[Any])->List[str]:
+    seen=set();out=[]
+    for item in items or []:
+        if isinstance(item,str) and item.strip() and item not in seen:
+            out.append(item);seen.add(item)
+    return out
+
+def format_law_citation(doc:Dict[str,Any],country:str)->str:
+    snippet=doc.get("content","")
+    section=str(doc.get("section") or "").strip()
+    act=str(doc.get("act") or "").strip()
+    jurisdiction=str(doc.get("jurisdiction") or country.upper()).strip()
+    title=str(doc.get("title") or "").strip()
+    if section and act:
+        return f"As per {section_name(str(doc.get('section_label') or ''),section)} of the {act} ({jurisdiction}) — {snippet}"
+    elif title:
+        return f"{title} ({jurisdiction}) — {snippet}"
+    return f"({jurisdiction}) {snippet}" if snippet else ""
+
+def format_reasoner_prompt(domain:str,domain_data:Dict[str,Any],retrieved_docs:List[Any],country:str,token_budget:int=REASONER_CONTEXT_TOKENS,report:Optional[Dict[str,Any]]=None)->str:
+    facts="\n".join(_unique(domain_data.get("facts",[])))
+    legal_questions="\n".join(_unique(domain_data.get("legal_questions",[])))
     entities="\n".join(domain_data.get("entities",[]))
     timeline="\n".join(domain_data.get("timeline",[]))
     location=domain_data.get("location","Not specified")
     injuries="\n".join(domain_data.get("injuries",[]))
     damages="\n".join(domain_data.get("damages",[]))
-    law_citations=[]
-    for doc in retrieved_docs:
-        if hasattr(doc,"page_content"):
-            snippet=(doc.page_content or "").strip()
-            meta=getattr(doc,"metadata",{}) or {}
-        elif isinstance(doc,dict):
-            snippet=(doc.get("page_content") or doc.get("content") or doc.get("text") or "").strip()
-            meta=(doc.get("metadata") or doc) or {}
-        else:
-            continue
-        section=(meta.get("section") or "").strip()
-        act=(meta.get("act") or "").strip()
-        jurisdiction=(meta.get("jurisdiction") or country.upper()).strip()
-        title=(meta.get("title") or "").strip()
-        if section and act:
-            law_citations.append(f"As per Section {section} of the {act} ({jurisdiction}) — {snippet}")
-        elif title:
-            law_citations.append(f"{title} ({jurisdiction}) — {snippet}")
-        else:
-            law_citations.append(f"({jurisdiction}) {snippet}" if snippet else "")
-    law_citations=[c for c in law_citations if c]
-    laws_text="\n".join(law_citations) if law_citations else "No relevant laws found."
-    return f"""
+    template=f"""
 You are a senior legal associate specializing in {domain}.
 Facts of the case:
 {facts}
@@ -50,7 +51,7 @@ Location:
 Injuries/Damages:
 {injuries if injuries else damages}
 Relevant laws and citations:
-{laws_text}
+{{laws_text}}
 Write a detailed, human-readable legal opinion that includes clearly labeled sections:
 1. Summary of the case
 2. Relevant legal provisions with proper citations
@@ -61,23 +62,116 @@ Write a detailed, human-readable legal opinion that includes clearly labeled sec
 7. Disclaimer
 Use formal but clear legal language. Do not output JSON. Use headings and bullet points where helpful.
 """
+    base_tokens=count_tokens(template)
+    # Whatever the case details leave of the budget goes to retrieved law text, best-scored first.
+    packed,stats=pack_documents(retrieved_docs,max(token_budget-base_tokens,MIN_PARTIAL_TOKENS),lambda doc:format_law_citation(doc,country))
+    law_citations=[c for c in (format_law_citation(doc,country) for doc in packed) if c]
+    laws_text="\n".join(law_citations) if law_citations else "No relevant laws found."
+    prompt=template.replace("{laws_text}",laws_text)
+    if report is not None:
+        report.update(stats)
+        report["prompt_tokens"]=count_tokens(prompt)
+    return prompt
 
-def reason_on_case(intake:Dict[str,Any],retrieved_laws:Dict[str,List[Any]])->Dict[str,str]:
-    all_results={}
-    country=intake.get("country","")
-    for domain,domain_data in intake.get("domain_specific",{}).items():
-        prompt=format_reasoner_prompt(domain,domain_data,retrieved_laws.get(domain,[]),country)
-        response=client.chat.completions.create(
+REASONER_SYSTEM_PROMPT="You are a legal reasoning assistant and advisor. Provide a detailed, clear, formal opinion based on facts and laws."
+
+def reasoner_messages(prompt:str)->List[Dict[str,str]]:
+    return [
+        {"role":"system","content":REASONER_SYSTEM_PROMPT},
+        {"role":"user","content":prompt}
+    ]
+
+def reason_on_domain(domain:str,domain_data:Dict[str,Any],retrieved_docs:List[Any],country:str,report:Optional[Dict[str,Any]]=None)->str:
+    prompt=format_reasoner_prompt(domain,domain_data,retrieved_docs,country,report=report)
+    return cached_chat_completion(get_openai_client(),model="gpt-4o",messages=reasoner_messages(prompt),temperature=0.2).strip()
+
+def stream_domain(domain:str,domain_data:Dict[str,Any],retrieved_docs:List[Any],country:str,report:Optional[Dict[str,Any]]=None)->Iterator[str]:
+    prompt=format_reasoner_prompt(domain,domain_data,retrieved_docs,country,report=report)
+    messages=reasoner_messages(prompt)
+    with span("llm.chat",model="gpt-4o",stream=True) as current:
+        cache=get_llm_cache()
+        key=cache_key("gpt-4o",messages,0.2)
+        cached=cache.get(key)
+        current.attrs["cache_hit"]=cached is not None
+        if cached is not None:
+            yield cached
+            return
+        stream=call_with_retry(
+            get_openai_client().chat.completions.create,
             model="gpt-4o",
-            messages=[
-                {"role":"system","content":"You are a legal reasoning assistant and advisor. Provide a detailed, clear, formal opinion based on facts and laws."},
-                {"role":"user","content":prompt}
-            ],
-            temperature=0.2
+            messages=messages,
+            temperature=0.2,
+            stream=True,
+            stream_options={"include_usage":True},
+            timeout=LLM_TIMEOUT_SECONDS
         )
-        try:
-            advice=response.choices[0].message.content.strip()
-            all_results[domain]=advice
-        except Exception as e:
-            all_results[domain]=f"[Error processing domain {domain}]:{str(e)}"
+        parts=[]
+        finish_reason=None
+        for chunk in stream:
+            if getattr(chunk,"usage",None) is not None:
+                record_usage(current,chunk)
+            if not chunk.choices:
+                continue
+            finish_reason=getattr(chunk.choices[0],"finish_reason",None) or finish_reason
+            delta=chunk.choices[0].delta.content
+            if delta:
+                if not parts:
+                    current.attrs["first_token_ms"]=round(current.duration*1000,3)
+                parts.append(delta)
+                yield delta
+        current.attrs["finish_reason"]=finish_reason
+        # Only a complete answer is replayed; a cut-off or filtered stream is asked again next time.
+        if finish_reason=="stop" and "".join(parts).strip():
+            cache.set(key,"".join(parts),"gpt-4o")
+
+@traced("reason_on_case")
+def reason_on_case(intake:Dict[str,Any],retrieved_laws:Dict[str,List[Any]],max_workers:int=LLM_MAX_CONCURRENCY,packing_report:Optional[Dict[str,Dict[str,Any]]]=None)->Dict[str,str]:
+    country=intake.get("country","")
+    domain_specific=intake.get("domain_specific",{})
+    reports={domain:{} for domain in domain_specific}
+    if packing_report is not None:
+        packing_report.update(reports)
+    def run_one(domain:str)->str:
+        return reason_on_domain(domain,domain_specific[domain],retrieved_laws.get(domain,[]),country,reports[domain])
+
+    all_results={}
+    for domain,(ok,result) in map_concurrently(run_one,domain_specific.keys(),max_workers).items():
+        all_results[domain]=result if ok else f"[Error processing domain {domain}]:{str(result)}"
+    record(domains=len(all_results),context_tokens={d:r.get("context_tokens",0) for d,r in reports.items()})
     return all_results
+
+_DONE=object()
+
+def stream_reason_on_case(intake:Dict[str,Any],retrieved_laws:Dict[str,List[Any]],max_workers:int=LLM_MAX_CONCURRENCY,packing_report:Optional[Dict[str,Dict[str,Any]]]=None)->Iterator[Tuple[str,str]]:
+    country=intake.get("country","")
+    domain_specific=intake.get("domain_specific",{})
+    domains=list(domain_specific.keys())
+    reports={domain:{} for domain in domains}
+    if packing_report is not None:
+        packing_report.update(reports)
+    if not domains:
+        return
+    events:"queue.Queue[Tuple[str,Any]]"=queue.Queue()
+    slots=threading.Semaphore(max(1,max_workers))
+    def worker(domain:str)->None:
+        with slots:
+            try:
+                for delta in stream_domain(domain,domain_specific[domain],retrieved_laws.get(domain,[]),country,reports[domain]):
+                    events.put((domain,delta))
+            except Exception as e:
+                events.put((domain,f"[Error processing domain {domain}]:{str(e)}"))
+            finally:
+                events.put((domain,_DONE))
+    with span("reason_on_case",streaming=True,domains=len(domains)) as current:
+        for domain in domains:
+            threading.Thread(target=contextvars.copy_context().run,args=(worker,domain),daemon=True).start()
+        pending=len(domains)
+        while pending:
+            domain,delta=events.get()
+            if delta is _DONE:
+                pending-=1
+                continue
+            if "first_token_ms" not in current.attrs:
+                current.attrs["first_token_ms"]=round(current.duration*1000,3)
+            yield domain,delta
+        current.attrs["context_tokens"]={d:r.get("context_tokens",0) for d,r in reports.items()}
@@ -0,0 +1,108 @@
+import os
+import time
+import logging
+import threading
+from typing import Any,List,Optional,Sequence,Tuple
+import numpy as np
+from src.pipeline.tracing import span
+
+logger=logging.getLogger(__name__)
+
+RERANK_ENABLED=os.getenv("RERANK_ENABLED","1").lower() not in ("0","false","no")
+RERANK_MODEL=os.getenv("RERANK_MODEL","cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES=int(os.getenv("RERANK_CANDIDATES","20"))
+RERANK_BUDGET_MS=float(os.getenv("RERANK_BUDGET_MS","300"))
+RERANK_BATCH_SIZE=int(os.getenv("RERANK_BATCH_SIZE","32"))
+RERANK_MAX_LENGTH=int(os.getenv("RERANK_MAX_LENGTH","256"))
+RERANK_MMR_LAMBDA=float(os.getenv("RERANK_MMR_LAMBDA","0.7"))
+
+_model:Optional[Any]=None
+_model_failed=False
+_model_lock=threading.Lock()
+
+def get_cross_encoder()->Optional[Any]:
+    global _model,_model_failed
+    if _model is None and not _model_failed:
+        with _model_lock:
+            if _model is None and not _model_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    _model=CrossEncoder(RERANK_MODEL,max_length=RERANK_MAX_LENGTH,device="cpu")
+                except Exception as e:
+                    # Without the model the stage still de-duplicates with MMR on retrieval scores.
+                    logger.warning("Cross-encoder %s unavailable, re-ranking by retrieval score only: %s",RERANK_MODEL,e)
+                    _model_failed=True
+    return _model
+
+def _sigmoid(x:np.ndarray)->np.ndarray:
+    return 1.0/(1.0+np.exp(-x))
+
+def cross_encoder_scores(pairs:Sequence[Tuple[str,str]],budget_ms:float=RERANK_BUDGET_MS,batch_size:int=RERANK_BATCH_SIZE)->Tuple[np.ndarray,int]:
+    # Returns relevance in [0, 1] and how many pairs were scored; pairs past the time budget are NaN.
+    scores=np.full(len(pairs),np.nan,dtype="float32")
+    model=get_cross_encoder()
+    if model is None or not pairs:
+        return scores,0
+    start=time.perf_counter()
+    scored=0
+    for i in range(0,len(pairs),batch_size):
+        if scored and (time.perf_counter()-start)*1000>budget_ms:
+            break
+        batch=list(pairs[i:i+batch_size])
+        scores[i:i+len(batch)]=_sigmoid(np.asarray(model.predict(batch,batch_size=batch_size,show_progress_bar=False),dtype="float32"))
+        scored+=len(batch)
+    return scores,scored
+
+def normalize(values:Sequence[float])->np.ndarray:
+    values=np.asarray(values,dtype="float32")
+    if len(values)==0:
+        return values
+    low,high=float(values.min()),float(values.max())
+    return (values-low)/(high-low) if high>low else np.ones_like(values)
+
+def fill_unscored(scores:np.ndarray,fallback:Sequence[float])->np.ndarray:
+    # Unscored candidates keep their retrieval order but rank below every scored one.
+    missing=np.isnan(scores)
+    if not missing.any():
+        return scores
+    fallback=np.asarray(fallback,dtype="float32")
+    floor=float(np.nanmin(scores)) if (~missing).any() else 1.0
+    ranks=np.argsort(np.argsort(-fallback[missing]))
+    out=scores.copy()
+    out[missing]=floor*(1.0-(ranks+1)/(len(ranks)+1))
+    return out
+
+def mmr(relevance:Sequence[float],vectors:Optional[np.ndarray],k:int,lambda_:float=RERANK_MMR_LAMBDA)->List[int]:
+    relevance=np.asarray(relevance,dtype="float32")
+    if vectors is None or len(relevance)<=1:
+        return [int(i) for i in np.argsort(-relevance)[:k]]
+    unit=vectors/np.clip(np.linalg.norm(vectors,axis=1,keepdims=True),1e-12,None)
+    similarity=unit@unit.T
+    chosen:List[int]=[]
+    remaining=list(range(len(relevance)))
+    while remaining and len(chosen)<k:
+        if chosen:
+            redundancy=similarity[np.ix_(remaining,chosen)].max(axis=1)
+        else:
+            redundancy=np.zeros(len(remaining),dtype="float32")
+        gains=lambda_*relevance[remaining]-(1.0-lambda_)*redundancy
+        best=remaining[int(np.argmax(gains))]
+        chosen.append(best)
+        remaining.remove(best)
+    return chosen
+
+def rerank(requests:List[Tuple[str,List[str],List[float],Optional[np.ndarray],int]],budget_ms:float=RERANK_BUDGET_MS)->List[List[Tuple[int,float]]]:
+    # Each request is (query, candidate texts, retrieval scores, candidate vectors, k). All pairs go
+    # through the cross-encoder together so a multi-domain case costs one batched pass.
+    pairs=[(query,text) for query,texts,_,_,_ in requests for text in texts]
+    with span("rerank",candidates=len(pairs),model=RERANK_MODEL) as current:
+        scores,scored=cross_encoder_scores(pairs,budget_ms)
+        current.attrs.update(scored=scored,budget_ms=budget_ms,budget_exceeded=scored<len(pairs) and get_cross_encoder() is not None)
+        out=[]
+        offset=0
+        for query,texts,fallback,vectors,k in requests:
+            relevance=fill_unscored(scores[offset:offset+len(texts)],fallback) if scored else normalize(fallback)
+            offset+=len(texts)
+            order=mmr(relevance,vectors,k)
+            out.append([(i,float(relevance[i])) for i in order])
+        return out
@@ -1,28 +1,143 @@
 import os
-from typing import Dict,Any,List
-from langchain.vectorstores import FAISS
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.docstore.document import Document
-from dotenv import load_dotenv
+import logging
+import numpy as np
+from typing import TYPE_CHECKING,Dict,Any,List,Optional,Tuple
+from src.pipeline.store_registry import get_registry
+from src.pipeline.lexical_index import reciprocal_rank_fusion
+from src.pipeline.query_cache import get_query_cache
+from src.pipeline.statutes import JURISDICTIONS
+from src.pipeline.llm_utils import map_concurrently
+from src.pipeline.reranker import RERANK_ENABLED,RERANK_CANDIDATES,get_cross_encoder,rerank
+from src.pipeline.tracing import span,traced,record
 
-load_dotenv()
+if TYPE_CHECKING:
+    # langchain and faiss are imported by the registry on first load, not when the app starts.
+    from langchain.vectorstores import FAISS
+    from langchain.docstore.document import Document
 
-EMBED_MODEL_NAME="all-MiniLM-L6-v2"
-BASE_EMBED_PATH=os.getenv("EMBEDDING_PATH","embeddings")
+EXACT_RERANK=os.getenv("FAISS_EXACT_RERANK","1").lower() not in ("0","false","no")
+RERANK_FACTOR=int(os.getenv("FAISS_RERANK_FACTOR","4"))
+HYBRID_RETRIEVAL=os.getenv("HYBRID_RETRIEVAL","1").lower() not in ("0","false","no")
+REFERENCE_KEY_HINTS=frozenset(("section","sections","statute","statutes","law","laws","act","acts","article","articles"))
+SHARD_MAX_WORKERS=int(os.getenv("SHARD_MAX_WORKERS","6"))
+# Re-ranked results are precise enough that four per domain cover what five raw neighbours did.
+RETRIEVAL_TOP_K=int(os.getenv("RETRIEVAL_TOP_K","4" if RERANK_ENABLED else "5"))
 
-def load_vectorstore(country:str)->FAISS:
-    embedder=HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
-    index_path=os.path.join(BASE_EMBED_PATH, country.lower())
-    return FAISS.load_local(index_path,embedder,allow_dangerous_deserialization=True)
+logger=logging.getLogger(__name__)
 
-def build_domain_query(domain_data:Dict[str,Any])->str:
-    facts=domain_data.get("facts",[])
-    return " ".join(facts).strip()
+def load_vectorstore(country:str)->"FAISS":
+    return get_registry().get(country)
 
-def retrieve_relevant_laws(intake:Dict[str,Any],top_k:int=5)->Dict[str,List[Dict[str,str]]]:
-    country=intake.get("country")
-    if not country:
-        raise ValueError("Intake missing 'country'. Cannot retrieve laws.")
+def _strings(value:Any)->List[str]:
+    if isinstance(value,str):
+        return [value]
+    if isinstance(value,list):
+        return [v for v in value if isinstance(v,str)]
+    return []
+
+def build_domain_aware_query(domain:str,domain_data:Dict[str,Any])->str:
+    parts=[domain.replace("_"," ")]
+    parts.extend(_strings(domain_data.get("legal_questions")))
+    parts.extend(_strings(domain_data.get("facts")))
+    # Statute names and section numbers the intake already extracted are the strongest lexical signal.
+    for key,value in domain_data.items():
+        # Whole tokens only: "act" must not pick up contract_terms, contact_details or impact.
+        if key not in ("facts","legal_questions") and REFERENCE_KEY_HINTS.intersection(key.lower().split("_")):
+            parts.extend(_strings(value))
+    if len(parts)==1:
+        return ""
+    return " ".join(p.strip() for p in parts if p.strip())
+
+def embed_queries(queries:List[str])->np.ndarray:
+    embedder=get_registry().get_embedder()
+    if hasattr(embedder,"encode"):
+        # The ONNX backend returns an array directly, skipping the list round trip.
+        return np.asarray(embedder.encode(queries),dtype="float32")
+    return np.asarray(embedder.embed_documents(queries),dtype="float32")
+
+def search_vectors(vectorstore:"FAISS",vectors:np.ndarray,k:int,compact:Any=None,exact:bool=EXACT_RERANK)->List[List[Tuple[int,float]]]:
+    k=min(k,vectorstore.index.ntotal)
+    if k<=0 or len(vectors)==0:
+        return [[] for _ in range(len(vectors))]
+    if compact is None:
+        distances,positions=vectorstore.index.search(vectors,k)
+    elif exact:
+        from src.pipeline.compact_index import exact_rerank
+        # Over-fetch from the compact index, then re-score candidates against the exact vectors.
+        _,candidates=compact.search(vectors,k*RERANK_FACTOR)
+        distances,positions=exact_rerank(vectorstore.index,vectors,candidates,k)
+    else:
+        distances,positions=compact.search(vectors,k)
+    hits=[]
+    for row_d,row_p in zip(distances,positions):
+        # Embeddings are unit-norm, so squared L2 maps onto cosine similarity.
+        hits.append([(int(p),float(1.0-d/2.0)) for d,p in zip(row_d,row_p) if p!=-1])
+    return hits
+
+def doc_at(vectorstore:"FAISS",position:int)->"Document":
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+
+def doc_to_result(doc:"Document",score:float,**extra:Any)->Dict[str,Any]:
+    result={
+        "section":doc.metadata.get("section",""),
+        "section_label":doc.metadata.get("section_label",""),
+        "act":doc.metadata.get("act",""),
+        "chapter":doc.metadata.get("chapter",""),
+        "jurisdiction":doc.metadata.get("jurisdiction",""),
+        "title":doc.metadata.get("title",""),
+        "source":doc.metadata.get("source",""),
+        "page":doc.metadata.get("page"),
+        "chunk":doc.metadata.get("chunk"),
+        "content":doc.page_content.strip(),
+        "score":score
+    }
+    result.update(extra)
+    return result
+
+def candidate_vectors(vectorstore:"FAISS",positions:List[int])->Optional[np.ndarray]:
+    if not positions:
+        return None
+    try:
+        return np.vstack([vectorstore.index.reconstruct(int(p)) for p in positions])
+    except RuntimeError:
+        # Indexes that cannot reconstruct fall back to relevance-only ordering.
+        return None
+
+def lookup_sections(country:str,text:str)->List[str]:
+    sections=get_registry().get_sections(country)
+    return sections.find(text) if sections is not None else []
+
+def section_results(vectorstore:"FAISS",doc_ids:List[str])->List[Dict[str,Any]]:
+    results=[]
+    for doc_id in doc_ids:
+        doc=vectorstore.docstore.search(doc_id)
+        if hasattr(doc,"page_content"):
+            results.append(doc_to_result(doc,1.0,match="section"))
+    return results
+
+def fuse_hits(dense:List[List[Tuple[int,float]]],lexical:List[List[Tuple[int,float]]],k:int)->List[List[Tuple[int,float]]]:
+    fused=[]
+    for d_row,l_row in zip(dense,lexical):
+        fused.append(reciprocal_rank_fusion([[p for p,_ in d_row],[p for p,_ in l_row]])[:k])
+    return fused
+
+def assign_hits(domains:List[str],hits:List[List[Tuple[int,float]]],top_k:int,dedupe:bool=True)->Dict[str,List[Tuple[int,float]]]:
+    assigned={d:[] for d in domains}
+    if not dedupe:
+        for d,row in zip(domains,hits):
+            assigned[d]=row[:top_k]
+        return assigned
+    # Each chunk goes to the domain it matches best; the over-fetched tail backfills the others.
+    candidates=sorted(((score,d,p) for d,row in zip(domains,hits) for p,score in row),key=lambda t:-t[0])
+    taken=set()
+    for score,d,p in candidates:
+        if p in taken or len(assigned[d])>=top_k:
+            continue
+        assigned[d].append((p,score))
+        taken.add(p)
+    return assigned
+
+def domain_specific_for_retrieval(intake:Dict[str,Any])->Dict[str,Any]:
     domain_specific=intake.get("domain_specific") or {}
     if not domain_specific:
         domains=intake.get("domains") or []
@@ -32,19 +147,152 @@ def retrieve_relevant_laws(intake:Dict[str,Any],top_k:int=5)->Dict[str,List[Dict
             domain_specific={d:{"facts":list(gf),"legal_questions":list(gq)} for d in domains}
         else:
             raise ValueError("No domains found in intake for retrieval.")
+    return domain_specific
+
+def search_queries(country:str,queries:List[str],k:int,vectors:Optional[np.ndarray]=None)->List[Tuple[List[Tuple[int,float]],List[Tuple[int,float]]]]:
+    registry=get_registry()
+    cache=get_query_cache()
+    version=registry.version(country)
+    rows:List[Any]=[cache.get_exact(country,version,q,k) for q in queries]
+    pending=[i for i,row in enumerate(rows) if row is None]
+    record(query_cache_exact_hits=len(queries)-len(pending))
+    if not pending:
+        return rows
+    # Sharded search embeds once and hands every shard the same vectors.
+    vectors=vectors[pending] if vectors is not None else embed_queries([queries[i] for i in pending])
+    misses=[]
+    for i,vector in zip(pending,vectors):
+        rows[i]=cache.get_semantic(country,version,vector,k)
+        if rows[i] is None:
+            misses.append((i,vector))
+    record(query_cache_semantic_hits=len(pending)-len(misses),index_searches=len(misses))
+    if not misses:
+        return rows
+    vectorstore=load_vectorstore(country)
+    dense=search_vectors(vectorstore,np.vstack([v for _,v in misses]),k,registry.get_compact(country))
+    lexical_index=registry.get_lexical(country) if HYBRID_RETRIEVAL else None
+    for (i,vector),dense_row in zip(misses,dense):
+        lexical_row=lexical_index.search(queries[i],k) if lexical_index is not None else []
+        rows[i]=(dense_row,lexical_row)
+        cache.put(country,version,queries[i],vector,k,rows[i])
+    return rows
+
+def intake_countries(intake:Dict[str,Any])->List[str]:
+    country=intake.get("country")
+    if not country:
+        raise ValueError("Intake missing 'country'. Cannot retrieve laws.")
+    countries=[country.lower()]
+    for extra in intake.get("countries") or []:
+        if extra and extra.lower() not in countries:
+            countries.append(extra.lower())
+    return countries
+
+def retrieve_from_shard(country:str,queries:Dict[str,str],top_k:int,dedupe:bool=True,vectors:Optional[Dict[str,np.ndarray]]=None,use_rerank:bool=RERANK_ENABLED)->Dict[str,List[Dict[str,Any]]]:
+    results={domain:[] for domain in queries}
     vectorstore=load_vectorstore(country)
-    results={}
-    for domain,data in domain_specific.items():
-        query=build_domain_query(data)
-        if not query:
-            results[domain]=[]
+    # Explicit "section 303 of the BNS" style references are answered from the section index directly.
+    pinned={domain:lookup_sections(country,q)[:top_k] for domain,q in queries.items()}
+    for domain,doc_ids in pinned.items():
+        results[domain]=section_results(vectorstore,doc_ids)
+    domains=[d for d in queries if len(results[d])<top_k]
+    record(country=country,section_hits=sum(len(r) for r in results.values()))
+    if not domains:
+        return results
+    # With re-ranking on, over-fetch a candidate pool per domain and let the cross-encoder pick top_k.
+    pool_k=max(top_k,RERANK_CANDIDATES) if use_rerank else top_k
+    fetch_k=pool_k*min(len(domains),3) if dedupe else pool_k
+    rows=search_queries(country,[queries[d] for d in domains],fetch_k,np.vstack([vectors[d] for d in domains]) if vectors else None)
+    dense=[d_row[:fetch_k] for d_row,_ in rows]
+    lexical=[l_row[:fetch_k] for _,l_row in rows]
+    hits=fuse_hits(dense,lexical,fetch_k) if any(lexical) else dense
+    vector_scores={d:dict(row) for d,row in zip(domains,dense)}
+    lexical_scores={d:dict(row) for d,row in zip(domains,lexical)}
+    candidates={}
+    for domain,row in assign_hits(domains,hits,pool_k,dedupe).items():
+        candidates[domain]=[(p,score,doc_at(vectorstore,p)) for p,score in row if vectorstore.index_to_docstore_id[p] not in pinned[domain]]
+    if use_rerank:
+        requests=[(
+            queries[d],
+            [doc.page_content for _,_,doc in candidates[d]],
+            [score for _,score,_ in candidates[d]],
+            candidate_vectors(vectorstore,[p for p,_,_ in candidates[d]]),
+            top_k-len(results[d])
+        ) for d in domains]
+        selected={d:[(candidates[d][i],score) for i,score in order] for d,order in zip(domains,rerank(requests))}
+    else:
+        selected={d:[(c,c[1]) for c in candidates[d][:top_k-len(results[d])]] for d in domains}
+    for domain in domains:
+        results[domain]+=[doc_to_result(
+            doc,score,
+            vector_score=vector_scores[domain].get(p),
+            lexical_score=lexical_scores[domain].get(p),
+            retrieval_score=retrieval_score
+        ) for (p,retrieval_score,doc),score in selected[domain]]
+    record(queries=len(domains),fetch_k=fetch_k,reranked=use_rerank,results={d:len(r) for d,r in results.items()})
+    return results
+
+def shard_scores(docs:List[Dict[str,Any]],reranked:bool=False)->List[float]:
+    # Cross-encoder relevance is a calibrated [0, 1] score for the same query on every shard, so
+    # re-ranked results merge on it directly.
+    if reranked:
+        return [1.0 if d.get("match")=="section" else d["score"] for d in docs]
+    # Every shard uses the same embedding model, so cosine similarity is comparable across countries,
+    # while fused RRF scores are not. Lexical-only hits rank just below the shard's weakest dense hit.
+    dense=[d["vector_score"] for d in docs if d.get("vector_score") is not None]
+    floor=min(dense) if dense else 0.0
+    return [1.0 if d.get("match")=="section" else d["vector_score"] if d.get("vector_score") is not None else floor for d in docs]
+
+def ready_countries(countries:List[str])->List[str]:
+    # A missing index would raise on load and a building one could be read mid-save; both are skipped.
+    registry=get_registry()
+    status={c:registry.status(c) for c in countries}
+    skipped={c:state for c,state in status.items() if state!="ready"}
+    for country,state in skipped.items():
+        logger.warning("[%s] Index is %s, skipping retrieval for this country",country.upper(),state)
+    ready=[c for c in countries if c not in skipped]
+    record(shards=ready,shards_skipped=skipped)
+    return ready
+
+def retrieve_across_shards(countries:List[str],queries:Dict[str,str],top_k:int,dedupe:bool=True,max_workers:int=SHARD_MAX_WORKERS,use_rerank:bool=RERANK_ENABLED)->Dict[str,List[Dict[str,Any]]]:
+    ready=ready_countries(countries)
+    results={domain:[] for domain in queries}
+    if not ready:
+        return results
+    domains=list(queries)
+    vectors=dict(zip(domains,embed_queries([queries[d] for d in domains])))
+
+    def search_shard(country:str)->Dict[str,List[Dict[str,Any]]]:
+        with span("retrieve.shard",country=country):
+            return retrieve_from_shard(country,queries,top_k,dedupe,vectors,use_rerank)
+
+    searched=map_concurrently(search_shard,ready,max_workers)
+    # Without the cross-encoder, rerank() falls back to per-shard normalised scores that do not compare.
+    reranked=use_rerank and get_cross_encoder() is not None
+    for country,(ok,value) in searched.items():
+        if not ok:
+            logger.warning("[%s] Shard search failed, skipping: %s",country.upper(),value)
             continue
-        docs=vectorstore.similarity_search(query,k=top_k)
-        results[domain]=[{
-            "section":doc.metadata.get("section",""),
-            "act":doc.metadata.get("act",""),
-            "jurisdiction":doc.metadata.get("jurisdiction",""),
-            "title":doc.metadata.get("title",""),
-            "content":doc.page_content.strip()
-        } for doc in docs]
+        for domain,docs in value.items():
+            for doc,score in zip(docs,shard_scores(docs,reranked)):
+                doc["country"]=country
+                doc["jurisdiction"]=doc.get("jurisdiction") or JURISDICTIONS.get(country,country.upper())
+                doc["shard_score"]=score
+            results[domain].extend(docs)
+    for domain,docs in results.items():
+        results[domain]=sorted(docs,key=lambda d:-d["shard_score"])[:top_k]
+    return results
+
+@traced("retrieve_relevant_laws")
+def retrieve_relevant_laws(intake:Dict[str,Any],top_k:int=RETRIEVAL_TOP_K,dedupe:bool=True)->Dict[str,List[Dict[str,Any]]]:
+    countries=intake_countries(intake)
+    domain_specific=domain_specific_for_retrieval(intake)
+    results={domain:[] for domain in domain_specific}
+    queries={domain:build_domain_aware_query(domain,data) for domain,data in domain_specific.items()}
+    queries={domain:q for domain,q in queries.items() if q}
+    if not queries:
+        return results
+    if len(countries)>1:
+        results.update(retrieve_across_shards(countries,queries,top_k,dedupe))
+    elif ready_countries(countries):
+        results.update(retrieve_from_shard(countries[0],queries,top_k,dedupe))
     return results
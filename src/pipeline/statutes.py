@@ -0,0 +1,382 @@
+import os
+import re
+import json
+import logging
+from typing import Any,Callable,Dict,Iterable,Iterator,List,Optional,Tuple
+
+logger=logging.getLogger(__name__)
+
+SECTIONS_FILE="sections.json"
+STATUTE_CHUNK_SIZE=int(os.getenv("STATUTE_CHUNK_SIZE","1500"))
+STATUTE_MAX_SECTION_CHUNKS=int(os.getenv("STATUTE_MAX_SECTION_CHUNKS","12"))
+STATUTE_MIN_COVERAGE=float(os.getenv("STATUTE_MIN_COVERAGE","0.5"))
+STATUTE_MAX_NUMBERING_GAPS=float(os.getenv("STATUTE_MAX_NUMBERING_GAPS","0.1"))
+MIN_SECTION_CHARS=40
+CONTENTS_MEDIAN_CHARS=200
+WEAK_MAX_JUMP=5
+SMALL_WORDS=frozenset(("of","and","the","on","for","to","in","or","by","with","an","a"))
+GENERIC_STEMS=re.compile(r"^(?:data|doc|document|file)\d*$",re.IGNORECASE)
+
+JURISDICTIONS={
+    "india":"India",
+    "usa":"United States",
+    "uk":"United Kingdom",
+    "canada":"Canada",
+    "australia":"Australia",
+    "eu":"European Union"
+}
+
+ACT_TITLE_RE=re.compile(r"^(?:THE\s+|The\s+)?([A-Z][A-Za-z’'(),\- ]{2,120}?\b(?:ACT|Act|CODE|Code|SANHITA|Sanhita|REGULATION|Regulation|DIRECTIVE|Directive))(?:(,)?\s*(\d{4}))?\.?$")
+CHAPTER_RE=re.compile(r"^(CHAPTER|Chapter|PART|Part)\s*([IVXLCDM]+|\d+[A-Z]?)\b\s*[.:—–-]*\s*(.*)$")
+# (pattern, kind, label). "labelled" headings name themselves (§, Rule, Section, Article) and "numbered" ones carry
+# a title and dash, so both are trusted anywhere. "weak" ones only count when the numbering runs on from the
+# previous heading, and never inside a labelled section, whose numbered paragraphs look just like them.
+SECTION_PATTERNS=(
+    # United States Code: "§1343. Fraud by wire, radio, or television"
+    (re.compile(r"^§\s*(\d+[A-Za-z]*(?:-\d+)?)\.\s+([A-Z\[“\"].{0,200})$"),"labelled","§"),
+    # Federal Rules in the USC appendices: "Rule 5.1. Preliminary Hearing"
+    (re.compile(r"^Rule\s+(\d+(?:\.\d+)?)\.\s+([A-Z\[].{0,150})$"),"labelled","Rule"),
+    (re.compile(r"^(?:Section|SECTION|Sec\.)\s+(\d+[A-Z]{0,3})(?:\s*[.—–:-]\s*([A-Z].{0,150}))?$"),"labelled","Section"),
+    # EU regulations put the article title on the following line; "Article 263 TFEU" in recitals is not a heading.
+    (re.compile(r"^(?:Article|ARTICLE)\s+(\d+[a-z]?)(?:\s*[.—–:-]\s*([A-Z].{0,150}))?$"),"labelled","Article"),
+    # India Code: "303. Theft.—(1) Whoever ..."
+    (re.compile(r"^(\d{1,4}[A-Z]{0,3})\.\s+([A-Z][^—–\n]{1,160}?)\.?\s*[—–]"),"numbered","Section"),
+    # Gazette prints with the title in the margin: "57.Whoever ...", "23. Nothing is ..." or "1.(1) This Act ..."
+    (re.compile(r"^(\d{1,4}[A-Z]{0,3})\.\s?()(?=[A-Z(“\"‘])"),"weak","Section"),
+    # legislation.gov.uk and Commonwealth acts: "42 Care workers: interpretation" on a line of its own.
+    (re.compile(r"^(\d{1,4}[A-Z]{0,2})\s+([A-Z][^\n]{2,120}?)(?<![,;:])$"),"weak","Section")
+)
+# "THE FIRST SCHEDULE", "SCHEDULES", "SCHEDULE 2 Section 72(7)"
+SCHEDULE_RE=re.compile(r"^(?:THE\s+)?(?:(FIRST|SECOND|THIRD|FOURTH|FIFTH|SIXTH|SEVENTH|EIGHTH|NINTH|TENTH)\s+)?SCHEDULES?(?:\s+(\d+[A-Z]?))?(?:\s+Sections?\s+[\w(), ]+)?$")
+# legislation.gov.uk running headers: "2 Civil Evidence Act 1995 (c. 38)"
+RUNNING_HEADER_RE=re.compile(r"\(c\.\s*\d+\)$")
+# legislation.gov.uk PDFs letter-space some headings: "1R a p e".
+SPACED_HEADING_RE=re.compile(r"^(\d{1,4})([A-Z](?: [a-z])+)$")
+# Running headers carry the page number glued to the part title: "Part 1 — Sexual Offences4".
+GLUED_PAGE_RE=re.compile(r"(?<=[A-Za-z])\d+$")
+REFERENCE_RE=re.compile(r"(?:\b(?:sections?|sec\.|s\.|articles?|art\.)\s*|§+\s*)(\d+[A-Za-z]{0,3})\b",re.IGNORECASE)
+USC_REFERENCE_RE=re.compile(r"\b(\d+[A-Za-z]?)\s*U\.?\s?S\.?\s?C\.?\s*(?:§+\s*)?(\d+[A-Za-z]*)\b")
+
+def smart_title(text:str)->str:
+    if not text.isupper():
+        return text.strip()
+    words=text.strip().lower().split()
+    return " ".join(w if i and w in SMALL_WORDS else w[:1].upper()+w[1:] for i,w in enumerate(words))
+
+def normalize_name(text:str)->str:
+    return re.sub(r"[^a-z0-9]+"," ",text.lower()).strip()
+
+def act_title_from_filename(filename:str)->str:
+    stem=os.path.splitext(os.path.basename(filename))[0]
+    usc=re.match(r"usc(\d+[A-Za-z]?)@",stem)
+    if usc:
+        return f"Title {usc.group(1)}, United States Code"
+    ukpga=re.match(r"ukpga_(\d{4})(\d{4})",stem)
+    if ukpga:
+        return f"UK Public General Act {ukpga.group(1)} c. {int(ukpga.group(2))}"
+    if GENERIC_STEMS.match(stem):
+        return ""
+    words=stem.replace("-","_").split("_")
+    year=words.pop() if words and re.fullmatch(r"\d{4}",words[-1]) else ""
+    name=" ".join(w if i and w in SMALL_WORDS else w[:1].upper()+w[1:] for i,w in enumerate(words))
+    return f"{name}, {year}" if year else name
+
+def act_title(pages:List[Tuple[int,str]],filename:str)->str:
+    # The act's own title sits in the first lines of the first page; file names are the fallback.
+    from_file=act_title_from_filename(filename)
+    head=pages[0][1].splitlines()[:40] if pages else []
+    for line in head:
+        match=ACT_TITLE_RE.match(line.strip())
+        if match:
+            name=smart_title(match.group(1))
+            name=f"{name}{match.group(2) or ''} {match.group(3)}" if match.group(3) else name
+            # Extraction can break words apart ("BHARA TIYA NY AYA SANHITA"); the file name spells them right.
+            if from_file and name!=from_file and re.sub(r"\W","",name.lower())==re.sub(r"\W","",from_file.lower()):
+                return from_file
+            return name
+    return from_file
+
+def section_number(label:str)->int:
+    return int(re.match(r"\d+",label).group())
+
+def match_section(line:str,previous:Optional[str],previous_kind:Optional[str]=None)->Optional[Tuple[str,str,bool,str,str]]:
+    spaced=SPACED_HEADING_RE.match(line)
+    if spaced:
+        line=f"{spaced.group(1)} {spaced.group(2).replace(' ','')}"
+    for pattern,kind,name in SECTION_PATTERNS:
+        match=pattern.match(line)
+        if not match:
+            continue
+        label=match.group(1).upper()
+        number=section_number(label)
+        if kind!="weak":
+            plausible=True
+        elif previous_kind=="labelled":
+            plausible=False
+        elif previous is None:
+            plausible=number<=WEAK_MAX_JUMP
+        else:
+            # Numbering restarts at 1 after a table of contents.
+            last=section_number(previous)
+            plausible=number==1 or last<=number<=last+WEAK_MAX_JUMP
+        if plausible and kind=="weak" and RUNNING_HEADER_RE.search(line):
+            plausible=False
+        if plausible:
+            title=(match.group(2) or "").strip().rstrip(".").strip()
+            # A bare heading ("Article 5") takes its title from the next line.
+            return label,title,match.end()>=len(line) and not title,kind,name
+    return None
+
+def has_body(section:Dict[str,Any])->bool:
+    return len(section["text"])>=len(section["title"])+MIN_SECTION_CHARS
+
+def drop_contents(sections:List[Dict[str,Any]])->List[Dict[str,Any]]:
+    # Split into runs wherever numbering goes back. A run followed by another one is a table of contents
+    # when its entries are mostly empty or short; the last run is always the body.
+    runs:List[List[Dict[str,Any]]]=[]
+    last=None
+    for s in sections:
+        number=section_number(s["section"])
+        if last is None or number<last:
+            runs.append([])
+        runs[-1].append(s)
+        last=number
+    out=[]
+    for i,run in enumerate(runs):
+        lengths=sorted(len(s["text"]) for s in run)
+        if sum(1 for s in run if not has_body(s))*2>len(run):
+            continue
+        if i<len(runs)-1 and lengths[len(lengths)//2]<CONTENTS_MEDIAN_CHARS:
+            continue
+        out.extend(s for s in run if has_body(s))
+    return out
+
+def parse_statute(pages:List[Tuple[int,str]])->Tuple[str,List[Dict[str,Any]]]:
+    preamble:List[str]=[]
+    sections:List[Dict[str,Any]]=[]
+    schedules:List[Dict[str,Any]]=[]
+    current:Optional[Dict[str,Any]]=None
+    chapter=""
+    chapter_needs_title=False
+    needs_title=False
+    previous:Optional[str]=None
+    previous_kind:Optional[str]=None
+    for page_number,text in pages:
+        for raw in text.splitlines():
+            line=raw.strip()
+            if not line:
+                continue
+            heading=CHAPTER_RE.match(line)
+            # Indian gazette mastheads read "PART II — Section 1"; that is the gazette's part, not the act's.
+            if heading and not re.match(r"Section\b",heading.group(3)):
+                name=GLUED_PAGE_RE.sub("",heading.group(3)).strip()
+                chapter=f"{heading.group(1).title()} {heading.group(2)}"
+                if name:
+                    chapter+=f" — {smart_title(name)}"
+                chapter_needs_title=not name
+                continue
+            if heading:
+                continue
+            if chapter_needs_title:
+                chapter_needs_title=False
+                if len(line)<=100 and not line.endswith(".") and not match_section(line,previous,previous_kind):
+                    chapter+=f" — {smart_title(line)}"
+                    continue
+            schedule=SCHEDULE_RE.match(line)
+            # Schedules number their paragraphs like sections; once the body has started they end it.
+            if schedule and (schedules or (current is not None and len(current["lines"])>1)):
+                ordinal=smart_title(schedule.group(1) or "")
+                name=f"Schedule {schedule.group(2)}" if schedule.group(2) else f"{ordinal} Schedule".strip()
+                current={"section":"","label":"","title":name,"chapter":"","page":page_number,"lines":[line]}
+                schedules.append(current)
+                continue
+            found=None if schedules else match_section(line,previous,previous_kind)
+            if found:
+                previous,previous_kind=found[0],found[3]
+                needs_title=found[2]
+                current={"section":found[0],"label":found[4],"title":found[1],"chapter":chapter,"page":page_number,"lines":[line]}
+                sections.append(current)
+                continue
+            if current is None:
+                preamble.append(line)
+                continue
+            if needs_title:
+                needs_title=False
+                if len(line)<=120 and not line.endswith("."):
+                    current["title"]=line
+            current["lines"].append(line)
+    for s in sections+schedules:
+        s["text"]="\n".join(s.pop("lines"))
+    return "\n".join(preamble),drop_contents(sections)+[s for s in schedules if has_body(s)]
+
+def numbering_gaps(sections:List[Dict[str,Any]])->float:
+    # Share of numbers missing from the longest run of headings; every miss is a section merged into its neighbour.
+    runs:List[List[int]]=[]
+    last=None
+    for s in sections:
+        if not s["section"]:
+            continue
+        number=section_number(s["section"])
+        if last is None or number<last:
+            runs.append([])
+        runs[-1].append(number)
+        last=number
+    if not runs:
+        return 1.0
+    run=max(runs,key=len)
+    return 1.0-len(set(run))/max(run)
+
+def check_sections(pages:List[Tuple[int,str]],sections:List[Dict[str,Any]],chunk_size:int=STATUTE_CHUNK_SIZE)->Optional[str]:
+    # Wrong section metadata is worse than none: a missed heading makes one "section" swallow its neighbours.
+    numbered=[s for s in sections if s["section"]]
+    if not numbered:
+        return "no sections found"
+    largest=max(numbered,key=lambda s:len(s["text"]))
+    if len(largest["text"])>STATUTE_MAX_SECTION_CHUNKS*chunk_size:
+        return f"section {largest['section']} spans {len(largest['text'])} chars"
+    total=sum(len(text) for _,text in pages) or 1
+    coverage=sum(len(s["text"]) for s in sections)/total
+    if coverage<STATUTE_MIN_COVERAGE:
+        return f"sections cover {coverage:.0%} of the text"
+    gaps=numbering_gaps(numbered)
+    if gaps>STATUTE_MAX_NUMBERING_GAPS:
+        return f"{gaps:.0%} of section numbers are missing"
+    return None
+
+def section_name(label:str,section:str)->str:
+    # "Section 303", "Article 6", "Rule 5.1", "§ 1343"; chunks indexed before labels were kept say "Section".
+    return f"{label or 'Section'} {section}"
+
+def section_heading(section:Dict[str,Any])->str:
+    if not section["section"]:
+        return section["title"]
+    name=section_name(section.get("label",""),section["section"])
+    return f"{name} — {section['title']}" if section["title"] else name
+
+def statute_chunks(pages:List[Tuple[int,str]],filename:str,country:str,split:Callable[[str],List[str]],chunk_size:int=STATUTE_CHUNK_SIZE)->Iterator[Tuple[str,Dict[str,Any]]]:
+    act=act_title(pages,filename)
+    base={"source":filename,"act":act,"jurisdiction":JURISDICTIONS.get(country,country.upper())}
+    preamble,sections=parse_statute(pages)
+    problem=check_sections(pages,sections,chunk_size)
+    if problem:
+        if sections:
+            logger.warning("%s: %s; indexing without section metadata",filename,problem)
+        for page_number,text in pages:
+            for piece in split(text):
+                yield piece,dict(base,page=page_number,section="",section_label="",chapter="",title=act)
+        return
+    if preamble.strip():
+        for piece in split(preamble):
+            yield piece,dict(base,page=pages[0][0],section="",section_label="",chapter="",title=act)
+    for s in sections:
+        meta=dict(base,page=s["page"],section=s["section"],section_label=s["label"],chapter=s["chapter"],title=s["title"])
+        if len(s["text"])<=chunk_size:
+            yield s["text"],meta
+            continue
+        # Continuation chunks repeat the heading so they still embed and cite as part of the section.
+        heading=section_heading(s)
+        for i,piece in enumerate(split(s["text"])):
+            yield (piece if i==0 else f"{heading} (continued)\n{piece}"),meta
+
+def act_aliases(act:str)->List[str]:
+    full=normalize_name(act)
+    if not full:
+        return []
+    aliases={full,re.sub(r"^the ","",full)}
+    no_year=re.sub(r"\s+\d{4}$","",full)
+    aliases.add(no_year)
+    # "GDPR 2016 679" is cited as plain "GDPR".
+    aliases.add(re.sub(r"(?:\s+\d+)+$","",full))
+    usc=re.match(r"title (\d+[a-z]?) united states code",no_year)
+    if usc:
+        aliases.update((f"{usc.group(1)} usc",f"usc {usc.group(1)}",f"title {usc.group(1)}"))
+        return sorted(aliases)
+    words=[w for w in no_year.split() if w not in SMALL_WORDS and w!="act" and not w.isdigit()]
+    acronym="".join(w[0] for w in words)
+    if len(acronym)>=2:
+        aliases.add(f"{acronym} act")
+    if len(acronym)>=3:
+        aliases.add(acronym)
+    return sorted(a for a in aliases if a)
+
+def section_key(act:str,section:str)->str:
+    return f"{normalize_name(act)}|{section.upper()}"
+
+class SectionIndex:
+    def __init__(self,acts:Dict[str,str],entries:Dict[str,List[str]],labels:Optional[Dict[str,str]]=None):
+        self.acts=acts
+        self.entries=entries
+        # "Article", "Rule" or "§" per entry; absent means "Section".
+        self.labels=labels or {}
+        self.by_section:Dict[str,List[str]]={}
+        for key in entries:
+            act,section=key.split("|",1)
+            self.by_section.setdefault(section,[]).append(act)
+
+    @classmethod
+    def build(cls,items:Iterable[Tuple[str,Dict[str,Any]]])->"SectionIndex":
+        acts:Dict[str,str]={}
+        entries:Dict[str,List[str]]={}
+        labels:Dict[str,str]={}
+        for doc_id,meta in items:
+            act=meta.get("act") or ""
+            section=meta.get("section") or ""
+            if not act or not section:
+                continue
+            for alias in act_aliases(act):
+                acts.setdefault(alias,normalize_name(act))
+            key=section_key(act,section)
+            entries.setdefault(key,[]).append(doc_id)
+            if meta.get("section_label") and meta["section_label"]!="Section":
+                labels[key]=meta["section_label"]
+        return cls(acts,entries,labels)
+
+    def save(self,path:str)->None:
+        tmp=path+".tmp"
+        with open(tmp,"w",encoding="utf-8") as f:
+            json.dump({"acts":self.acts,"entries":self.entries,"labels":self.labels},f)
+        os.replace(tmp,path)
+
+    @classmethod
+    def load(cls,path:str)->"SectionIndex":
+        with open(path,"r",encoding="utf-8") as f:
+            data=json.load(f)
+        return cls(data["acts"],data["entries"],data.get("labels"))
+
+    def label(self,act:str,section:str)->str:
+        key=self.acts.get(normalize_name(act),normalize_name(act))
+        return self.labels.get(f"{key}|{section.upper()}","Section")
+
+    def lookup(self,act:str,section:str)->List[str]:
+        key=self.acts.get(normalize_name(act),normalize_name(act))
+        return list(self.entries.get(f"{key}|{section.upper()}",[]))
+
+    def resolve_act(self,window:str)->Optional[str]:
+        padded=f" {normalize_name(window)} "
+        matches=[a for a in self.acts if f" {a} " in padded]
+        return self.acts[max(matches,key=len)] if matches else None
+
+    def find(self,text:str,window:int=100)->List[str]:
+        found:List[str]=[]
+        references=[(m.group(2),f"title {m.group(1)}") for m in USC_REFERENCE_RE.finditer(text)]
+        for m in REFERENCE_RE.finditer(text):
+            references.append((m.group(1),text[m.end():m.end()+window]+" | "+text[max(0,m.start()-window//2):m.start()]))
+        for section,context in references:
+            section=section.upper()
+            act=self.resolve_act(context)
+            if act is None:
+                # A bare "section 420" is only answered when one act in the index has it.
+                candidates=self.by_section.get(section,[])
+                if len(candidates)!=1:
+                    continue
+                act=candidates[0]
+            for doc_id in self.entries.get(f"{act}|{section}",[]):
+                if doc_id not in found:
+                    found.append(doc_id)
+        return found
+
+def load_section_index(save_path:str)->Optional[SectionIndex]:
+    path=os.path.join(save_path,SECTIONS_FILE)
+    if not os.path.exists(path):
+        return None
+    return SectionIndex.load(path)
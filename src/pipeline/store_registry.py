@@ -0,0 +1,245 @@
+import os
+import json
+import pickle
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any,Callable,Dict,Iterable,Optional,Tuple
+
+logger=logging.getLogger(__name__)
+
+EMBED_MODEL_NAME="all-MiniLM-L6-v2"
+BASE_EMBED_PATH=os.getenv("EMBEDDING_PATH","embeddings")
+MEMORY_BUDGET_MB=float(os.getenv("VECTORSTORE_MEMORY_MB","1024"))
+RELOAD_CHECK_SECONDS=float(os.getenv("VECTORSTORE_RELOAD_CHECK_SECONDS","5"))
+USE_MMAP=os.getenv("FAISS_MMAP","1").lower() not in ("0","false","no")
+USE_COMPACT=os.getenv("FAISS_USE_COMPACT","1").lower() not in ("0","false","no")
+INDEX_FILES=("index.faiss","index.pkl")
+BUILD_MARKER=".building"
+BUILD_MARKER_STALE_SECONDS=float(os.getenv("SHARD_BUILD_STALE_SECONDS",str(6*3600)))
+OPTIONAL_INDEX_FILES=("compact.faiss","compact.json",os.path.join("bm25","vocab.json"),"sections.json")
+
+def replace_file(path:str,write:Callable[[str],None])->None:
+    # Index files are memory-mapped by readers. Rewriting one in place truncates pages a running
+    # query still maps (SIGBUS), so every artifact is written beside it and renamed over it; old
+    # mappings keep the previous inode alive until they are dropped.
+    tmp=path+".tmp"
+    try:
+        write(tmp)
+        os.replace(tmp,path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def index_dir(country:str,base_path:Optional[str]=None)->str:
+    return os.path.join(base_path or BASE_EMBED_PATH,country.lower())
+
+def index_signature(path:str)->Tuple[Tuple[str,int,int],...]:
+    sig=[]
+    for name in INDEX_FILES:
+        st=os.stat(os.path.join(path,name))
+        sig.append((name,st.st_mtime_ns,st.st_size))
+    for name in OPTIONAL_INDEX_FILES:
+        file_path=os.path.join(path,name)
+        if os.path.exists(file_path):
+            st=os.stat(file_path)
+            sig.append((name,st.st_mtime_ns,st.st_size))
+    return tuple(sig)
+
+def shard_status(country:str,base_path:Optional[str]=None)->str:
+    path=index_dir(country,base_path)
+    marker=os.path.join(path,BUILD_MARKER)
+    # A marker left behind by a crashed build stops blocking the shard after a while.
+    if os.path.exists(marker) and time.time()-os.path.getmtime(marker)<BUILD_MARKER_STALE_SECONDS:
+        return "building"
+    if not all(os.path.exists(os.path.join(path,name)) for name in INDEX_FILES):
+        return "missing"
+    return "ready"
+
+class _Entry:
+    __slots__=("store","compact","lexical","sections","signature","size_bytes","checked_at")
+    def __init__(self,store:Any,compact:Any,lexical:Any,sections:Any,signature:tuple,size_bytes:int,checked_at:float):
+        self.store=store
+        self.compact=compact
+        self.lexical=lexical
+        self.sections=sections
+        self.signature=signature
+        self.size_bytes=size_bytes
+        self.checked_at=checked_at
+
+class VectorStoreRegistry:
+    def __init__(self,base_path:Optional[str]=None,memory_budget_mb:float=MEMORY_BUDGET_MB,reload_check_seconds:float=RELOAD_CHECK_SECONDS):
+        self.base_path=base_path or BASE_EMBED_PATH
+        self.memory_budget_bytes=int(memory_budget_mb*1024*1024)
+        self.reload_check_seconds=reload_check_seconds
+        self._stores:"OrderedDict[str,_Entry]"=OrderedDict()
+        self._lock=threading.RLock()
+        self._country_locks:Dict[str,threading.Lock]={}
+        self._embedder=None
+        self._embedder_lock=threading.Lock()
+
+    def get_embedder(self):
+        if self._embedder is None:
+            with self._embedder_lock:
+                if self._embedder is None:
+                    from src.pipeline.embeddings import load_embedder
+                    self._embedder=load_embedder()
+        return self._embedder
+
+    def _country_lock(self,country:str)->threading.Lock:
+        with self._lock:
+            return self._country_locks.setdefault(country,threading.Lock())
+
+    def _fresh_entry(self,country:str,now:float)->Optional[_Entry]:
+        with self._lock:
+            entry=self._stores.get(country)
+            if entry is None:
+                return None
+            if now-entry.checked_at<self.reload_check_seconds:
+                self._stores.move_to_end(country)
+                return entry
+        try:
+            sig=index_signature(index_dir(country,self.base_path))
+        except OSError:
+            sig=None
+        with self._lock:
+            if sig!=entry.signature:
+                self._stores.pop(country,None)
+                return None
+            entry.checked_at=now
+            self._stores.move_to_end(country)
+            return entry
+
+    def _entry(self,country:str)->_Entry:
+        country=country.lower()
+        entry=self._fresh_entry(country,time.monotonic())
+        if entry is not None:
+            return entry
+        with self._country_lock(country):
+            entry=self._fresh_entry(country,time.monotonic())
+            if entry is not None:
+                return entry
+            entry=self._load(country)
+            with self._lock:
+                self._stores[country]=entry
+                self._stores.move_to_end(country)
+                self._evict(keep=country)
+            return entry
+
+    def get(self,country:str):
+        return self._entry(country).store
+
+    def get_compact(self,country:str):
+        return self._entry(country).compact
+
+    def get_lexical(self,country:str):
+        return self._entry(country).lexical
+
+    def get_sections(self,country:str):
+        return self._entry(country).sections
+
+    def status(self,country:str)->str:
+        return shard_status(country,self.base_path)
+
+    def version(self,country:str)->tuple:
+        return self._entry(country).signature
+
+    def _load(self,country:str)->_Entry:
+        from src.pipeline.tracing import span
+        with span("vectorstore.load",country=country) as current:
+            entry=self._load_files(country)
+            current.attrs["size_bytes"]=entry.size_bytes
+            return entry
+
+    def _load_files(self,country:str)->_Entry:
+        from langchain.vectorstores import FAISS
+        from src.pipeline.compact_index import read_index,load_compact_index
+        from src.pipeline.lexical_index import load_lexical_index
+        from src.pipeline.statutes import load_section_index
+        path=index_dir(country,self.base_path)
+        sig=index_signature(path)
+        # Same layout as FAISS.load_local, but the index is opened with mmap flags so
+        # worker processes share pages instead of each holding a private copy.
+        with open(os.path.join(path,"index.pkl"),"rb") as f:
+            docstore,index_to_docstore_id=pickle.load(f)
+        index=read_index(os.path.join(path,"index.faiss"),USE_MMAP)
+        store=FAISS(self.get_embedder(),index,docstore,index_to_docstore_id)
+        self._check_embedder(country,path)
+        compact=load_compact_index(path,USE_MMAP) if USE_COMPACT else None
+        lexical=load_lexical_index(path,USE_MMAP)
+        sections=load_section_index(path)
+        size=sum(s for _,_,s in sig)
+        return _Entry(store,compact,lexical,sections,sig,size,time.monotonic())
+
+    def _check_embedder(self,country:str,path:str)->None:
+        from src.pipeline.embeddings import embedder_fingerprint,is_compatible
+        manifest_path=os.path.join(path,"manifest.json")
+        built_with=None
+        if os.path.exists(manifest_path):
+            with open(manifest_path,"r",encoding="utf-8") as f:
+                built_with=json.load(f).get("embedder")
+        if not is_compatible(built_with,self.get_embedder()):
+            logger.warning(
+                "[%s] Index was embedded with %s but queries use %s; rebuild with python -m src.pipeline.encoder --country %s --full",
+                country.upper(),(built_with or {}).get("backend","torch"),embedder_fingerprint(self.get_embedder())["backend"],country
+            )
+
+    def _evict(self,keep:str)->None:
+        total=sum(e.size_bytes for e in self._stores.values())
+        while total>self.memory_budget_bytes and len(self._stores)>1:
+            country,entry=next(iter(self._stores.items()))
+            if country==keep:
+                break
+            self._stores.pop(country)
+            total-=entry.size_bytes
+            logger.info("[%s] Evicted vector store from cache (%d KiB)",country.upper(),entry.size_bytes//1024)
+
+    def warm_up(self,countries:Iterable[str],load_embedder:bool=True)->Dict[str,bool]:
+        if load_embedder:
+            self.get_embedder()
+        loaded={}
+        for country in countries:
+            country=country.strip().lower()
+            if not country:
+                continue
+            try:
+                self.get(country)
+                loaded[country]=True
+            except Exception as e:
+                logger.warning("[%s] Warm-up failed: %s",country.upper(),e)
+                loaded[country]=False
+        return loaded
+
+    def invalidate(self,country:Optional[str]=None)->None:
+        with self._lock:
+            if country is None:
+                self._stores.clear()
+            else:
+                self._stores.pop(country.lower(),None)
+
+    def stats(self)->Dict[str,Any]:
+        with self._lock:
+            return {
+                "countries":list(self._stores.keys()),
+                "resident_bytes":sum(e.size_bytes for e in self._stores.values()),
+                "budget_bytes":self.memory_budget_bytes,
+                "embedder_loaded":self._embedder is not None
+            }
+
+_registry:Optional[VectorStoreRegistry]=None
+_registry_lock=threading.Lock()
+
+def get_registry()->VectorStoreRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry=VectorStoreRegistry()
+    return _registry
+
+def warm_up_from_env()->Dict[str,bool]:
+    countries=[c for c in os.getenv("VECTORSTORE_WARM","").split(",") if c.strip()]
+    if not countries:
+        return {}
+    return get_registry().warm_up(countries)
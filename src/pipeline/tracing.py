@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any,Callable,Dict,Iterator,List,Optional
+
+TRACE_JSONL_PATH=os.getenv("TRACE_JSONL_PATH","")
+TRACE_LOG_SPANS=os.getenv("TRACE_LOG_SPANS","").lower() in ("1","true","yes")
+TRACE_BUFFER_SIZE=int(os.getenv("TRACE_BUFFER_SIZE","500"))
+LATENCY_BUCKETS=(0.005,0.01,0.025,0.05,0.1,0.25,0.5,1.0,2.5,5.0,10.0,30.0,60.0)
+
+logger=logging.getLogger("legalchatbot.trace")
+
+class Span:
+    __slots__=("name","trace_id","span_id","parent_id","start","end","attrs","status")
+    def __init__(self,name:str,trace_id:str,parent_id:Optional[str],attrs:Dict[str,Any]):
+        self.name=name
+        self.trace_id=trace_id
+        self.span_id=uuid.uuid4().hex[:16]
+        self.parent_id=parent_id
+        self.start=time.time()
+        self.end:Optional[float]=None
+        self.attrs=attrs
+        self.status="ok"
+
+    @property
+    def duration(self)->float:
+        return (self.end or time.time())-self.start
+
+    def to_dict(self)->Dict[str,Any]:
+        return {
+            "name":self.name,
+            "trace_id":self.trace_id,
+            "span_id":self.span_id,
+            "parent_id":self.parent_id,
+            "start":self.start,
+            "duration_ms":round(self.duration*1000,3),
+            "status":self.status,
+            "attrs":self.attrs
+        }
+
+_current:contextvars.ContextVar[Optional[Span]]=contextvars.ContextVar("legalchatbot_span",default=None)
+
+class _Collector:
+    def __init__(self):
+        self.lock=threading.Lock()
+        self.recent:deque=deque(maxlen=TRACE_BUFFER_SIZE)
+        self.latency:Dict[str,Dict[str,Any]]={}
+        self.counters:Dict[tuple,float]={}
+        self.sinks:List[Callable[[Dict[str,Any]],None]]=[]
+
+    def emit(self,span:Span)->None:
+        record=span.to_dict()
+        with self.lock:
+            self.recent.append(record)
+            stats=self.latency.setdefault(span.name,{"count":0,"sum":0.0,"errors":0,"buckets":[0]*len(LATENCY_BUCKETS)})
+            stats["count"]+=1
+            stats["sum"]+=span.duration
+            stats["errors"]+=span.status!="ok"
+            for i,bound in enumerate(LATENCY_BUCKETS):
+                if span.duration<=bound:
+                    stats["buckets"][i]+=1
+            model=span.attrs.get("model")
+            for attr,direction in (("tokens_in","in"),("tokens_out","out")):
+                if span.attrs.get(attr):
+                    key=("legalchatbot_llm_tokens_total",("model",model or "unknown"),("direction",direction))
+                    self.counters[key]=self.counters.get(key,0)+span.attrs[attr]
+            if "cache_hit" in span.attrs:
+                key=("legalchatbot_cache_lookups_total",("span",span.name),("result","hit" if span.attrs["cache_hit"] else "miss"))
+                self.counters[key]=self.counters.get(key,0)+1
+            if TRACE_JSONL_PATH:
+                with open(TRACE_JSONL_PATH,"a",encoding="utf-8") as f:
+                    f.write(json.dumps(record,ensure_ascii=False,default=str)+"\n")
+        for sink in list(self.sinks):
+            sink(record)
+        if TRACE_LOG_SPANS:
+            logger.info(json.dumps(record,ensure_ascii=False,default=str))
+
+_collector=_Collector()
+
+@contextmanager
+def span(name:str,**attrs:Any)->Iterator[Span]:
+    parent=_current.get()
+    current=Span(name,parent.trace_id if parent else uuid.uuid4().hex,parent.span_id if parent else None,attrs)
+    token=_current.set(current)
+    try:
+        yield current
+    except GeneratorExit:
+        # A streaming generator closed by its consumer finished normally.
+        raise
+    except BaseException as e:
+        current.status="error"
+        current.attrs["error"]=f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end=time.time()
+        _current.reset(token)
+        _collector.emit(current)
+
+def traced(name:str)->Callable:
+    def decorator(fn:Callable)->Callable:
+        @functools.wraps(fn)
+        def wrapper(*args,**kwargs):
+            with span(name):
+                return fn(*args,**kwargs)
+        return wrapper
+    return decorator
+
+def record(**attrs:Any)->None:
+    current=_current.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+def add_sink(sink:Callable[[Dict[str,Any]],None])->None:
+    with _collector.lock:
+        _collector.sinks.append(sink)
+
+def remove_sink(sink:Callable[[Dict[str,Any]],None])->None:
+    with _collector.lock:
+        if sink in _collector.sinks:
+            _collector.sinks.remove(sink)
+
+def recent_spans(limit:int=100,trace_id:Optional[str]=None)->List[Dict[str,Any]]:
+    with _collector.lock:
+        spans=[s for s in _collector.recent if trace_id is None or s["trace_id"]==trace_id]
+    return spans[-limit:]
+
+def trace_spans(trace_id:Optional[str])->List[Dict[str,Any]]:
+    # Spans of one trace only; callers keep the id of their own root span so concurrent sessions don't mix.
+    if not trace_id:
+        return []
+    return recent_spans(TRACE_BUFFER_SIZE,trace_id)
+
+def stage_summary()->Dict[str,Dict[str,Any]]:
+    with _collector.lock:
+        return {
+            name:{"count":s["count"],"errors":s["errors"],"mean_ms":round(1000*s["sum"]/s["count"],3) if s["count"] else 0.0}
+            for name,s in _collector.latency.items()
+        }
+
+def _labels(pairs)->str:
+    return ",".join(f'{k}="{str(v)}"' for k,v in pairs)
+
+def render_prometheus()->str:
+    lines=["# HELP legalchatbot_span_seconds Wall time per pipeline stage.","# TYPE legalchatbot_span_seconds histogram"]
+    with _collector.lock:
+        for name,s in sorted(_collector.latency.items()):
+            for bound,count in zip(LATENCY_BUCKETS,s["buckets"]):
+                lines.append(f'legalchatbot_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'legalchatbot_span_seconds_bucket{{span="{name}",le="+Inf"}} {s["count"]}')
+            lines.append(f'legalchatbot_span_seconds_sum{{span="{name}"}} {s["sum"]:.6f}')
+            lines.append(f'legalchatbot_span_seconds_count{{span="{name}"}} {s["count"]}')
+        lines.append("# TYPE legalchatbot_span_errors_total counter")
+        for name,s in sorted(_collector.latency.items()):
+            lines.append(f'legalchatbot_span_errors_total{{span="{name}"}} {s["errors"]}')
+        metric_names=sorted({key[0] for key in _collector.counters})
+        for metric in metric_names:
+            lines.append(f"# TYPE {metric} counter")
+            for key,value in sorted(_collector.counters.items(),key=lambda kv:str(kv[0])):
+                if key[0]==metric:
+                    lines.append(f"{metric}{{{_labels(key[1:])}}} {value:g}")
+    return "\n".join(lines)+"\n"
+
+def reset()->None:
+    with _collector.lock:
+        _collector.recent.clear()
+        _collector.latency.clear()
+        _collector.counters.clear()
@@ -0,0 +1,28 @@
+from src.pipeline.context_packer import count_tokens,merge_adjacent,pack_documents,strip_overlap
+
+def chunk(n,section,content):
+    return {"source":"bns.pdf","chunk":n,"act":"Bharatiya Nyaya Sanhita, 2023","section":section,"content":content,"score":1.0}
+
+def test_continuation_heading_is_not_repeated():
+    left="303.(1) Whoever, intending to take dishonestly any movable property"
+    right="Section 303 — Theft (continued)\nany movable property out of the possession"
+    assert strip_overlap(left,right)==" out of the possession"
+
+def test_merge_stays_within_a_section():
+    docs=[
+        chunk(0,"303","303.(1) Whoever, intending to take dishonestly"),
+        chunk(1,"303","Section 303 (continued)\ntake dishonestly any movable property"),
+        chunk(2,"304","304. (1) Theft is snatching if")
+    ]
+    merged=merge_adjacent(docs)
+    assert [d["section"] for d in merged]==["303","304"]
+    assert merged[0]["content"]=="303.(1) Whoever, intending to take dishonestly any movable property"
+
+def test_budget_counts_the_citation_prefix():
+    def render(doc):
+        return "As per Section 1 of the Test Act, 2020 (IN) — "+doc["content"]
+    docs=[{"content":"word "*50,"score":1.0},{"content":"other "*50,"score":0.5}]
+    plain,_=pack_documents(docs,150)
+    cited,stats=pack_documents(docs,150,render)
+    assert stats["context_tokens"]==sum(count_tokens(render(d)) for d in cited)<=150
+    assert sum(len(d["content"]) for d in cited)<sum(len(d["content"]) for d in plain)
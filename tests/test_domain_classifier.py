@@ -0,0 +1,29 @@
+import threading
+from src.pipeline import domain_classifier
+from src.pipeline.local_domain_classifier import LocalDomainClassifier
+
+def test_embedder_failure_is_remembered(monkeypatch,caplog):
+    calls=[]
+    def broken(self,query):
+        calls.append(query)
+        raise RuntimeError("no torch")
+    monkeypatch.setattr(domain_classifier,"_local_classifier",None)
+    monkeypatch.setattr(domain_classifier,"_local_failed",False)
+    monkeypatch.setattr(domain_classifier,"LOCAL_CLASSIFIER_ENABLED",True)
+    monkeypatch.setattr(LocalDomainClassifier,"classify",broken)
+    monkeypatch.setattr(domain_classifier,"classify_domains_llm",lambda query:["civil_law"])
+    assert domain_classifier.classify_domains("My neighbour owes me money")==["civil_law"]
+    assert domain_classifier.classify_domains("My landlord kept the deposit")==["civil_law"]
+    assert len(calls)==1
+    assert len([r for r in caplog.records if "unavailable" in r.getMessage()])==1
+
+def test_local_classifier_is_built_once(monkeypatch):
+    monkeypatch.setattr(domain_classifier,"_local_classifier",None)
+    monkeypatch.setattr(domain_classifier,"_local_failed",False)
+    found=[]
+    threads=[threading.Thread(target=lambda:found.append(domain_classifier.get_local_classifier())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in found})==1
@@ -0,0 +1,35 @@
+import json
+from types import SimpleNamespace
+import numpy as np
+from src.pipeline.embeddings import EMBED_MODEL_NAME,VALIDATION_FILE,cosine_agreement,embedder_fingerprint,is_compatible
+
+def onnx_embedder(model_dir,backend="onnx-int8"):
+    return SimpleNamespace(backend=backend,model_dir=str(model_dir))
+
+def write_validation(model_dir,min_cosine):
+    (model_dir/VALIDATION_FILE).write_text(json.dumps({"onnx-int8":{"min_cosine":min_cosine}}),encoding="utf-8")
+
+def test_fingerprint_defaults_to_torch():
+    assert embedder_fingerprint(object())=={"model":EMBED_MODEL_NAME,"backend":"torch"}
+
+def test_backends_mix_only_after_validation(tmp_path):
+    torch_index={"model":EMBED_MODEL_NAME,"backend":"torch"}
+    assert not is_compatible(torch_index,onnx_embedder(tmp_path))
+    write_validation(tmp_path,0.95)
+    assert not is_compatible(torch_index,onnx_embedder(tmp_path))
+    write_validation(tmp_path,0.995)
+    assert is_compatible(torch_index,onnx_embedder(tmp_path))
+    # Indexes from before fingerprints were recorded count as torch.
+    assert is_compatible(None,onnx_embedder(tmp_path))
+
+def test_same_backend_or_other_model():
+    assert is_compatible({"model":EMBED_MODEL_NAME,"backend":"onnx"},SimpleNamespace(backend="onnx",model_dir="missing"))
+    assert not is_compatible({"model":"other-model","backend":"torch"},object())
+
+def test_cosine_agreement_reports_the_worst_sentence():
+    reference=np.asarray([[1,0],[0,1]],dtype="float32")
+    candidate=np.asarray([[2,0],[1,1]],dtype="float32")
+    report=cosine_agreement(reference,candidate)
+    assert report["sentences"]==2
+    assert abs(report["min_cosine"]-2**-0.5)<1e-6
+    assert abs(report["mean_cosine"]-(1+2**-0.5)/2)<1e-6
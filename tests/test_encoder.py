@@ -0,0 +1,28 @@
+import os
+import pytest
+
+# The encoder imports langchain and PyPDF2 at module level.
+encoder=pytest.importorskip("src.pipeline.encoder",exc_type=ImportError)
+
+def test_manifest_diff_finds_changed_and_removed_files():
+    manifest={"files":{"a.pdf":{"sha256":"1","ids":["x"]},"b.pdf":{"sha256":"2","ids":["y"]},"gone.pdf":{"sha256":"3","ids":["z"]}}}
+    changed,removed=encoder.diff_manifest(manifest,{"a.pdf":"1","b.pdf":"20","new.pdf":"4"})
+    assert sorted(changed)==["b.pdf","new.pdf"]
+    # A changed file's old vectors are removed before it is re-embedded.
+    assert sorted(removed)==["b.pdf","gone.pdf"]
+    assert encoder.diff_manifest({"files":{}},{})==([],[])
+
+def test_manifest_round_trip(tmp_path):
+    manifest={"files":{"a.pdf":{"sha256":"1","ids":["x"]}},"chunking":"statute"}
+    encoder.save_manifest(str(tmp_path),manifest)
+    assert encoder.load_manifest(str(tmp_path))==manifest
+    assert os.listdir(tmp_path)==[encoder.MANIFEST_NAME]
+    assert encoder.load_manifest(str(tmp_path/"missing"))=={"files":{}}
+
+def test_building_marker_is_removed_after_a_failed_build(tmp_path):
+    marker=tmp_path/encoder.BUILD_MARKER
+    with pytest.raises(RuntimeError):
+        with encoder.building_marker(str(tmp_path)):
+            assert marker.exists()
+            raise RuntimeError("embedding failed")
+    assert not marker.exists()
@@ -0,0 +1,29 @@
+import os
+import numpy as np
+import faiss
+from src.pipeline.compact_index import read_index
+from src.pipeline.lexical_index import BM25Index,load_lexical_index
+from src.pipeline.store_registry import replace_file
+
+def test_mapped_index_survives_a_rewrite(tmp_path):
+    path=str(tmp_path/"index.faiss")
+    rng=np.random.default_rng(0)
+    big=faiss.IndexFlatL2(8)
+    big.add(rng.random((5000,8),dtype="float32"))
+    faiss.write_index(big,path)
+    mapped=read_index(path,mmap=True)
+    small=faiss.IndexFlatL2(8)
+    small.add(rng.random((10,8),dtype="float32"))
+    replace_file(path,lambda tmp:faiss.write_index(small,tmp))
+    # Searching the old mapping would die with SIGBUS had the file been truncated in place.
+    _,positions=mapped.search(rng.random((1,8),dtype="float32"),3)
+    assert (positions>=10).any()
+    assert read_index(path,mmap=False).ntotal==10
+    assert os.listdir(tmp_path)==["index.faiss"]
+
+def test_bm25_rewrite_keeps_loaded_postings(tmp_path):
+    BM25Index.build(["theft of a phone","breach of contract"]).save(str(tmp_path/"bm25"))
+    loaded=load_lexical_index(str(tmp_path))
+    BM25Index.build(["unrelated"]).save(str(tmp_path/"bm25"))
+    assert [p for p,_ in loaded.search("theft")]==[0]
+    assert not [n for n in os.listdir(tmp_path/"bm25") if n.endswith(".tmp")]
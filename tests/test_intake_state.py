@@ -0,0 +1,13 @@
+from src.pipeline.intake_state import DATE_RE,IntakeState,route_reply
+
+def test_bare_may_is_not_a_date():
+    assert not DATE_RE.search("They may refuse to refund me")
+    assert not DATE_RE.search("May I file a complaint online")
+    for text in ("It happened on 5 May","on May 5th","around the 12th of May","in May, 2023"):
+        assert DATE_RE.search(text),text
+
+def test_domain_names_route_replies():
+    state=IntakeState(domains=["criminal_law","cyber_law"],filled={"criminal_law.fir_filed":False,"cyber_law.platform":False})
+    assert route_reply(state,"I reported it on the cyber crime portal")==["cyber_law"]
+    # "law" is in every domain name, so on its own it routes nowhere.
+    assert route_reply(state,"What does the law say")==[]
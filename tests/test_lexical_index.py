@@ -0,0 +1,40 @@
+import numpy as np
+from src.pipeline.lexical_index import BM25Index,load_lexical_index,reciprocal_rank_fusion,tokenize
+
+TEXTS=[
+    "Whoever commits theft shall be punished with imprisonment.",
+    "Theft of a motor vehicle. Theft in a dwelling house. Theft by a servant.",
+    "Cheating and dishonestly inducing delivery of property.",
+    "The landlord shall return the security deposit."
+]
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The theft of a phone, under Section 303!")==["theft","phone","under","section","303"]
+
+def test_bm25_ranks_by_term_frequency_and_rarity():
+    index=BM25Index.build(TEXTS)
+    ranked=index.search("theft",k=4)
+    assert [p for p,_ in ranked]==[1,0]
+    # "deposit" occurs in one document only, so it outweighs the common "theft".
+    assert index.search("theft deposit",k=1)[0][0]==3
+    assert index.search("unknown words")==[]
+
+def test_postings_round_trip_through_memory_mapped_files(tmp_path):
+    index=BM25Index.build(TEXTS)
+    index.save(str(tmp_path/"bm25"))
+    loaded=load_lexical_index(str(tmp_path))
+    assert isinstance(loaded.docs,np.memmap)
+    assert loaded.vocab==index.vocab
+    for name in ("offsets","docs","tfs","doc_len"):
+        assert np.array_equal(getattr(loaded,name),getattr(index,name))
+    # CSR layout: each term's postings sit between consecutive offsets.
+    term=index.vocab["theft"]
+    assert list(loaded.docs[loaded.offsets[term]:loaded.offsets[term+1]])==[0,1]
+    assert list(loaded.tfs[loaded.offsets[term]:loaded.offsets[term+1]])==[1,3]
+    assert loaded.search("security deposit")==index.search("security deposit")
+    assert load_lexical_index(str(tmp_path/"missing")) is None
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused=reciprocal_rank_fusion([[1,2,3],[3,1,4]])
+    assert [p for p,_ in fused]==[1,3,2,4]
+    assert abs(fused[0][1]-(1/61+1/62))<1e-12
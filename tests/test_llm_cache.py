@@ -0,0 +1,68 @@
+import time
+from types import SimpleNamespace
+from src.pipeline import llm_cache
+from src.pipeline.llm_cache import LLMCache,cache_key,cached_chat_completion
+
+def make_cache(tmp_path,**kwargs):
+    return LLMCache(path=str(tmp_path/"llm.sqlite3"),enabled=True,**kwargs)
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache=make_cache(tmp_path,ttl_seconds=0.05)
+    cache.set("k","answer")
+    assert cache.get("k")=="answer"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert cache.stats()["hits"]==1 and cache.stats()["misses"]==1
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache=make_cache(tmp_path,ttl_seconds=0,max_entries=2)
+    cache.set("a","1")
+    time.sleep(0.01)
+    cache.set("b","2")
+    time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c","3")
+    assert cache.get("b") is None
+    assert cache.get("a")=="1" and cache.get("c")=="3"
+
+def test_cache_key_depends_on_the_request():
+    messages=[{"role":"user","content":"hi"}]
+    assert cache_key("gpt-4o",messages,0.2)==cache_key("gpt-4o",[dict(messages[0])],0.2)
+    assert cache_key("gpt-4o",messages,0.2)!=cache_key("gpt-4o",messages,0.0)
+    assert cache_key("gpt-4o",messages)!=cache_key("gpt-4o-mini",messages)
+
+class Client:
+    def __init__(self,*replies):
+        self.replies=list(replies)
+        self.calls=0
+        self.chat=SimpleNamespace(completions=self)
+
+    def create(self,**params):
+        self.calls+=1
+        content,finish=self.replies.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),finish_reason=finish)],usage=None)
+
+def test_empty_or_cut_off_completions_are_not_cached(tmp_path,monkeypatch):
+    monkeypatch.setattr(llm_cache,"_cache",make_cache(tmp_path))
+    messages=[{"role":"user","content":"summarise"}]
+    client=Client(("","stop"),('{"facts": [',"length"),("done","stop"),("unused","stop"))
+    assert cached_chat_completion(client,"gpt-4o",messages)==""
+    assert cached_chat_completion(client,"gpt-4o",messages)=='{"facts": ['
+    assert cached_chat_completion(client,"gpt-4o",messages)=="done"
+    assert cached_chat_completion(client,"gpt-4o",messages)=="done"
+    assert client.calls==3
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache=LLMCache(path=str(tmp_path/"llm.sqlite3"),enabled=False)
+    cache.set("k","answer")
+    assert cache.get("k") is None
+    assert not (tmp_path/"llm.sqlite3").exists()
+
+def test_clear_resets_entries_and_counters(tmp_path):
+    cache=make_cache(tmp_path)
+    cache.set("k","answer")
+    cache.get("k")
+    cache.clear()
+    assert cache.get("k") is None
+    assert cache.stats()["hits"]==0 and cache.stats()["misses"]==1
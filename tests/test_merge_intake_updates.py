@@ -0,0 +1,15 @@
+from src.pipeline.merge_intake_updates import merge_user_responses,ordered_unique
+
+def test_strings_are_not_split_into_characters():
+    intake={"domain_specific":{"family_law":{"facts":["separated in 2022"]}},"family_law":{"children":["two"]}}
+    merged=merge_user_responses(intake,{"family_law":{"facts":"married in 2019","children":"a daughter"}})
+    assert merged["domain_specific"]["family_law"]["facts"]==["separated in 2022","married in 2019"]
+    assert merged["family_law"]["children"]==["two","a daughter"]
+
+def test_scalar_values_already_in_the_intake_are_wrapped():
+    merged=merge_user_responses({"timeline":"2019","facts":None},{"timeline":["2020","2019"],"facts":["", "  ","Lost my job"]})
+    assert merged["timeline"]==["2019","2020"]
+    assert merged["facts"]==["Lost my job"]
+
+def test_ordered_unique_drops_empty_values():
+    assert ordered_unique(None,"",["a",None,"A ",""],"b")==["a","b"]
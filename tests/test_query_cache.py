@@ -0,0 +1,39 @@
+import numpy as np
+from src.pipeline.query_cache import SemanticQueryCache,normalize_query
+
+def unit(*values):
+    vector=np.asarray(values,dtype="float32")
+    return vector/np.linalg.norm(vector)
+
+def test_exact_tier_ignores_case_and_punctuation():
+    cache=SemanticQueryCache(enabled=True)
+    cache.put("india","v1","Theft of my phone?",unit(1,0),5,"rows")
+    assert normalize_query("  THEFT of my   phone!! ")=="theft of my phone"
+    assert cache.get_exact("india","v1","theft of my phone",5)=="rows"
+    # A cached top-5 cannot answer a top-10 request.
+    assert cache.get_exact("india","v1","theft of my phone",10) is None
+
+def test_semantic_tier_uses_the_similarity_threshold():
+    cache=SemanticQueryCache(similarity=0.95,enabled=True)
+    cache.put("india","v1","theft of my phone",unit(1,0),5,"rows")
+    assert cache.get_semantic("india","v1",unit(1,0.1),5)=="rows"
+    assert cache.get_semantic("india","v1",unit(1,1),5) is None
+    stats=cache.stats()
+    assert (stats["semantic_hits"],stats["misses"])==(1,1)
+
+def test_index_version_change_drops_the_country():
+    cache=SemanticQueryCache(enabled=True)
+    cache.put("india","v1","theft",unit(1,0),5,"old")
+    cache.put("uk","v1","theft",unit(1,0),5,"uk")
+    assert cache.get_exact("india","v2","theft",5) is None
+    assert cache.get_exact("uk","v1","theft",5)=="uk"
+    assert cache.stats()["invalidations"]==1
+
+def test_entries_are_lru_bounded():
+    cache=SemanticQueryCache(max_entries=2,enabled=True)
+    cache.put("india","v1","a",None,5,"a")
+    cache.put("india","v1","b",None,5,"b")
+    cache.get_exact("india","v1","a",5)
+    cache.put("india","v1","c",None,5,"c")
+    assert cache.get_exact("india","v1","b",5) is None
+    assert cache.stats()["entries"]=={"india":2}
@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+from src.pipeline import llm_cache,reasoner
+from src.pipeline.clients import set_openai_client
+from src.pipeline.llm_cache import LLMCache
+
+def chunk(content=None,finish_reason=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content),finish_reason=finish_reason)],usage=None)
+
+class StreamingClient:
+    def __init__(self,*streams):
+        self.streams=list(streams)
+        self.calls=0
+        self.chat=SimpleNamespace(completions=self)
+
+    def create(self,**params):
+        self.calls+=1
+        return iter(self.streams.pop(0))
+
+def test_only_finished_streams_are_cached(tmp_path,monkeypatch):
+    monkeypatch.setattr(llm_cache,"_cache",LLMCache(path=str(tmp_path/"llm.sqlite3"),enabled=True))
+    client=StreamingClient(
+        [chunk("Summary of"),chunk(" the case",finish_reason="length")],
+        [chunk(None,finish_reason="content_filter")],
+        [chunk("Summary"),chunk(" done."),chunk(finish_reason="stop")]
+    )
+    previous=set_openai_client(client)
+    try:
+        run=lambda:"".join(reasoner.stream_domain("civil_law",{"facts":["A loan was not repaid."]},[],"uk"))
+        assert run()=="Summary of the case"
+        assert run()==""
+        assert run()=="Summary done."
+        assert run()=="Summary done."
+        assert client.calls==3
+    finally:
+        set_openai_client(previous)
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+import numpy as np
+import faiss
+from src.pipeline import retriever
+from src.pipeline.store_registry import VectorStoreRegistry
+from src.pipeline.retriever import assign_hits,build_domain_aware_query,domain_specific_for_retrieval,search_vectors
+
+def test_reference_keys_match_whole_tokens():
+    query=build_domain_aware_query("contract_law",{
+        "facts":["The supplier stopped deliveries."],
+        "relevant_act":"Indian Contract Act, 1872",
+        "applicable_sections":["Section 73"],
+        "contract_terms":"net 30 payment",
+        "contact_details":"supplier@example.com",
+        "impact":"lost sales",
+        "actions_taken":"sent a notice"
+    })
+    assert "Indian Contract Act, 1872" in query and "Section 73" in query
+    for value in ("net 30 payment","supplier@example.com","lost sales","sent a notice"):
+        assert value not in query
+
+def test_each_chunk_goes_to_the_domain_it_matches_best():
+    hits=[[(1,0.9),(2,0.8),(3,0.4)],[(1,0.95),(4,0.7),(5,0.6)]]
+    assigned=assign_hits(["criminal_law","cyber_law"],hits,top_k=2)
+    assert assigned=={"criminal_law":[(2,0.8),(3,0.4)],"cyber_law":[(1,0.95),(4,0.7)]}
+    assert assign_hits(["criminal_law","cyber_law"],hits,top_k=2,dedupe=False)["criminal_law"]==[(1,0.9),(2,0.8)]
+
+def test_one_batched_search_returns_cosine_per_query():
+    vectors=np.eye(4,dtype="float32")
+    index=faiss.IndexFlatL2(4)
+    index.add(vectors)
+    hits=search_vectors(SimpleNamespace(index=index),vectors[[2,0]],k=2)
+    assert [row[0][0] for row in hits]==[2,0]
+    assert abs(hits[0][0][1]-1.0)<1e-6 and abs(hits[0][1][1])<1e-6
+    assert search_vectors(SimpleNamespace(index=index),vectors[:1],k=10)[0][-1][0]!=-1
+
+def test_domains_without_specific_data_share_the_general_intake():
+    intake={"domains":["civil_law","contract_law"],"facts":["A loan was not repaid."],"legal_questions":["Can I sue?"]}
+    assert domain_specific_for_retrieval(intake)["contract_law"]=={"facts":["A loan was not repaid."],"legal_questions":["Can I sue?"]}
+
+def make_shard(base,country,building=False):
+    path=base/country
+    path.mkdir()
+    for name in ("index.faiss","index.pkl"):
+        (path/name).write_bytes(b"")
+    if building:
+        (path/".building").write_text("1")
+
+def test_only_ready_shards_are_searched(tmp_path,monkeypatch,caplog):
+    make_shard(tmp_path,"india")
+    make_shard(tmp_path,"uk",building=True)
+    monkeypatch.setattr(retriever,"get_registry",lambda:VectorStoreRegistry(base_path=str(tmp_path)))
+    assert retriever.ready_countries(["india","uk","usa"])==["india"]
+    messages=[r.getMessage() for r in caplog.records]
+    assert "[UK] Index is building, skipping retrieval for this country" in messages
+    assert "[USA] Index is missing, skipping retrieval for this country" in messages
+
+def test_single_country_with_missing_index_returns_empty(tmp_path,monkeypatch):
+    monkeypatch.setattr(retriever,"get_registry",lambda:VectorStoreRegistry(base_path=str(tmp_path)))
+    intake={"country":"usa","domain_specific":{"criminal_law":{"facts":["My phone was stolen."]}}}
+    assert retriever.retrieve_relevant_laws(intake)=={"criminal_law":[]}
+
+def test_shard_scores_are_comparable_across_shards():
+    docs=[{"match":"section","vector_score":None,"score":1.0},{"vector_score":0.62,"score":0.9},{"vector_score":None,"score":0.4}]
+    # Cosine for dense hits; lexical-only hits sit at the shard's weakest dense score.
+    assert retriever.shard_scores(docs)==[1.0,0.62,0.62]
+    assert retriever.shard_scores(docs,reranked=True)==[1.0,0.9,0.4]
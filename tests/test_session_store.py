@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from src.api import session_store
+from src.api.session_store import InMemorySessionStore,SQLiteSessionStore,SessionStore
+from src.pipeline.intake_state import IntakeState
+from src.pipeline.orchestrator import ChatSession
+
+class Clock:
+    def __init__(self):
+        self.now=1000.0
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock=Clock()
+    monkeypatch.setattr(session_store.time,"time",clock.time)
+    return clock
+
+@pytest.fixture(params=["memory","sqlite"])
+def store(request,tmp_path):
+    if request.param=="sqlite":
+        return SQLiteSessionStore(str(tmp_path/"sessions.sqlite3"),ttl_seconds=60)
+    return InMemorySessionStore(ttl_seconds=60)
+
+def session():
+    return ChatSession(country_code="india",answered_followups={"q1"},state=IntakeState(domains=["criminal_law"],turns=2))
+
+def test_session_round_trip(store,clock):
+    asyncio.run(store.save("a",session()))
+    loaded=asyncio.run(store.get("a"))
+    assert loaded.answered_followups=={"q1"}
+    assert loaded.state==IntakeState(domains=["criminal_law"],turns=2)
+
+def test_expired_session_is_not_returned(store,clock):
+    asyncio.run(store.save("a",session()))
+    clock.now+=61
+    assert asyncio.run(store.get("a")) is None
+
+def test_expire_sweeps_only_old_sessions(store,clock):
+    asyncio.run(store.save("old",session()))
+    clock.now+=45
+    asyncio.run(store.save("new",session()))
+    clock.now+=30
+    assert asyncio.run(store.expire())==["old"]
+    assert asyncio.run(store.expire())==[]
+    assert asyncio.run(store.get("new")) is not None
+
+def test_zero_ttl_keeps_sessions(clock):
+    store=InMemorySessionStore(ttl_seconds=0)
+    asyncio.run(store.save("a",session()))
+    clock.now+=10**9
+    assert asyncio.run(store.expire())==[]
+    assert asyncio.run(store.get("a")) is not None
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
@@ -0,0 +1,197 @@
+from src.pipeline import statutes
+from src.pipeline.statutes import SectionIndex,act_title,check_sections,match_section,parse_statute,statute_chunks
+
+# Excerpts are copied from the PyPDF2 text of the PDFs under data/, extraction quirks included.
+
+BNS_FIRST_PAGE="""THE BHARA TIYA NY AYA SANHITA, 2023
+NO. 45 OF2023
+[25th December ,2023.]
+An Act to consolidate and amend the provisions relating to offences and for
+matters connected therewithor incidentalthereto.
+CHAPTERI
+PRELIMINARY
+1.(1) This Act may be called the Bharatiya Nyaya Sanhita, 2023.
+(2) It shall come into force on such date as the Central Government may , bynotification
+in the Official Gazette, appoint, and different dates maybe appointed for different provisions
+of this Sanhita.Short title,
+commencement
+and
+application.vlk/kkj.k
+EXTRAORDINARY
+PART II — Section 1
+PUBLISHED BY AUTHORITY
+2.In this Sanhita, unless the context otherwise requires,––
+(1) “act” denotes as well a series of acts as a single act;
+(2) “animal” means any living creature, other than a human being;
+"""
+
+BNS_THEFT_PAGE="""CHAPTER XVII
+OF OFFENCES AGAINST PROPERTY
+Of theft
+303.(1) Whoever, intending to take dishonestly any movable property out of the
+possession of any person without that person’s consent, moves that property in order to
+such taking, is said to commit theft.
+Explanation 1.—A thing so long as it is attached to the earth, not being movable
+property, is not the subject of theft.
+304. (1) Theft is snatching if, in order to commit theft, the offender suddenly or quickly
+or forcibly seizes or secures or grabs or takes away from any person or from his possession
+any movable property.
+305.Whoever commits theft—
+(a) in any building, tent, container or vessel, which building, tent, container or vessel
+is used as a human dwelling or used for the custody of property; or
+"""
+
+SOA_CONTENTS_PAGE="""Sexual Offences Act 2003
+CHAPTER 42
+CONTENTS
+PART 1
+SEXUAL  OFFENCES
+Rape
+1R a p e
+Assault
+2 Assault by penetration
+3 Sexual assault
+Causing sexual activity without consent
+4 Causing a person to engage in sexual activity without consent
+"""
+
+SOA_BODY_PAGE="""ELIZABETH II c. 42
+Sexual Offences Act 2003
+2003 CHAPTER 42
+PART 1
+SEXUAL  OFFENCES
+Rape
+1R a p e
+(1) A person (A) commits an offence if—
+(a) he intentionally penetrates the vagina, anus or mouth of another person
+(B) with his penis,
+(b) B does not consent to the penetration, and
+(c) A does not reasonably believe that B consents.
+"""
+
+SOA_NEXT_PAGE="""Sexual Offences Act 2003 (c. 42)
+Part 1 — Sexual Offences2
+Assault
+2 Assault by penetration
+(1) A person (A) commits an offence if—
+(a) he intentionally penetrates the vagina or anus of another person (B)
+with a part of his body or anything else,
+3 Sexual assault
+(1) A person (A) commits an offence if—
+(a) he intentionally touches another person (B),
+(b) the touching is sexual,
+4 Causing a person to engage in sexual activity without consent
+(1) A person (A) commits an offence if—
+(a) he intentionally causes another person (B) to engage in an activity,
+"""
+
+GDPR_PAGES=[
+    (31,"""directly and individually concer ned by that decision, but had not done so within the period laid down in
+Article 263 TFEU.
+(144)  Where a cour t seized of proceedings against a decision by a super visor y author ity has reason to believe that
+"""),
+    (32,"""HAVE ADOPTED THIS REGUL ATION:
+CHAPTER I
+Gener al provisions
+Article 1
+Subject-matter and objectiv es
+1. This Regulation lays down rules relating to the prote ction of natural persons with rega rd to the processing of
+personal data and rules relating to the free movement of personal data.
+2. This Regulation prote cts fundamental rights and freedoms of natural persons and in particular their right to the
+prote ction of personal data.
+Article 2
+Mater ial scope
+1. This Regulation applies to the processing of personal data wholly or partly by automat ed means and to the
+processing other than by automat ed means of personal data whic h form part of a filing system.
+""")
+]
+
+USC_APPENDIX_PAGE="""§1. Short title
+This Act may be cited as the "Interstate Agreement on Detainers Act".
+(Pub. L. 91–538, §1, Dec. 9, 1970, 84 Stat. 1397.)
+Rule 5.1. Preliminary Hearing
+(a)  If a defendant is charged with an offense other than a petty offense, a IN GENERAL.
+magistrate judge must conduct a preliminary hearing unless:
+Rule 5.1 is, for the most part, a clarification of old rule 5(c).
+Rule 5.1(a) is composed of the first sentence of the second paragraph of current Rule 5(c).
+Rule 6. The Grand Jury
+(a)  SUMMONING A GRAND JURY.
+(1)  When the public interest so requires, the court must order that one or more grand juries be summoned.
+"""
+
+def labels(sections):
+    return [s["section"] for s in sections]
+
+def test_bns_gazette_headings():
+    _,sections=parse_statute([(1,BNS_FIRST_PAGE)])
+    assert labels(sections)==["1","2"]
+    assert sections[0]["chapter"]=="Chapter I — Preliminary"
+    # The gazette masthead is not a part of the act.
+    assert sections[1]["chapter"]=="Chapter I — Preliminary"
+    assert sections[1]["text"].startswith("2.In this Sanhita")
+
+def test_bns_headings_follow_numbering():
+    lines=BNS_THEFT_PAGE.splitlines()
+    assert match_section(lines[3],"302")[0]=="303"
+    assert match_section(lines[8],"303")[0]=="304"
+    assert match_section(lines[11],"304")[0]=="305"
+    # A weak heading far from the running number is a stray line, not a section.
+    assert match_section(lines[3],"12") is None
+    assert match_section("2003. Whoever","305") is None
+
+def test_bns_title_and_reference():
+    act=act_title([(1,BNS_FIRST_PAGE)],"bharatiya_nyaya_sanhita_2023.pdf")
+    assert act=="Bharatiya Nyaya Sanhita, 2023"
+    index=SectionIndex.build((f"id{n}",{"act":act,"section":n}) for n in ("302","303","304"))
+    assert index.find("Is this theft under section 303 of the BNS?")==["id303"]
+
+def test_uk_contents_dropped_and_spaced_heading():
+    _,sections=parse_statute([(1,SOA_CONTENTS_PAGE),(7,SOA_BODY_PAGE),(8,SOA_NEXT_PAGE)])
+    assert labels(sections)==["1","2","3","4"]
+    assert [s["page"] for s in sections]==[7,8,8,8]
+    assert sections[0]["title"]=="Rape"
+    assert sections[1]["title"]=="Assault by penetration"
+    # Running headers glue the page number onto the part title.
+    assert sections[1]["chapter"]=="Part 1 — Sexual Offences"
+
+def test_gdpr_recitals_and_paragraphs_are_not_articles():
+    _,sections=parse_statute(GDPR_PAGES)
+    assert labels(sections)==["1","2"]
+    assert sections[0]["title"]=="Subject-matter and objectiv es"
+    assert sections[0]["chapter"]=="Chapter I — Gener al provisions"
+    assert "2. This Regulation prote cts" in sections[0]["text"]
+
+def test_usc_appendix_rules():
+    _,sections=parse_statute([(3,USC_APPENDIX_PAGE)])
+    assert labels(sections)==["1","5.1","6"]
+    assert sections[1]["title"]=="Preliminary Hearing"
+    assert "Rule 5.1 is, for the most part" in sections[1]["text"]
+
+def test_swallowed_sections_fall_back_to_generic_chunks():
+    filler="\n".join("(a) a provision continuing the same section without any heading at all." for _ in range(400))
+    pages=[(1,"1. Short title.—This Act may be called the Test Act, 2020.\n"+filler)]
+    _,sections=parse_statute(pages)
+    assert check_sections(pages,sections,chunk_size=1500).startswith("section 1 spans")
+    chunks=list(statute_chunks(pages,"test_act_2020.pdf","india",lambda text:[text[i:i+1500] for i in range(0,len(text),1500)]))
+    assert chunks and all(meta["section"]=="" for _,meta in chunks)
+
+def test_numbering_gaps_fall_back():
+    body="\n".join(f"{n}. Heading {n}.—(1) Whoever does the thing described in this provision shall be punished." for n in (1,2,3,9,10,11,19,20))
+    pages=[(1,body)]
+    _,sections=parse_statute(pages)
+    assert labels(sections)==["1","2","3","9","10","11","19","20"]
+    assert "missing" in check_sections(pages,sections)
+    assert statutes.numbering_gaps(sections)>0.5
+
+def test_heading_label_is_kept_for_citations():
+    from src.pipeline.reasoner import format_law_citation
+    articles=list(statute_chunks(GDPR_PAGES,"gdpr_2016_679.pdf","eu",lambda text:[text]))
+    assert [m["section_label"] for _,m in articles if m["section"]]==["Article","Article"]
+    doc=dict(articles[-1][1],content="1. This Regulation applies ...")
+    assert format_law_citation(doc,"eu").startswith("As per Article 2 of the ")
+    index=SectionIndex.build((str(i),m) for i,(_,m) in enumerate(articles))
+    assert index.label(articles[-1][1]["act"],"2")=="Article"
+    _,rules=parse_statute([(3,USC_APPENDIX_PAGE)])
+    assert [s["label"] for s in rules]==["§","Rule","Rule"]
+    assert statutes.section_heading(rules[1])=="Rule 5.1 — Preliminary Hearing"
+    assert format_law_citation({"act":"Title 18 Appendix","section":"1","section_label":"§","content":"x"},"usa").startswith("As per § 1 of the ")
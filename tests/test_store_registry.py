@@ -0,0 +1,69 @@
+import os
+import time
+from src.pipeline.store_registry import INDEX_FILES,VectorStoreRegistry,_Entry,index_dir,index_signature
+
+KIB=1024
+
+def make_shard(base,country):
+    path=index_dir(country,str(base))
+    os.makedirs(path)
+    for name in INDEX_FILES:
+        with open(os.path.join(path,name),"wb") as f:
+            f.write(b"x"*KIB)
+    return path
+
+def fake_registry(base,monkeypatch,budget_kib=2.5):
+    registry=VectorStoreRegistry(base_path=str(base),memory_budget_mb=budget_kib/1024,reload_check_seconds=0)
+    loads=[]
+    def load_files(country):
+        # Stands in for the FAISS load; the store records which load produced it.
+        loads.append(country)
+        sig=index_signature(index_dir(country,registry.base_path))
+        return _Entry((country,len(loads)),None,None,None,sig,sum(s for _,_,s in sig),time.monotonic())
+    monkeypatch.setattr(registry,"_load_files",load_files)
+    return registry,loads
+
+def test_least_recently_used_store_is_evicted(tmp_path,monkeypatch):
+    for country in ("india","uk","usa"):
+        make_shard(tmp_path,country)
+    registry,loads=fake_registry(tmp_path,monkeypatch,budget_kib=4.5)
+    registry.get("india")
+    registry.get("uk")
+    registry.get("india")
+    registry.get("usa")
+    # Two 2 KiB shards fit the budget; uk was touched least recently.
+    assert registry.stats()["countries"]==["india","usa"]
+    assert registry.stats()["resident_bytes"]==4*KIB
+    registry.get("uk")
+    assert loads==["india","uk","usa","uk"]
+
+def test_newest_store_is_kept_over_budget(tmp_path,monkeypatch):
+    make_shard(tmp_path,"india")
+    registry,_=fake_registry(tmp_path,monkeypatch,budget_kib=1)
+    registry.get("india")
+    assert registry.stats()["countries"]==["india"]
+
+def test_rebuilt_index_is_reloaded(tmp_path,monkeypatch):
+    path=make_shard(tmp_path,"india")
+    registry,loads=fake_registry(tmp_path,monkeypatch)
+    first=registry.get("india")
+    assert registry.get("india") is first
+    before=registry.version("india")
+    with open(os.path.join(path,"index.faiss"),"wb") as f:
+        f.write(b"y"*2*KIB)
+    assert registry.get("india")!=first
+    assert registry.version("india")!=before
+    assert loads==["india","india"]
+
+def test_signature_is_not_rechecked_within_the_interval(tmp_path,monkeypatch):
+    path=make_shard(tmp_path,"india")
+    registry,loads=fake_registry(tmp_path,monkeypatch)
+    registry.reload_check_seconds=3600
+    registry.get("india")
+    with open(os.path.join(path,"index.faiss"),"wb") as f:
+        f.write(b"y"*2*KIB)
+    registry.get("india")
+    assert loads==["india"]
+    registry.invalidate("INDIA")
+    registry.get("india")
+    assert loads==["india","india"]
@@ -0,0 +1,20 @@
+from src.pipeline import tracing
+
+def test_closed_generator_span_is_ok():
+    def stream():
+        with tracing.span("test.stream"):
+            yield 1
+            yield 2
+    chunks=stream()
+    next(chunks)
+    chunks.close()
+    assert tracing.recent_spans(1)[0]["status"]=="ok"
+
+def test_trace_spans_are_scoped_to_one_trace():
+    with tracing.span("test.turn") as mine:
+        with tracing.span("test.child"):
+            pass
+    with tracing.span("test.other"):
+        pass
+    assert [s["name"] for s in tracing.trace_spans(mine.trace_id)]==["test.child","test.turn"]
+    assert tracing.trace_spans(None)==[]